@@ -5,9 +5,10 @@ Handles audio alerts when lane departure is detected.
 
 import pygame
 import numpy as np
+import queue
 import time
 import threading
-from typing import Optional
+from typing import Dict, List, Optional
 import logging
 
 # Configure logging
@@ -15,9 +16,141 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class AudioWorker:
+    """
+    One long-lived thread that plays every alert sound.
+
+    Callers enqueue commands (beep, start-repeat, stop, set-volume) and return
+    at once; the worker owns playback timing, so the frame loop never starts
+    threads or waits on audio. Sounds are registered by name and only touched
+    from the worker thread.
+    """
+
+    def __init__(self):
+        """Initialize the worker (call start() to run it)."""
+        self._commands: queue.Queue = queue.Queue()
+        self._sounds: Dict[str, object] = {}
+        self._repeats: Dict[str, List[Optional[float]]] = {}  # name -> [interval, next_time, end_time]
+        self._volume = 1.0
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics (written by the worker thread)
+        self.beeps_played = 0
+
+    def start(self):
+        """Start the worker thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def register_sound(self, name: str, sound):
+        """
+        Add or replace a named sound.
+
+        Args:
+            name: Name used by beep() and start_repeat()
+            sound: pygame Sound (or any object with play() and set_volume())
+        """
+        self._commands.put(('sound', name, sound))
+
+    def beep(self, name: str):
+        """Play a named sound once."""
+        self._commands.put(('beep', name))
+
+    def start_repeat(self, name: str, interval: float, duration: Optional[float] = None):
+        """
+        Play a named sound now and then every interval seconds.
+
+        Replaces any running repeat of the same sound.
+
+        Args:
+            name: Registered sound name
+            interval: Seconds between beep starts
+            duration: Seconds to keep repeating (None = until stop())
+        """
+        self._commands.put(('repeat', name, interval, duration))
+
+    def stop(self, name: Optional[str] = None):
+        """Stop repeating a sound (None = all sounds)."""
+        self._commands.put(('stop', name))
+
+    def set_volume(self, volume: float):
+        """Set the playback volume (0.0 to 1.0) of all sounds."""
+        self._commands.put(('volume', volume))
+
+    def shutdown(self, timeout: float = 1.0):
+        """Stop the worker thread."""
+        if self._thread is None:
+            return
+        self._commands.put(('quit',))
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _play(self, name: str):
+        """Play a registered sound without waiting for it to finish."""
+        sound = self._sounds.get(name)
+        if sound is None:
+            return
+        try:
+            sound.play()
+            self.beeps_played += 1
+        except Exception as e:
+            logger.error(f"Error playing {name} sound: {e}")
+
+    def _run(self):
+        """Worker loop: play due repeats, then sleep until the next one or a command."""
+        while True:
+            # Step 1: Play repeats that are due and drop expired ones
+            now = time.monotonic()
+            for name, repeat in list(self._repeats.items()):
+                interval, next_time, end_time = repeat
+                if end_time is not None and now >= end_time:
+                    del self._repeats[name]
+                elif now >= next_time:
+                    self._play(name)
+                    # Skip missed beats rather than bursting to catch up
+                    repeat[1] = max(next_time + interval, now)
+
+            # Step 2: Wait for a command until the next repeat is due
+            timeout = None
+            if self._repeats:
+                timeout = max(0.0, min(r[1] for r in self._repeats.values()) - time.monotonic())
+            try:
+                command = self._commands.get(timeout=timeout)
+            except queue.Empty:
+                continue
+
+            # Step 3: Apply the command
+            kind = command[0]
+            if kind == 'quit':
+                break
+            elif kind == 'sound':
+                _, name, sound = command
+                self._sounds[name] = sound
+                sound.set_volume(self._volume)
+            elif kind == 'beep':
+                self._play(command[1])
+            elif kind == 'repeat':
+                _, name, interval, duration = command
+                now = time.monotonic()
+                self._repeats[name] = [interval, now, now + duration if duration is not None else None]
+            elif kind == 'stop':
+                if command[1] is None:
+                    self._repeats.clear()
+                else:
+                    self._repeats.pop(command[1], None)
+            elif kind == 'volume':
+                self._volume = command[1]
+                for sound in self._sounds.values():
+                    sound.set_volume(self._volume)
+
+
 class AudioAlert:
     """
     Audio alert system using pygame for lane departure warnings.
+
+    All playback goes through one AudioWorker, which CollisionAlert shares.
     """
     
     def __init__(self, 
@@ -45,12 +178,13 @@ class AudioAlert:
         # State tracking
         self.last_alert_time = 0
         self.is_initialized = False
-        self.alert_thread = None
-        self.stop_alert = False
         
         # Cached sound object
         self.cached_sound = None
 
+        # Single playback thread, started once the mixer is up
+        self.worker: Optional[AudioWorker] = None
+
         # Initialize pygame mixer
         self._initialize_audio()
     
@@ -60,6 +194,9 @@ class AudioAlert:
             # Init with stereo (channels=2) as some ALSA backends fail with mono
             pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=2, buffer=512)
             self.is_initialized = True
+            self.worker = AudioWorker()
+            self.worker.set_volume(self.volume)
+            self.worker.start()
             self._update_cached_sound()
             logger.info(f"Audio system initialized - Frequency: {self.frequency}Hz, "
                        f"Duration: {self.duration}s, Volume: {self.volume}")
@@ -68,18 +205,19 @@ class AudioAlert:
             self.is_initialized = False
 
     def _update_cached_sound(self):
-        """Update the cached pygame Sound object."""
+        """Update the cached pygame Sound object and hand it to the worker."""
         if not self.is_initialized:
             return
         try:
             beep_sound = self._generate_beep_sound()
             self.cached_sound = pygame.sndarray.make_sound(beep_sound)
+            self.worker.register_sound('lane', self.cached_sound)
         except Exception as e:
             logger.error(f"Failed to create cached sound: {e}")
     
     def _generate_beep_sound(self) -> np.ndarray:
         """
-        Generate a beep sound waveform.
+        Generate a beep sound waveform at full scale (the worker applies the volume).
         
         Returns:
             Audio samples as numpy array
@@ -90,9 +228,6 @@ class AudioAlert:
         # Generate sine wave
         tone = np.sin(2 * np.pi * self.frequency * t)
         
-        # Apply volume
-        tone = tone * self.volume
-        
         # Convert to 16-bit integer format
         tone = np.clip(tone * 32767, -32768, 32767).astype(np.int16)
         
@@ -101,22 +236,6 @@ class AudioAlert:
 
         return stereo_tone
     
-    def _play_beep_sync(self):
-        """Play beep sound synchronously."""
-        try:
-            if self.cached_sound is None:
-                self._update_cached_sound()
-
-            if self.cached_sound is not None:
-                # Play the sound
-                self.cached_sound.play()
-
-                # Wait for sound to finish
-                pygame.time.wait(int(self.duration * 1000))
-            
-        except Exception as e:
-            logger.error(f"Error playing beep sound: {e}")
-    
     def play_beep(self, force: bool = False) -> bool:
         """
         Play a beep sound if cooldown period has passed.
@@ -140,45 +259,36 @@ class AudioAlert:
         # Update last alert time
         self.last_alert_time = current_time
         
-        # Play beep in separate thread
-        self.alert_thread = threading.Thread(target=self._play_beep_sync)
-        self.alert_thread.daemon = True
-        self.alert_thread.start()
+        # Queue the beep on the audio worker
+        self.worker.beep('lane')
         
         logger.debug("Beep alert triggered")
         return True
     
-    def play_continuous_alert(self, duration: float = 2.0):
+    def play_continuous_alert(self, duration: Optional[float] = 2.0):
         """
         Play continuous beep alerts for a specified duration.
         
         Args:
             duration: Total duration of continuous alerts in seconds
+                      (None = until stop_continuous_alert())
         """
         if not self.is_initialized:
             logger.warning("Audio system not initialized")
             return
         
-        start_time = time.time()
-        self.stop_alert = False
-        
-        def continuous_beep():
-            while time.time() - start_time < duration and not self.stop_alert:
-                self._play_beep_sync()
-                time.sleep(self.alert_cooldown)
+        # One beep, then the cooldown, as before
+        self.worker.start_repeat('lane', self.duration + self.alert_cooldown, duration)
         
-        # Start continuous alert in separate thread
-        self.alert_thread = threading.Thread(target=continuous_beep)
-        self.alert_thread.daemon = True
-        self.alert_thread.start()
-        
-        logger.info(f"Continuous alert started for {duration} seconds")
+        if duration is None:
+            logger.info("Continuous alert started")
+        else:
+            logger.info(f"Continuous alert started for {duration} seconds")
     
     def stop_continuous_alert(self):
         """Stop any ongoing continuous alert."""
-        self.stop_alert = True
-        if self.alert_thread and self.alert_thread.is_alive():
-            self.alert_thread.join(timeout=1.0)
+        if self.worker is not None:
+            self.worker.stop('lane')
         logger.info("Continuous alert stopped")
     
     def update_volume(self, new_volume: float):
@@ -189,7 +299,8 @@ class AudioAlert:
             new_volume: New volume level (0.0 to 1.0)
         """
         self.volume = max(0.0, min(1.0, new_volume))
-        self._update_cached_sound()
+        if self.worker is not None:
+            self.worker.set_volume(self.volume)
         logger.info(f"Updated volume to: {self.volume}")
     
     def update_frequency(self, new_frequency: int):
@@ -233,7 +344,9 @@ class AudioAlert:
     
     def cleanup(self):
         """Clean up audio resources."""
-        self.stop_continuous_alert()
+        if self.worker is not None:
+            self.worker.shutdown()
+            self.worker = None
         if self.is_initialized:
             pygame.mixer.quit()
             self.is_initialized = False
@@ -284,16 +397,19 @@ class LaneDepartureAlert:
         self.last_departure_state = False
         self.departure_start_time = None
         self.continuous_alert_threshold = 2.0  # Seconds before continuous alert
+        self.continuous_active = False
         
-    def process_departure(self, is_departing: bool, offset: float = 0.0):
+    def process_departure(self, is_departing: bool, offset: float = 0.0,
+                          timestamp: Optional[float] = None):
         """
         Process lane departure detection and trigger appropriate alerts.
         
         Args:
             is_departing: Whether lane departure is detected
             offset: Offset from lane center (for logging)
+            timestamp: Capture time of the frame in seconds (None = now)
         """
-        current_time = time.time()
+        current_time = timestamp if timestamp is not None else time.monotonic()
         
         if is_departing:
             # Lane departure detected
@@ -304,16 +420,20 @@ class LaneDepartureAlert:
                 logger.info(f"Lane departure detected - Offset: {offset:.1f}px")
             else:
                 # Still departing - check if we should start continuous alert
-                if (self.departure_start_time and 
+                if (self.departure_start_time is not None and
                     current_time - self.departure_start_time > self.continuous_alert_threshold):
-                    # Start continuous alert if not already playing
-                    if not self.audio_alert.alert_thread or not self.audio_alert.alert_thread.is_alive():
-                        self.audio_alert.play_continuous_alert(duration=5.0)
+                    # Start continuous alert if not already playing; it
+                    # repeats on the audio worker until the car is back
+                    if not self.continuous_active:
+                        self.audio_alert.play_continuous_alert(duration=None)
+                        self.continuous_active = True
         else:
             # No departure detected
             if self.last_departure_state:
                 # Just returned to lane
-                self.audio_alert.stop_continuous_alert()
+                if self.continuous_active:
+                    self.audio_alert.stop_continuous_alert()
+                    self.continuous_active = False
                 self.departure_start_time = None
                 logger.info("Vehicle returned to lane")
         
@@ -335,16 +455,18 @@ class CollisionAlert:
     TTC_WARNING = 2.0
     TTC_DANGER = 1.0
 
+    # Seconds between beep starts per tier; DANGER is rapid-fire
+    BEEP_INTERVALS = {'CAUTION': 1.0, 'WARNING': 0.3, 'DANGER': 0.1}
+
     def __init__(self, audio_alert: AudioAlert = None):
         """
         Initialize collision alert system.
 
         Args:
-            audio_alert: Shared AudioAlert instance
+            audio_alert: Shared AudioAlert instance (its audio worker plays the beeps)
         """
         self.base_audio = audio_alert if audio_alert else create_audio_alert()
         self.current_tier = None  # None, 'CAUTION', 'WARNING', 'DANGER'
-        self.last_beep_time = 0
         self.is_active = False
 
         # Create a dedicated 1200Hz collision sound
@@ -352,75 +474,68 @@ class CollisionAlert:
         self._init_collision_sound()
 
     def _init_collision_sound(self):
-        """Generate the 1200Hz collision warning tone."""
+        """Generate the 1200Hz collision warning tone and register it with the worker."""
         if not self.base_audio.is_initialized:
             return
 
         try:
-            import pygame
             sample_rate = self.base_audio.sample_rate
             duration = 0.15  # Short, urgent beep
             t = np.linspace(0, duration, int(sample_rate * duration), False)
-            tone = np.sin(2 * np.pi * 1200 * t)  # 1200Hz
-            tone = tone * self.base_audio.volume
+            tone = np.sin(2 * np.pi * 1200 * t)  # 1200Hz, full scale (worker sets volume)
             tone = np.clip(tone * 32767, -32768, 32767).astype(np.int16)
             stereo_tone = np.column_stack((tone, tone))
             self._collision_sound = pygame.sndarray.make_sound(stereo_tone)
+            self.base_audio.worker.register_sound('collision', self._collision_sound)
             logger.info("Collision alert sound initialized (1200Hz)")
         except Exception as e:
             logger.error(f"Failed to create collision sound: {e}")
 
-    def _play_collision_beep(self):
-        """Play a single collision warning beep."""
-        if self._collision_sound is not None:
-            try:
-                self._collision_sound.play()
-            except Exception as e:
-                logger.error(f"Error playing collision beep: {e}")
+    def _set_tier(self, tier: Optional[str]):
+        """Switch the repeating collision beep to a tier's interval (None = silence)."""
+        if tier == self.current_tier:
+            return
+        self.current_tier = tier
+        self.is_active = tier is not None
+
+        worker = self.base_audio.worker
+        if worker is None:
+            return
+        if tier is None:
+            worker.stop('collision')
+        else:
+            worker.start_repeat('collision', self.BEEP_INTERVALS[tier])
 
     def process_collision(self, ttc: float = None):
         """
         Process collision TTC and trigger appropriate alert tier.
 
+        The tier's beep pattern repeats on the audio worker until the tier
+        changes, so this only queues a command when it does.
+
         Args:
             ttc: Time-to-collision in seconds (None = no threat)
         """
         if ttc is None or ttc == float('inf') or ttc <= 0:
-            if self.current_tier is not None:
-                self.current_tier = None
-                self.is_active = False
+            self._set_tier(None)
             return
 
-        current_time = time.time()
-
         # Determine tier
         if ttc <= self.TTC_DANGER:
             new_tier = 'DANGER'
-            beep_interval = 0.1  # Rapid-fire
         elif ttc <= self.TTC_WARNING:
             new_tier = 'WARNING'
-            beep_interval = 0.3
         elif ttc <= self.TTC_CAUTION:
             new_tier = 'CAUTION'
-            beep_interval = 1.0
         else:
-            if self.current_tier is not None:
-                self.current_tier = None
-                self.is_active = False
+            self._set_tier(None)
             return
 
         # Log tier changes
         if new_tier != self.current_tier:
             logger.info(f"Collision alert: {new_tier} (TTC: {ttc:.1f}s)")
-            self.current_tier = new_tier
-            self.is_active = True
-
-        # Play beep at the tier-appropriate interval
-        if current_time - self.last_beep_time >= beep_interval:
-            self._play_collision_beep()
-            self.last_beep_time = current_time
+        self._set_tier(new_tier)
 
     def cleanup(self):
         """Clean up resources."""
-        self.current_tier = None
-        self.is_active = False
\ No newline at end of file
+        self._set_tier(None)
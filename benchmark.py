@@ -0,0 +1,745 @@
+#!/usr/bin/env python3
+"""
+Benchmark utility for OpenLCWS (Open Lane and Collision Warning System)
+Measures per-frame cost and accuracy of processing options on a recorded clip.
+"""
+
+import sys
+import json
+import time
+import logging
+from typing import List, Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from lane_detector import LaneDetector
+from lane_backends import (create_lane_backend, get_available_lane_backends,
+                           lane_backend_options, RansacBackend)
+from utils import calculate_lane_center
+from collision_detector import (CollisionDetector, Detection, decode_ssd_detections,
+                                greedy_assignment, iou_matrix)
+from model_specs import DEFAULT_MODEL, VOC_CLASSES, VEHICLE_CLASS_IDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_frames(video_path: str, max_frames: int = 300) -> List[np.ndarray]:
+    """
+    Decode frames from a video into memory so decoding is not timed.
+
+    Args:
+        video_path: Path to the recorded clip
+        max_frames: Maximum number of frames to load
+
+    Returns:
+        List of BGR frames
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        logger.error(f"Failed to open video file: {video_path}")
+        sys.exit(1)
+
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+
+    logger.info(f"Loaded {len(frames)} frames from {video_path}")
+    return frames
+
+
+def summarize_latencies(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """Mean and percentile summary of per-frame latencies in milliseconds."""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if samples.size == 0:
+        return {'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    return {
+        'mean': float(samples.mean()),
+        'p50': float(np.percentile(samples, 50)),
+        'p90': float(np.percentile(samples, 90)),
+        'p99': float(np.percentile(samples, 99)),
+        'max': float(samples.max())
+    }
+
+
+def print_table(rows: List[Dict], columns: List[str]):
+    """Print result rows as an aligned text table."""
+    widths = {c: max(len(c), *(len(_fmt(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.rjust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(_fmt(row[c]).rjust(widths[c]) for c in columns))
+
+
+def _fmt(value) -> str:
+    """Format a table cell."""
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def run_lane_detector(detector: LaneDetector, frames: List[np.ndarray]):
+    """
+    Run a lane detector over frames and time each call.
+
+    Returns:
+        (latencies_ms, offsets, both_lanes_found) per frame
+    """
+    latencies = []
+    offsets = []
+    found = []
+    for frame in frames:
+        start = time.perf_counter()
+        result = detector.detect(frame)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        offsets.append(result['offset'])
+        found.append(result.get('left_intercept') is not None and
+                     result.get('right_intercept') is not None)
+    return latencies, np.asarray(offsets, dtype=np.float64), np.asarray(found)
+
+
+def bench_scales(frames: List[np.ndarray], scales: Sequence[float]) -> List[Dict]:
+    """
+    Accuracy-versus-FPS curve of LaneDetector processing scales.
+    Accuracy is measured against full-resolution processing (scale 1.0).
+
+    Args:
+        frames: Frames to process
+        scales: Processing scales to compare
+
+    Returns:
+        One result row per scale
+    """
+    _, ref_offsets, ref_found = run_lane_detector(LaneDetector(processing_scale=1.0), frames)
+
+    rows = []
+    for scale in scales:
+        latencies, offsets, found = run_lane_detector(LaneDetector(processing_scale=scale), frames)
+        stats = summarize_latencies(latencies)
+        error = np.abs(offsets - ref_offsets)
+        rows.append({
+            'scale': scale,
+            'fps': 1000.0 / stats['mean'] if stats['mean'] > 0 else 0.0,
+            'mean_ms': stats['mean'],
+            'p90_ms': stats['p90'],
+            'offset_err_mean': float(error.mean()),
+            'offset_err_p95': float(np.percentile(error, 95)),
+            'both_lanes_%': 100.0 * float(found.mean()),
+            'ref_both_lanes_%': 100.0 * float(ref_found.mean())
+        })
+    return rows
+
+
+def bench_tracking(frames: List[np.ndarray], intervals: Sequence[int]) -> List[Dict]:
+    """
+    Cost and accuracy of lane tracking against a full search on every frame.
+
+    Args:
+        frames: Frames to process
+        intervals: Full-search intervals to compare
+
+    Returns:
+        One result row per interval, plus the full-search reference row
+    """
+    ref_latencies, ref_offsets, ref_found = run_lane_detector(LaneDetector(), frames)
+    ref_stats = summarize_latencies(ref_latencies)
+    rows = [{
+        'interval': 'off',
+        'mean_ms': ref_stats['mean'],
+        'p90_ms': ref_stats['p90'],
+        'tracked_%': 0.0,
+        'offset_err_mean': 0.0,
+        'offset_err_p95': 0.0,
+        'both_lanes_%': 100.0 * float(ref_found.mean())
+    }]
+
+    for interval in intervals:
+        detector = LaneDetector(tracking=True, full_search_interval=interval)
+        latencies, offsets, found = run_lane_detector(detector, frames)
+        stats = summarize_latencies(latencies)
+        error = np.abs(offsets - ref_offsets)
+        rows.append({
+            'interval': interval,
+            'mean_ms': stats['mean'],
+            'p90_ms': stats['p90'],
+            'tracked_%': 100.0 * detector.tracked_frames / max(1, len(frames)),
+            'offset_err_mean': float(error.mean()),
+            'offset_err_p95': float(np.percentile(error, 95)),
+            'both_lanes_%': 100.0 * float(found.mean())
+        })
+    return rows
+
+
+def bench_birdseye(frames: List[np.ndarray], curve_threshold: float = 1e-4) -> List[Dict]:
+    """
+    Cost and stability of the bird's-eye engine against the Hough engine.
+
+    Stability is the mean absolute frame-to-frame change of the offset, overall
+    and on frames where the bird's-eye fit is curved (|quadratic coefficient|
+    above curve_threshold in top-down pixels).
+
+    Args:
+        frames: Frames to process
+        curve_threshold: Curvature above which a frame counts as a curve
+
+    Returns:
+        One result row per backend
+    """
+    # Classify frames as curved from the bird's-eye fits
+    birdseye = LaneDetector(backend='birdseye')
+    curvature = []
+    for frame in frames:
+        birdseye.detect(frame)
+        fits = [abs(c) for c in birdseye.backend.engine.curvature_stats().values() if c is not None]
+        curvature.append(max(fits) if fits else 0.0)
+    curved = np.asarray(curvature[1:]) > curve_threshold
+
+    rows = []
+    reference = None
+    for backend in ('hough', 'birdseye'):
+        latencies, offsets, found = run_lane_detector(LaneDetector(backend=backend), frames)
+        stats = summarize_latencies(latencies)
+        jitter = np.abs(np.diff(offsets))
+        if reference is None:
+            reference = offsets
+        rows.append({
+            'backend': backend,
+            'mean_ms': stats['mean'],
+            'p90_ms': stats['p90'],
+            'jitter_px': float(jitter.mean()) if jitter.size else 0.0,
+            'jitter_curved_px': float(jitter[curved].mean()) if curved.any() else 0.0,
+            'curved_frames': int(curved.sum()),
+            'offset_diff_mean': float(np.abs(offsets - reference).mean()),
+            'both_lanes_%': 100.0 * float(found.mean())
+        })
+    return rows
+
+
+def bench_backends(frames: List[np.ndarray], backends: Sequence[str],
+                   backend_options: Optional[Dict[str, Dict]] = None,
+                   agreement_px: float = 10.0) -> List[Dict]:
+    """
+    Run lane backends side by side on the same frames.
+    Agreement is measured against the first backend in the list, overall and
+    on frames where both backends found both lanes (diff_both_lanes).
+
+    Args:
+        frames: Frames to process
+        backends: Registered backend names to compare
+        backend_options: Per-backend constructor options
+        agreement_px: Offset difference counted as agreeing
+
+    Returns:
+        One result row per available backend
+    """
+    backend_options = backend_options or {}
+    rows = []
+    reference = None
+    reference_found = None
+    for name in backends:
+        options = backend_options.get(name, {})
+        if not create_lane_backend(name, **options).is_initialized:
+            logger.warning(f"Skipping unavailable lane backend: {name}")
+            continue
+
+        detector = LaneDetector(backend=name, backend_options=options)
+        latencies, offsets, found = run_lane_detector(detector, frames)
+        stats = summarize_latencies(latencies)
+        if reference is None:
+            reference = offsets
+        difference = np.abs(offsets - reference)
+        if reference_found is None:
+            reference_found = found
+        both = found & reference_found
+        rows.append({
+            'backend': name,
+            'mean_ms': stats['mean'],
+            'p50_ms': stats['p50'],
+            'p90_ms': stats['p90'],
+            'p99_ms': stats['p99'],
+            'offset_diff_mean': float(difference.mean()),
+            'agree_%': 100.0 * float((difference <= agreement_px).mean()),
+            'diff_both_lanes': float(difference[both].mean()) if both.any() else 0.0,
+            'both_lanes_%': 100.0 * float(found.mean())
+        })
+    return rows
+
+
+COLOR_STAGES = ['preprocess', 'edges', 'color_mask', 'color_fuse', 'roi_mask', 'hough', 'lane_center', 'total']
+
+
+def bench_color_mask(frames: List[np.ndarray], canny_low: int = 50,
+                     canny_high: int = 150) -> List[Dict]:
+    """
+    Per-stage cost and segment counts of the paint color stage fusion modes.
+
+    Args:
+        frames: Frames to process
+        canny_low: Lower Canny threshold (lower finds fainter paint)
+        canny_high: Upper Canny threshold
+
+    Returns:
+        One result row per fusion mode, with mean milliseconds per stage
+    """
+    rows = []
+    reference = None
+    for fusion in (None, 'and', 'or'):
+        detector = LaneDetector(canny_low=canny_low, canny_high=canny_high, color_fusion=fusion)
+        segments = []
+        offsets = []
+        found = []
+        for frame in frames:
+            result = detector.detect(frame)
+            segments.append(0 if result['lines'] is None else len(result['lines']))
+            offsets.append(result['offset'])
+            found.append(result.get('left_intercept') is not None and
+                         result.get('right_intercept') is not None)
+        offsets = np.asarray(offsets, dtype=np.float64)
+        if reference is None:
+            reference = offsets
+
+        timings = detector.get_stage_timings()
+        row = {'fusion': fusion or 'off'}
+        row.update({stage: timings.get(stage, 0.0) for stage in COLOR_STAGES})
+        row.update({
+            'segments': float(np.mean(segments)),
+            'offset_diff_mean': float(np.abs(offsets - reference).mean()),
+            'both_lanes_%': 100.0 * float(np.mean(found))
+        })
+        rows.append(row)
+    return rows
+
+
+def bench_line_fitters(frames: List[np.ndarray], iteration_budgets: Sequence[int]) -> List[Dict]:
+    """
+    Latency distribution of the line-fitting step alone: HoughLinesP against
+    RANSAC fits, both run on the same masked edge crop of every frame.
+
+    Args:
+        frames: Frames to process
+        iteration_budgets: RANSAC iteration budgets to compare
+
+    Returns:
+        One result row per fitter
+    """
+    detector = LaneDetector()
+    fitters = [('hough', None)] + [(f'ransac-{n}', RansacBackend(iterations=n)) for n in iteration_budgets]
+    samples = {name: [] for name, _ in fitters}
+    lane_counts = {name: [] for name, _ in fitters}
+
+    for frame in frames:
+        # Masked edges exactly as the Hough pipeline produces them
+        x0, y0, x1, y1 = detector._get_roi_rect(frame.shape)
+        edges = detector._detect_edges(detector._preprocess_frame(frame[y0:y1, x0:x1]))
+        masked_edges = detector._apply_roi_mask(edges, frame.shape)
+
+        for name, fitter in fitters:
+            start = time.perf_counter()
+            if fitter is None:
+                lines = detector._hough_on_crop(masked_edges)
+            else:
+                lines = fitter.fit_lines(detector, masked_edges)
+            samples[name].append((time.perf_counter() - start) * 1000.0)
+            _, left, right = calculate_lane_center(lines, frame.shape[1], frame.shape[0])
+            lane_counts[name].append((left is not None) + (right is not None))
+
+    rows = []
+    for name, _ in fitters:
+        stats = summarize_latencies(samples[name])
+        rows.append({
+            'fitter': name,
+            'mean_ms': stats['mean'],
+            'p50_ms': stats['p50'],
+            'p90_ms': stats['p90'],
+            'p99_ms': stats['p99'],
+            'max_ms': stats['max'],
+            'lanes_per_frame': float(np.mean(lane_counts[name]))
+        })
+    return rows
+
+
+def _calculate_lane_center_loop(lines, image_width: int, image_height: int = 720):
+    """Reference per-segment Python loop implementation of utils.calculate_lane_center."""
+    if lines is None or len(lines) == 0:
+        return None, None, None
+
+    left_x_intercepts = []
+    right_x_intercepts = []
+    for line in lines:
+        x1, y1, x2, y2 = line[0]
+        slope = (y2 - y1) / (x2 - x1) if x2 != x1 else float('inf')
+        if abs(slope) < 0.5 or abs(slope) > 2.0:
+            continue
+        b = y1 - slope * x1
+        x_intercept = (image_height - b) / slope
+        if slope < 0:
+            left_x_intercepts.append(x_intercept)
+        else:
+            right_x_intercepts.append(x_intercept)
+
+    left_intercept = np.median(left_x_intercepts) if left_x_intercepts else None
+    right_intercept = np.median(right_x_intercepts) if right_x_intercepts else None
+
+    if left_intercept is not None and right_intercept is not None:
+        return (left_intercept + right_intercept) / 2, left_intercept, right_intercept
+    elif left_intercept is not None:
+        return left_intercept + 200, left_intercept, None
+    elif right_intercept is not None:
+        return right_intercept - 200, None, right_intercept
+    return None, None, None
+
+
+def _random_segments(count: int, width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """Random HoughLinesP-style segments, shape (count, 1, 4) int32."""
+    x = rng.integers(0, width, size=(count, 2))
+    y = rng.integers(height // 2, height, size=(count, 2))
+    return np.stack([x[:, 0], y[:, 0], x[:, 1], y[:, 1]], axis=1).reshape(-1, 1, 4).astype(np.int32)
+
+
+def bench_lane_center(counts: Sequence[int], repeats: int = 200,
+                      width: int = 1280, height: int = 720) -> List[Dict]:
+    """
+    Micro-benchmark of the vectorized calculate_lane_center against the loop version.
+
+    Args:
+        counts: Segment counts per call to test
+        repeats: Calls timed per count
+
+    Returns:
+        One result row per segment count
+    """
+    rng = np.random.default_rng(0)
+    rows = []
+    for count in counts:
+        batches = [_random_segments(count, width, height, rng) for _ in range(repeats)]
+
+        # Both implementations must agree before timing means anything
+        for lines in batches[:20]:
+            expected = _calculate_lane_center_loop(lines, width, height)
+            actual = calculate_lane_center(lines, width, height)
+            for e, a in zip(expected, actual):
+                assert (e is None and a is None) or np.isclose(e, a), "Implementations disagree"
+
+        start = time.perf_counter()
+        for lines in batches:
+            _calculate_lane_center_loop(lines, width, height)
+        loop_us = (time.perf_counter() - start) / repeats * 1e6
+
+        start = time.perf_counter()
+        for lines in batches:
+            calculate_lane_center(lines, width, height)
+        vector_us = (time.perf_counter() - start) / repeats * 1e6
+
+        start = time.perf_counter()
+        for lines in batches:
+            calculate_lane_center(lines, width, height, weight_by_length=True)
+        weighted_us = (time.perf_counter() - start) / repeats * 1e6
+
+        rows.append({
+            'segments': count,
+            'loop_us': loop_us,
+            'vectorized_us': vector_us,
+            'weighted_us': weighted_us,
+            'speedup': loop_us / vector_us if vector_us > 0 else 0.0
+        })
+    return rows
+
+
+def _decode_ssd_loop(raw_detections: np.ndarray, frame_shape, confidence_threshold: float,
+                     target_classes: set) -> List[Detection]:
+    """Reference per-row Python loop SSD decoding (no NMS), as detect_objects used to do it."""
+    h, w = frame_shape
+    results = []
+    for i in range(raw_detections.shape[2]):
+        confidence = raw_detections[0, 0, i, 2]
+        if confidence < confidence_threshold:
+            continue
+        class_id = int(raw_detections[0, 0, i, 1])
+        if class_id not in target_classes:
+            continue
+        box = raw_detections[0, 0, i, 3:7] * np.array([w, h, w, h])
+        x1, y1, x2, y2 = box.astype(int)
+        label = VOC_CLASSES[class_id] if class_id < len(VOC_CLASSES) else f"class_{class_id}"
+        results.append(Detection(class_id, label, float(confidence),
+                                 (max(0, x1), max(0, y1), min(w, x2), min(h, y2))))
+    return results
+
+
+def _random_ssd_output(rows: int, vehicles: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Synthetic MobileNet-SSD output: a few confident vehicles, each also reported
+    as a second vehicle class with a jittered box, over low-confidence clutter.
+    """
+    output = np.zeros((1, 1, rows, 7), dtype=np.float32)
+    output[0, 0, :, 1] = rng.integers(1, len(VOC_CLASSES), size=rows)
+    output[0, 0, :, 2] = rng.uniform(0.0, 0.3, size=rows)
+    corners = rng.uniform(0.0, 0.8, size=(rows, 2))
+    output[0, 0, :, 3:5] = corners
+    output[0, 0, :, 5:7] = corners + rng.uniform(0.05, 0.2, size=(rows, 2))
+
+    for i in range(min(vehicles, rows // 2)):
+        for j, class_id in enumerate((7, 6)):
+            row = output[0, 0, 2 * i + j]
+            row[1] = class_id
+            row[2] = rng.uniform(0.6, 0.99)
+            if j == 1:
+                row[3:7] = output[0, 0, 2 * i, 3:7] + rng.uniform(-0.01, 0.01, size=4)
+    return output
+
+
+def bench_ssd_decode(vehicle_counts: Sequence[int], repeats: int = 500, rows: int = 100,
+                     confidence_threshold: float = 0.5, frame_shape=(720, 1280)) -> List[Dict]:
+    """
+    Micro-benchmark of SSD output post-processing: per-row loop vs vectorized decode.
+
+    Args:
+        vehicle_counts: Confident vehicles per synthetic output (each reported twice)
+        repeats: Outputs decoded per count
+        rows: Output rows per inference (100 for MobileNet-SSD)
+
+    Returns:
+        One result row per vehicle count
+    """
+    rng = np.random.default_rng(0)
+    results = []
+    for vehicles in vehicle_counts:
+        outputs = [_random_ssd_output(rows, vehicles, rng) for _ in range(repeats)]
+
+        # Without NMS both decoders must produce the same detections
+        for raw in outputs[:20]:
+            expected = _decode_ssd_loop(raw, frame_shape, confidence_threshold, VEHICLE_CLASS_IDS)
+            actual = decode_ssd_detections(raw, frame_shape, confidence_threshold,
+                                           VEHICLE_CLASS_IDS, nms_threshold=None)
+            assert expected == actual, "Decoders disagree"
+
+        start = time.perf_counter()
+        for raw in outputs:
+            loop_count = len(_decode_ssd_loop(raw, frame_shape, confidence_threshold, VEHICLE_CLASS_IDS))
+        loop_us = (time.perf_counter() - start) / repeats * 1e6
+
+        start = time.perf_counter()
+        for raw in outputs:
+            decode_ssd_detections(raw, frame_shape, confidence_threshold,
+                                  VEHICLE_CLASS_IDS, nms_threshold=None)
+        vector_us = (time.perf_counter() - start) / repeats * 1e6
+
+        start = time.perf_counter()
+        for raw in outputs:
+            nms_count = len(decode_ssd_detections(raw, frame_shape, confidence_threshold,
+                                                  VEHICLE_CLASS_IDS))
+        nms_us = (time.perf_counter() - start) / repeats * 1e6
+
+        results.append({
+            'vehicles': vehicles,
+            'loop_us': loop_us,
+            'vectorized_us': vector_us,
+            'vectorized_nms_us': nms_us,
+            'boxes': loop_count,
+            'boxes_after_nms': nms_count
+        })
+    return results
+
+
+def load_box_labels(labels_path: str) -> Dict[int, np.ndarray]:
+    """
+    Read ground-truth vehicle boxes from a JSONL file.
+
+    Each line is {"frame": <zero-based index>, "boxes": [[x1, y1, x2, y2], ...]};
+    frames without a line have no vehicles.
+
+    Returns:
+        Frame index -> boxes, shape (N, 4)
+    """
+    labels = {}
+    with open(labels_path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                labels[int(record['frame'])] = np.asarray(record['boxes'], dtype=np.float64).reshape(-1, 4)
+    return labels
+
+
+def _count_matches(detected: np.ndarray, expected: np.ndarray, iou_threshold: float) -> int:
+    """Expected boxes matched one-to-one by a detected box at iou_threshold or more."""
+    if len(detected) == 0 or len(expected) == 0:
+        return 0
+    return len(greedy_assignment(iou_matrix(expected, detected), iou_threshold - 1e-9))
+
+
+def bench_models(frames: List[np.ndarray], models: Sequence[str], model_dir: str = "models",
+                 labels: Optional[Dict[int, np.ndarray]] = None,
+                 confidence_threshold: float = 0.5, iou_threshold: float = 0.5) -> List[Dict]:
+    """
+    Run FCW models side by side on the same frames.
+    Recall is measured against the labelled boxes when given, otherwise
+    against the detections of the first model in the list.
+
+    Args:
+        frames: Frames to process
+        models: Registered model names or JSON model spec paths
+        model_dir: Directory model files are resolved against
+        labels: Ground-truth boxes per frame index (see load_box_labels)
+        confidence_threshold: Minimum detection confidence
+        iou_threshold: IoU a detection needs with a reference box to count
+
+    Returns:
+        One result row per available model
+    """
+    rows = []
+    reference = labels
+    for model in models:
+        detector = CollisionDetector(model_dir=model_dir, model=model,
+                                     confidence_threshold=confidence_threshold)
+        if not detector.is_initialized:
+            logger.warning(f"Skipping unavailable FCW model: {model}")
+            continue
+
+        latencies = []
+        boxes = {}
+        for i, frame in enumerate(frames):
+            start = time.perf_counter()
+            detections = detector.detect_objects(frame)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            boxes[i] = np.asarray([det.bbox for det in detections], dtype=np.float64).reshape(-1, 4)
+        if reference is None:
+            reference = boxes
+
+        expected = sum(len(reference.get(i, ())) for i in range(len(frames)))
+        matched = sum(_count_matches(boxes[i], reference.get(i, np.zeros((0, 4))), iou_threshold)
+                      for i in range(len(frames)))
+        stats = summarize_latencies(latencies)
+        rows.append({
+            'model': detector.spec.name,
+            'target': detector.dnn_target,
+            'input': f"{detector.input_size[0]}x{detector.input_size[1]}",
+            'mean_ms': stats['mean'],
+            'p90_ms': stats['p90'],
+            'fps': 1000.0 / stats['mean'] if stats['mean'] > 0 else 0.0,
+            'vehicles_per_frame': sum(len(b) for b in boxes.values()) / max(1, len(frames)),
+            'recall_%': 100.0 * matched / expected if expected else 0.0
+        })
+    return rows
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark OpenLCWS processing options on a recorded clip")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scales_parser = subparsers.add_parser('scales', help='Lane detection accuracy vs FPS across processing scales')
+    scales_parser.add_argument('--video', required=True, help='Recorded clip to benchmark on')
+    scales_parser.add_argument('--frames', type=int, default=300, help='Maximum frames to load (default: 300)')
+    scales_parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35, 0.25],
+                               help='Processing scales to compare')
+
+    tracking_parser = subparsers.add_parser('tracking', help='Lane tracking cost and accuracy vs full search')
+    tracking_parser.add_argument('--video', required=True, help='Recorded clip to benchmark on')
+    tracking_parser.add_argument('--frames', type=int, default=300, help='Maximum frames to load (default: 300)')
+    tracking_parser.add_argument('--intervals', type=int, nargs='+', default=[5, 10, 20],
+                                 help='Full-search intervals to compare')
+
+    birdseye_parser = subparsers.add_parser('birdseye', help="Bird's-eye engine vs Hough engine")
+    birdseye_parser.add_argument('--video', required=True, help='Recorded clip to benchmark on')
+    birdseye_parser.add_argument('--frames', type=int, default=300, help='Maximum frames to load (default: 300)')
+    birdseye_parser.add_argument('--curve-threshold', type=float, default=1e-4,
+                                 help='Quadratic coefficient above which a frame counts as a curve')
+
+    backends_parser = subparsers.add_parser('backends', help='All lane backends side by side')
+    backends_parser.add_argument('--video', required=True, help='Recorded clip to benchmark on')
+    backends_parser.add_argument('--frames', type=int, default=300, help='Maximum frames to load (default: 300)')
+    backends_parser.add_argument('--backends', nargs='+', default=get_available_lane_backends(),
+                                 help='Backends to compare; agreement is measured against the first')
+    backends_parser.add_argument('--lane-model', type=str, default=None,
+                                 help='Model file for the segmentation backend')
+
+    color_parser = subparsers.add_parser('color-mask', help='Paint color stage cost breakdown per fusion mode')
+    color_parser.add_argument('--video', required=True, help='Recorded clip to benchmark on')
+    color_parser.add_argument('--frames', type=int, default=300, help='Maximum frames to load (default: 300)')
+    color_parser.add_argument('--canny-low', type=int, default=50, help='Lower Canny threshold (default: 50)')
+    color_parser.add_argument('--canny-high', type=int, default=150, help='Upper Canny threshold (default: 150)')
+
+    fitters_parser = subparsers.add_parser('line-fit', help='HoughLinesP vs RANSAC line-fit latency')
+    fitters_parser.add_argument('--video', required=True, help='Recorded clip to benchmark on')
+    fitters_parser.add_argument('--frames', type=int, default=300, help='Maximum frames to load (default: 300)')
+    fitters_parser.add_argument('--iterations', type=int, nargs='+', default=[32, 64, 128],
+                                help='RANSAC iteration budgets to compare')
+
+    center_parser = subparsers.add_parser('lane-center',
+                                          help='Micro-benchmark of utils.calculate_lane_center')
+    center_parser.add_argument('--segments', type=int, nargs='+', default=[10, 50, 200, 500],
+                               help='Segment counts per call')
+    center_parser.add_argument('--repeats', type=int, default=200, help='Calls timed per count')
+
+    ssd_parser = subparsers.add_parser('ssd-decode',
+                                       help='Micro-benchmark of MobileNet-SSD output decoding and NMS')
+    ssd_parser.add_argument('--vehicles', type=int, nargs='+', default=[0, 2, 8, 20],
+                            help='Confident vehicles per output (each also reported as a second class)')
+    ssd_parser.add_argument('--repeats', type=int, default=500, help='Outputs decoded per count')
+
+    models_parser = subparsers.add_parser('models', help='FCW model latency and recall side by side')
+    models_parser.add_argument('--video', required=True, help='Recorded clip to benchmark on')
+    models_parser.add_argument('--frames', type=int, default=300, help='Maximum frames to load (default: 300)')
+    models_parser.add_argument('--models', nargs='+', default=[DEFAULT_MODEL],
+                               help='Registered model names or JSON model specs; without --labels, '
+                                    'recall is measured against the first')
+    models_parser.add_argument('--model-dir', type=str, default='models', help='Model file directory')
+    models_parser.add_argument('--labels', type=str, default=None,
+                               help='JSONL of ground-truth vehicle boxes per frame index')
+    models_parser.add_argument('--confidence', type=float, default=0.5,
+                               help='Detection confidence threshold (default: 0.5)')
+
+    args = parser.parse_args()
+
+    if args.command == 'scales':
+        frames = load_frames(args.video, args.frames)
+        rows = bench_scales(frames, args.scales)
+        print_table(rows, ['scale', 'fps', 'mean_ms', 'p90_ms', 'offset_err_mean',
+                           'offset_err_p95', 'both_lanes_%', 'ref_both_lanes_%'])
+    elif args.command == 'tracking':
+        frames = load_frames(args.video, args.frames)
+        rows = bench_tracking(frames, args.intervals)
+        print_table(rows, ['interval', 'mean_ms', 'p90_ms', 'tracked_%', 'offset_err_mean',
+                           'offset_err_p95', 'both_lanes_%'])
+    elif args.command == 'birdseye':
+        frames = load_frames(args.video, args.frames)
+        rows = bench_birdseye(frames, args.curve_threshold)
+        print_table(rows, ['backend', 'mean_ms', 'p90_ms', 'jitter_px', 'jitter_curved_px',
+                           'curved_frames', 'offset_diff_mean', 'both_lanes_%'])
+    elif args.command == 'backends':
+        frames = load_frames(args.video, args.frames)
+        options = {name: lane_backend_options(name, args.lane_model) for name in args.backends}
+        rows = bench_backends(frames, args.backends, options)
+        print_table(rows, ['backend', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms',
+                           'offset_diff_mean', 'agree_%', 'diff_both_lanes', 'both_lanes_%'])
+    elif args.command == 'color-mask':
+        frames = load_frames(args.video, args.frames)
+        rows = bench_color_mask(frames, args.canny_low, args.canny_high)
+        print_table(rows, ['fusion'] + COLOR_STAGES + ['segments', 'offset_diff_mean', 'both_lanes_%'])
+    elif args.command == 'line-fit':
+        frames = load_frames(args.video, args.frames)
+        rows = bench_line_fitters(frames, args.iterations)
+        print_table(rows, ['fitter', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'lanes_per_frame'])
+    elif args.command == 'lane-center':
+        rows = bench_lane_center(args.segments, args.repeats)
+        print_table(rows, ['segments', 'loop_us', 'vectorized_us', 'weighted_us', 'speedup'])
+    elif args.command == 'ssd-decode':
+        rows = bench_ssd_decode(args.vehicles, args.repeats)
+        print_table(rows, ['vehicles', 'loop_us', 'vectorized_us', 'vectorized_nms_us',
+                           'boxes', 'boxes_after_nms'])
+    elif args.command == 'models':
+        frames = load_frames(args.video, args.frames)
+        labels = load_box_labels(args.labels) if args.labels else None
+        rows = bench_models(frames, args.models, args.model_dir, labels, args.confidence)
+        if rows:
+            print_table(rows, ['model', 'target', 'input', 'mean_ms', 'p90_ms', 'fps',
+                               'vehicles_per_frame', 'recall_%'])
+
+
+if __name__ == "__main__":
+    main()
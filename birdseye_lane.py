@@ -0,0 +1,237 @@
+"""
+Bird's-eye lane engine for OpenLCWS (Open Lane and Collision Warning System)
+Warps the ROI trapezoid to a top-down view with precomputed remap tables, finds
+lane pixels with a column histogram and sliding windows, and fits second-order
+polynomials, which follow curves that straight Hough segments cannot.
+"""
+
+import cv2
+import numpy as np
+from typing import Tuple, Optional, Dict
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def order_trapezoid(vertices: np.ndarray) -> np.ndarray:
+    """
+    Order a four-point ROI as bottom-left, top-left, top-right, bottom-right.
+
+    Args:
+        vertices: ROI vertices, shape (4, 2) or (1, 4, 2)
+
+    Returns:
+        float32 array of shape (4, 2)
+    """
+    points = np.asarray(vertices, dtype=np.float32).reshape(-1, 2)
+    if len(points) != 4:
+        raise ValueError(f"Bird's-eye warp needs a 4-point ROI, got {len(points)} points")
+
+    by_y = points[np.argsort(points[:, 1])]
+    top = by_y[:2][np.argsort(by_y[:2, 0])]
+    bottom = by_y[2:][np.argsort(by_y[2:, 0])]
+    return np.array([bottom[0], top[0], top[1], bottom[1]], dtype=np.float32)
+
+
+class BirdsEyeLaneEngine:
+    """
+    Sliding-window polynomial lane finder on a top-down view of the ROI.
+    """
+
+    def __init__(self,
+                 warp_size: Tuple[int, int] = (320, 480),
+                 num_windows: int = 9,
+                 window_margin: int = 30,
+                 min_window_pixels: int = 20,
+                 near_field: float = 0.25,
+                 canny_low: int = 50,
+                 canny_high: int = 150):
+        """
+        Initialize the bird's-eye engine.
+
+        Args:
+            warp_size: (width, height) of the top-down view
+            num_windows: Number of sliding windows stacked over the view height
+            window_margin: Half-width of each sliding window (top-down pixels)
+            min_window_pixels: Pixels needed in a window to recenter the next one
+            near_field: Fraction of the ROI height, from the bottom, covered by
+                        the segment reported for each fitted lane
+            canny_low: Lower Canny threshold applied to the top-down view
+            canny_high: Upper Canny threshold applied to the top-down view
+        """
+        self.warp_size = warp_size
+        self.num_windows = num_windows
+        self.window_margin = window_margin
+        self.min_window_pixels = min_window_pixels
+        self.near_field = near_field
+        self.canny_low = canny_low
+        self.canny_high = canny_high
+
+        # Remap tables and the inverse homography, valid until invalidate()
+        self.map1 = None
+        self.map2 = None
+        self.unwarp_matrix = None
+        self.cached_crop_shape = None
+
+        # Reused top-down buffers
+        self.warped = np.empty((warp_size[1], warp_size[0]), dtype=np.uint8)
+        self.warped_edges = np.empty_like(self.warped)
+
+        # Last fitted polynomials x = a*y^2 + b*y + c in top-down pixels
+        self.last_fits: Dict[str, Optional[np.ndarray]] = {'left': None, 'right': None}
+        self.map_builds = 0
+
+    def invalidate(self):
+        """Drop the remap tables (the ROI was edited or the frame size changed)."""
+        self.map1 = None
+        self.map2 = None
+        self.unwarp_matrix = None
+        self.cached_crop_shape = None
+        self.last_fits = {'left': None, 'right': None}
+
+    def _build_maps(self, crop_vertices: np.ndarray, crop_shape: Tuple[int, int]):
+        """
+        Precompute remap tables from the ROI trapezoid to the top-down view.
+
+        Args:
+            crop_vertices: ROI trapezoid in crop pixel coordinates
+            crop_shape: (height, width) of the crop being warped
+        """
+        width, height = self.warp_size
+        # Trapezoid sides land at the quarter lines of the view so lanes
+        # slightly outside the ROI edges are still visible
+        dst = np.array([[width * 0.25, height], [width * 0.25, 0],
+                        [width * 0.75, 0], [width * 0.75, height]], dtype=np.float32)
+        src = order_trapezoid(crop_vertices)
+
+        # Top-down pixel -> crop pixel, evaluated once for the whole grid
+        self.unwarp_matrix = cv2.getPerspectiveTransform(dst, src)
+        grid_x, grid_y = np.meshgrid(np.arange(width, dtype=np.float32),
+                                     np.arange(height, dtype=np.float32))
+        grid = np.stack([grid_x, grid_y], axis=-1).reshape(-1, 1, 2)
+        source = cv2.perspectiveTransform(grid, self.unwarp_matrix).reshape(height, width, 2)
+
+        # Fixed-point maps make cv2.remap noticeably faster than float maps
+        self.map1, self.map2 = cv2.convertMaps(source[..., 0], source[..., 1], cv2.CV_16SC2)
+        self.cached_crop_shape = crop_shape
+        self.map_builds += 1
+
+    def find_lane_lines(self, processed: np.ndarray, roi_vertices: np.ndarray,
+                        origin: Tuple[int, int], scale: float) -> Optional[np.ndarray]:
+        """
+        Find lanes in a preprocessed ROI crop.
+
+        Args:
+            processed: Blurred grayscale ROI crop at processing resolution
+            roi_vertices: ROI polygon in full-frame coordinates
+            origin: (x0, y0) of the crop in the full frame
+            scale: Processing resolution relative to the full frame
+
+        Returns:
+            One near-field segment per fitted lane in full-frame coordinates,
+            shape (N, 1, 4), or None when no lane was found
+        """
+        # Step 1: Warp the crop to the top-down view
+        if self.map1 is None or self.cached_crop_shape != processed.shape[:2]:
+            crop_vertices = (np.asarray(roi_vertices, dtype=np.float32).reshape(-1, 2)
+                             - np.array(origin, dtype=np.float32)) * scale
+            self._build_maps(crop_vertices, processed.shape[:2])
+        # Replicated borders keep the view edges from showing up as lane pixels
+        cv2.remap(processed, self.map1, self.map2, cv2.INTER_LINEAR, dst=self.warped,
+                  borderMode=cv2.BORDER_REPLICATE)
+
+        # Step 2: Lane pixels are the edges of the top-down view
+        cv2.Canny(self.warped, self.canny_low, self.canny_high, edges=self.warped_edges)
+        ys, xs = np.nonzero(self.warped_edges)
+        if len(xs) == 0:
+            self.last_fits = {'left': None, 'right': None}
+            return None
+
+        # Step 3: Window bases from the column histogram of the lower half,
+        # smoothed over a window width so long solid lines outweigh single
+        # columns of dashes or texture
+        height = self.warp_size[1]
+        histogram = np.count_nonzero(self.warped_edges[height // 2:], axis=0).astype(np.float32)
+        kernel = np.ones(self.window_margin, dtype=np.float32)
+        histogram = np.convolve(histogram, kernel, mode='same')
+        midpoint = self.warp_size[0] // 2
+        bases = {'left': int(np.argmax(histogram[:midpoint])),
+                 'right': midpoint + int(np.argmax(histogram[midpoint:]))}
+
+        segments = []
+        for side in ('left', 'right'):
+            # Start from the previous fit while it still has support
+            base = bases[side]
+            previous = self.last_fits[side]
+            if previous is not None:
+                predicted = int(np.clip(np.polyval(previous, height - 1), 0, self.warp_size[0] - 1))
+                if histogram[predicted] > 0:
+                    base = predicted
+
+            fit = None
+            if histogram[base] > 0:
+                fit = self._fit_side(xs, ys, base)
+            self.last_fits[side] = fit
+            if fit is not None:
+                segments.append(self._near_field_segment(fit, origin, scale))
+
+        if not segments:
+            return None
+        return np.round(np.array(segments)).astype(np.int32).reshape(-1, 1, 4)
+
+    def _fit_side(self, xs: np.ndarray, ys: np.ndarray, base_x: int) -> Optional[np.ndarray]:
+        """
+        Collect one lane's pixels with sliding windows and fit x = f(y).
+
+        Args:
+            xs: x coordinates of all lane pixels in the top-down view
+            ys: y coordinates of all lane pixels in the top-down view
+            base_x: Histogram peak where the bottom window starts
+
+        Returns:
+            Second-order polynomial coefficients, or None if too few pixels
+        """
+        height = self.warp_size[1]
+        window_height = height / self.num_windows
+        current_x = base_x
+        selected = np.zeros(len(xs), dtype=bool)
+
+        for window in range(self.num_windows):
+            y_high = height - window * window_height
+            y_low = y_high - window_height
+            in_window = ((ys >= y_low) & (ys < y_high) &
+                         (np.abs(xs - current_x) <= self.window_margin))
+            selected |= in_window
+            if np.count_nonzero(in_window) >= self.min_window_pixels:
+                current_x = int(xs[in_window].mean())
+
+        if np.count_nonzero(selected) < 3 * self.min_window_pixels:
+            return None
+        return np.polyfit(ys[selected], xs[selected], 2)
+
+    def _near_field_segment(self, fit: np.ndarray, origin: Tuple[int, int],
+                            scale: float) -> np.ndarray:
+        """
+        Map the near-field part of a fitted lane back to a full-frame segment.
+
+        Args:
+            fit: Polynomial coefficients in top-down pixels
+            origin: (x0, y0) of the crop in the full frame
+            scale: Processing resolution relative to the full frame
+
+        Returns:
+            Segment as [x_bottom, y_bottom, x_top, y_top]
+        """
+        height = self.warp_size[1]
+        ys = np.array([height, height * (1.0 - self.near_field)], dtype=np.float64)
+        points = np.stack([np.polyval(fit, ys), ys], axis=1).reshape(-1, 1, 2)
+        crop_points = cv2.perspectiveTransform(points, self.unwarp_matrix).reshape(-1, 2)
+        frame_points = crop_points / scale + np.array(origin, dtype=np.float64)
+        return frame_points.ravel()
+
+    def curvature_stats(self) -> Dict[str, Optional[float]]:
+        """Quadratic coefficient of each last fit (0 = straight, top-down pixels)."""
+        return {side: (float(fit[0]) if fit is not None else None)
+                for side, fit in self.last_fits.items()}
@@ -0,0 +1,284 @@
+"""
+Optical-flow box propagation for OpenLCWS (Open Lane and Collision Warning System)
+Moves FCW boxes between DNN inferences by tracking feature points inside each box
+with pyramidal Lucas-Kanade, so box scale and TTC update at camera rate while the
+detector only runs a few times per second.
+"""
+
+import cv2
+import numpy as np
+import time
+from collections import deque
+from typing import List, Optional, Dict, Tuple
+import logging
+
+from collision_detector import Detection, TrackedObject
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PropagatedTrack:
+    """A tracked box and its feature points between inferences."""
+
+    def __init__(self, obj: TrackedObject, box: np.ndarray, timestamp: float,
+                 h_dot_smoothed: float, motion: deque):
+        self.track_id = obj.track_id
+        self.age = obj.age
+        self.class_id = obj.detection.class_id
+        self.label = obj.label
+        self.confidence = obj.confidence
+        self.box = box  # float (x1, y1, x2, y2) in frame coordinates
+        self.timestamp = timestamp
+        self.h_dot_smoothed = h_dot_smoothed
+        self.ttc = float('inf')
+        self.points: Optional[np.ndarray] = None  # (K, 1, 2) float32, work coordinates
+        # Cumulative (timestamp, center shift, scale) of the propagated motion;
+        # kept across reconciles since box corrections are not motion
+        self.motion = motion
+
+    def motion_since(self, timestamp: float) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Propagated center shift and scale from the frame at timestamp to now.
+
+        Returns:
+            (shift, scale), or None if timestamp is older than the kept history
+        """
+        if not self.motion or self.motion[0][0] > timestamp:
+            return None
+        past = self.motion[0]
+        for entry in self.motion:
+            if entry[0] > timestamp:
+                break
+            past = entry
+        latest = self.motion[-1]
+        return latest[1] - past[1], latest[2] / past[2]
+
+
+class BoxPropagator:
+    """
+    Per-frame box propagation with sparse Lucas-Kanade optical flow.
+
+    step() moves every box by the median flow of its points and scales it by
+    the change in point spread; the scale change drives the same height-rate
+    TTC estimate the detector uses. reconcile() takes over new inference
+    results, carrying them forward by the motion propagated since the frame
+    they were computed on.
+    """
+
+    def __init__(self,
+                 work_width: int = 640,
+                 max_points: int = 40,
+                 min_points: int = 8,
+                 lk_window: Tuple[int, int] = (15, 15),
+                 lk_levels: int = 2,
+                 ema_alpha: float = 0.15,
+                 history_length: int = 60):
+        """
+        Initialize the propagator.
+
+        Args:
+            work_width: Width frames are downscaled to for optical flow
+            max_points: Feature points tracked per box
+            min_points: Points below which a box is reseeded with new features
+            lk_window: Lucas-Kanade search window (work pixels)
+            lk_levels: Pyramid levels above the base image
+            ema_alpha: EMA smoothing factor for the per-frame height derivative
+                       (lower than the detector's, as samples come more often)
+            history_length: Motion samples kept per track for reconciliation
+        """
+        self.work_width = work_width
+        self.max_points = max_points
+        self.min_points = min_points
+        self.lk_params = dict(winSize=lk_window, maxLevel=lk_levels,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.ema_alpha = ema_alpha
+        self.history_length = history_length
+
+        self.tracks: Dict[int, PropagatedTrack] = {}
+        self.prev_gray: Optional[np.ndarray] = None
+        self.frame_shape: Optional[Tuple[int, int]] = None
+        self.work_scale = 1.0
+        self.last_timestamp: Optional[float] = None
+
+        # Statistics
+        self.propagated_frames = 0
+        self.total_step_time = 0.0
+        self.reconciles = 0
+
+    def _to_work_gray(self, frame: np.ndarray) -> np.ndarray:
+        """Downscale to the work width and convert to grayscale."""
+        h, w = frame.shape[:2]
+        if self.frame_shape != (h, w):
+            self.frame_shape = (h, w)
+            self.work_scale = min(1.0, self.work_width / float(w))
+            self.prev_gray = None
+        if self.work_scale < 1.0:
+            size = (int(round(w * self.work_scale)), int(round(h * self.work_scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def _seed_points(self, track: PropagatedTrack, gray: np.ndarray):
+        """Pick corner features in the inner part of a track's box."""
+        x1, y1, x2, y2 = track.box * self.work_scale
+        # Inner 80% of the box, to stay off the background around the vehicle
+        mx, my = 0.1 * (x2 - x1), 0.1 * (y2 - y1)
+        x1, x2 = int(max(0, x1 + mx)), int(min(gray.shape[1], x2 - mx))
+        y1, y2 = int(max(0, y1 + my)), int(min(gray.shape[0], y2 - my))
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            track.points = None
+            return
+
+        corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.max_points,
+                                          qualityLevel=0.01, minDistance=3)
+        if corners is None:
+            track.points = None
+            return
+        track.points = (corners + np.array([x1, y1], dtype=np.float32)).astype(np.float32)
+
+    def step(self, frame: np.ndarray, timestamp: float):
+        """
+        Propagate every box to a new frame.
+
+        Args:
+            frame: BGR frame
+            timestamp: Capture time of the frame in seconds
+        """
+        start = time.perf_counter()
+        gray = self._to_work_gray(frame)
+        dt = timestamp - self.last_timestamp if self.last_timestamp is not None else 0.0
+
+        tracks = [t for t in self.tracks.values() if t.points is not None]
+        if self.prev_gray is not None and tracks and dt > 0:
+            # Step 1: One LK call for the points of all boxes
+            counts = [len(t.points) for t in tracks]
+            old_points = np.concatenate([t.points for t in tracks])
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, old_points,
+                                                             None, **self.lk_params)
+            status = status.reshape(-1).astype(bool)
+
+            # Step 2: Per-box translation and scale from its surviving points
+            offset = 0
+            for track, count in zip(tracks, counts):
+                good = status[offset:offset + count]
+                old = old_points[offset:offset + count][good].reshape(-1, 2)
+                new = new_points[offset:offset + count][good].reshape(-1, 2)
+                offset += count
+                self._move_track(track, old, new, dt, timestamp)
+                track.points = new.reshape(-1, 1, 2) if len(new) else None
+
+        # Step 3: Reseed boxes that lost too many points
+        for track in self.tracks.values():
+            if track.points is None or len(track.points) < self.min_points:
+                self._seed_points(track, gray)
+
+        self.prev_gray = gray
+        self.last_timestamp = timestamp
+        if tracks:
+            self.propagated_frames += 1
+            self.total_step_time += time.perf_counter() - start
+
+    def _move_track(self, track: PropagatedTrack, old: np.ndarray, new: np.ndarray,
+                    dt: float, timestamp: float):
+        """Apply the median flow of a box's points and update its TTC."""
+        if len(old) < 3:
+            return
+
+        center_old = np.median(old, axis=0)
+        center_new = np.median(new, axis=0)
+        spread_old = np.median(np.linalg.norm(old - center_old, axis=1))
+        spread_new = np.median(np.linalg.norm(new - center_new, axis=1))
+        scale = spread_new / spread_old if spread_old > 1.0 else 1.0
+
+        # Scale the box about its center, then shift it by the median flow
+        box = track.box
+        center = (box[:2] + box[2:]) / 2.0 + (center_new - center_old) / self.work_scale
+        half_size = (box[2:] - box[:2]) / 2.0 * scale
+        h_old = box[3] - box[1]
+        track.box = np.concatenate([center - half_size, center + half_size])
+        h_new = track.box[3] - track.box[1]
+
+        # Same height-rate TTC as CollisionDetector.calculate_ttc
+        h_dot_raw = (h_new - h_old) / dt
+        track.h_dot_smoothed = (self.ema_alpha * h_dot_raw +
+                                (1 - self.ema_alpha) * track.h_dot_smoothed)
+        track.ttc = h_new / track.h_dot_smoothed if track.h_dot_smoothed > 1.0 else float('inf')
+        track.timestamp = timestamp
+        _, total_shift, total_scale = track.motion[-1]
+        track.motion.append((timestamp, total_shift + (center_new - center_old) / self.work_scale,
+                             total_scale * scale))
+
+    def reconcile(self, tracked: List[TrackedObject], source_timestamp: float):
+        """
+        Take over the tracks of a new inference result.
+
+        Boxes of tracks that were already propagated are moved and scaled by
+        the motion propagated since source_timestamp, and keep their per-frame
+        height derivative; new tracks start from the detector's estimate.
+        Tracks missing from the result are dropped.
+
+        Args:
+            tracked: Tracked objects from CollisionDetector.calculate_ttc
+            source_timestamp: Capture time of the frame the result was computed on
+        """
+        now = self.last_timestamp if self.last_timestamp is not None else source_timestamp
+        tracks = {}
+        for obj in tracked:
+            box = np.array(obj.bbox, dtype=np.float64)
+            h_dot_smoothed = obj.h_dot_smoothed
+
+            previous = self.tracks.get(obj.track_id)
+            if previous is not None:
+                motion = previous.motion
+                since = previous.motion_since(source_timestamp)
+                if since is not None:
+                    # Carry the detection forward by the motion since its frame
+                    shift, scale = since
+                    center = (box[:2] + box[2:]) / 2.0 + shift
+                    half_size = (box[2:] - box[:2]) / 2.0 * scale
+                    box = np.concatenate([center - half_size, center + half_size])
+                h_dot_smoothed = previous.h_dot_smoothed
+            else:
+                motion = deque([(now, np.zeros(2), 1.0)], maxlen=self.history_length)
+
+            track = PropagatedTrack(obj, box, now, h_dot_smoothed, motion)
+            height = box[3] - box[1]
+            track.ttc = height / h_dot_smoothed if h_dot_smoothed > 1.0 else float('inf')
+            if self.prev_gray is not None:
+                self._seed_points(track, self.prev_gray)
+            tracks[obj.track_id] = track
+
+        self.tracks = tracks
+        self.reconciles += 1
+
+    def get_tracks(self) -> List[TrackedObject]:
+        """
+        Current propagated tracks as TrackedObject instances.
+
+        Returns:
+            List of TrackedObject with propagated boxes and TTC
+        """
+        results = []
+        for track in self.tracks.values():
+            box = track.box
+            if self.frame_shape is not None:
+                h, w = self.frame_shape
+                box = np.clip(box, 0, [w, h, w, h])
+            detection = Detection(track.class_id, track.label, track.confidence,
+                                  tuple(int(v) for v in np.round(box)))
+            obj = TrackedObject(detection, track.timestamp, track_id=track.track_id, age=track.age)
+            obj.h_dot_smoothed = track.h_dot_smoothed
+            obj.ttc = track.ttc
+            results.append(obj)
+        return results
+
+    def get_stats(self) -> Dict:
+        """Get propagation statistics."""
+        return {
+            'tracks': len(self.tracks),
+            'propagated_frames': self.propagated_frames,
+            'mean_step_ms': (self.total_step_time / self.propagated_frames * 1000.0
+                             if self.propagated_frames else 0.0),
+            'reconciles': self.reconciles
+        }
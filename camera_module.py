@@ -5,21 +5,47 @@ Handles frame capture from live webcam or demo video files.
 
 import cv2
 import os
-from typing import Optional, Tuple
+import threading
+import time
+from typing import Optional, Set, Tuple, NamedTuple
 import logging
+import numpy as np
+
+from core_budget import pin_current_thread
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class CapturedFrame(NamedTuple):
+    """A captured frame tagged with its capture time and sequence number."""
+    image: np.ndarray
+    frame_id: int                  # Monotonically increasing per CameraModule
+    capture_time: float            # time.monotonic() when the frame was read
+    pos_msec: Optional[float]      # CAP_PROP_POS_MSEC in the video file (None for webcams)
+    media_time: Optional[float]    # Playback clock in seconds, continuous across video loops
+
+    @property
+    def timestamp(self) -> float:
+        """
+        Timestamp for time-based calculations (TTC, alert timing).
+        Uses the media clock for video files so results follow playback speed.
+        """
+        if self.media_time is not None:
+            return self.media_time
+        return self.capture_time
+
+
 class CameraModule:
     """
     Camera module for capturing frames from webcam or video files.
     """
     
     def __init__(self, source: str = 'live', video_path: str = None, 
-                 resolution: Tuple[int, int] = (1280, 720), fps: int = 30):
+                 resolution: Tuple[int, int] = (1280, 720), fps: int = 30,
+                 threaded: bool = False, loop: bool = True,
+                 capture_cores: Optional[Set[int]] = None):
         """
         Initialize camera module.
         
@@ -28,15 +54,43 @@ class CameraModule:
             video_path: Path to video file (required for demo mode)
             resolution: Camera resolution (width, height)
             fps: Target frame rate
+            threaded: Grab frames on a background thread and keep only the newest
+                      (live mode only)
+            loop: Restart the video when it ends (demo mode only)
+            capture_cores: Cores to pin the background capture thread to (None = any)
         """
         self.source = source
         self.video_path = video_path
         self.resolution = resolution
         self.fps = fps
+        self.loop = loop
         self.cap = None
         self.is_initialized = False
+        self.end_of_stream = False
+        
+        # Background capture state (live mode only)
+        self.threaded = threaded and source == 'live'
+        self.capture_cores = capture_cores
+        self._capture_lock = threading.Lock()
+        self._frame_arrived = threading.Condition(self._capture_lock)
+        self._capture_thread: Optional[threading.Thread] = None
+        self._capture_running = False
+        self._latest_frame: Optional[CapturedFrame] = None
+        self._consumed_id = 0       # frame_id last handed to the caller
+        self.frames_captured = 0
+        self.frames_dropped = 0     # Grabbed but overwritten before anyone read them
+        self.frames_duplicated = 0  # Same frame handed out more than once
+        
+        # Frame stamping state
+        self._next_frame_id = 0
+        self._media_offset_ms = 0.0  # Accumulated playback time from earlier video loops
+        self._last_media_ms = 0.0
+        self._video_fps = float(fps)
         
         self._initialize_camera()
+        
+        if self.threaded and self.is_initialized:
+            self.start_capture_thread()
     
     def _initialize_camera(self):
         """Initialize camera or video capture based on source."""
@@ -74,6 +128,9 @@ class CameraModule:
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
         self.cap.set(cv2.CAP_PROP_FPS, self.fps)
         
+        # Keep the driver queue short so reads return recent frames
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
         # Verify settings
         actual_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         actual_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -102,6 +159,8 @@ class CameraModule:
         video_fps = self.cap.get(cv2.CAP_PROP_FPS)
         video_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         video_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if video_fps > 0:
+            self._video_fps = video_fps
         
         logger.info(f"Video properties - Frames: {total_frames}, FPS: {video_fps:.2f}, "
                    f"Resolution: {video_width}x{video_height}")
@@ -115,26 +174,195 @@ class CameraModule:
         Returns:
             Tuple of (success, frame) where success is boolean and frame is numpy array
         """
+        captured = self.read_frame()
+        if captured is None:
+            return False, None
+        return True, captured.image
+    
+    def read_frame(self, timeout: float = 1.0) -> Optional[CapturedFrame]:
+        """
+        Capture a frame from camera or video along with its timing metadata.
+        
+        With threaded capture this blocks until the capture thread delivers a
+        frame newer than the last one returned, so callers never process the
+        same frame twice.
+        
+        Args:
+            timeout: Seconds to wait for a new frame (threaded capture only)
+        
+        Returns:
+            CapturedFrame, or None if no frame could be read
+        """
         if not self.is_initialized or self.cap is None:
             logger.error("Camera not initialized")
-            return False, None
+            return None
         
-        ret, frame = self.cap.read()
+        if self._capture_running:
+            # The capture thread owns cap.read(); wait for its next frame instead
+            return self._wait_for_new_frame(timeout)
         
-        if not ret:
+        captured = self._read_capture()
+        
+        if captured is None:
             if self.source == 'demo':
                 logger.info("End of video reached")
-                # Reset video to beginning
+                if not self.loop:
+                    self.end_of_stream = True
+                    return None
+                # Reset video to beginning, keeping the media clock continuous
+                self._media_offset_ms = self._last_media_ms + 1000.0 / self._video_fps
                 self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret, frame = self.cap.read()
-                if not ret:
+                captured = self._read_capture()
+                if captured is None:
                     logger.error("Failed to reset video")
-                    return False, None
+                    return None
             else:
                 logger.error("Failed to capture frame from webcam")
-                return False, None
+                return None
+        
+        return captured
+    
+    def _read_capture(self) -> Optional[CapturedFrame]:
+        """Read one frame from the capture device and stamp it."""
+        ret, frame = self.cap.read()
+        capture_time = time.monotonic()
+        if not ret:
+            return None
+        
+        pos_msec = None
+        media_time = None
+        if self.source == 'demo':
+            pos_msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            self._last_media_ms = self._media_offset_ms + pos_msec
+            media_time = self._last_media_ms / 1000.0
+        
+        self._next_frame_id += 1
+        return CapturedFrame(image=frame, frame_id=self._next_frame_id,
+                             capture_time=capture_time, pos_msec=pos_msec,
+                             media_time=media_time)
+    
+    def seek(self, frame_index: int) -> bool:
+        """
+        Jump to a frame index in the video (demo mode only).
+        Frame IDs continue from the new position so they match the file's frame numbers.
+        
+        Args:
+            frame_index: Zero-based index of the next frame to read
+            
+        Returns:
+            True if the capture accepted the new position
+        """
+        if self.source != 'demo' or self.cap is None:
+            return False
+        
+        ok = self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        self._next_frame_id = frame_index
+        self.end_of_stream = False
+        return bool(ok)
+    
+    def start_capture_thread(self):
+        """Start the background thread that keeps grabbing the newest frame."""
+        if self._capture_running:
+            return
+        if not self.is_initialized or self.cap is None:
+            logger.error("Camera not initialized")
+            return
+        
+        self._capture_running = True
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
+        logger.info("Background capture thread started")
+    
+    def stop_capture_thread(self):
+        """Stop the background capture thread."""
+        with self._frame_arrived:
+            self._capture_running = False
+            self._frame_arrived.notify_all()
+        if self._capture_thread and self._capture_thread.is_alive():
+            self._capture_thread.join(timeout=1.0)
+        self._capture_thread = None
+    
+    def _capture_loop(self):
+        """Background loop: read frames as fast as the camera delivers them."""
+        pin_current_thread(self.capture_cores, 'capture thread')
+        while self._capture_running:
+            captured = self._read_capture()
+            if captured is None:
+                logger.error("Failed to capture frame from webcam")
+                time.sleep(0.01)
+                continue
+            
+            with self._frame_arrived:
+                if self._latest_frame is not None and self._latest_frame.frame_id > self._consumed_id:
+                    # Previous frame was never read by the main loop
+                    self.frames_dropped += 1
+                self._latest_frame = captured
+                self.frames_captured += 1
+                self._frame_arrived.notify_all()
+    
+    def _wait_for_new_frame(self, timeout: float) -> Optional[CapturedFrame]:
+        """
+        Block until the capture thread has a frame the caller has not seen yet.
         
-        return True, frame
+        Args:
+            timeout: Seconds to wait
+        
+        Returns:
+            Newest CapturedFrame, or None on timeout or when capture stops
+        """
+        with self._frame_arrived:
+            has_new = self._frame_arrived.wait_for(
+                lambda: not self._capture_running or (self._latest_frame is not None and
+                                                      self._latest_frame.frame_id > self._consumed_id),
+                timeout=timeout
+            )
+            if not has_new or not self._capture_running:
+                return None
+            self._consumed_id = self._latest_frame.frame_id
+            return self._latest_frame
+    
+    def get_latest_frame(self) -> Tuple[bool, object]:
+        """
+        Return the newest frame grabbed by the capture thread without blocking.
+        
+        Returns:
+            Tuple of (success, frame). success is False until the first frame arrives.
+            Repeated calls between captures return the same frame again.
+        """
+        captured = self.get_latest_captured_frame()
+        if captured is None:
+            return False, None
+        return True, captured.image
+    
+    def get_latest_captured_frame(self) -> Optional[CapturedFrame]:
+        """
+        Non-blocking variant of read_frame() for threaded capture.
+        
+        Returns:
+            Newest CapturedFrame, or None until the first frame arrives
+        """
+        with self._capture_lock:
+            if self._latest_frame is None:
+                return None
+            if self._latest_frame.frame_id == self._consumed_id:
+                self.frames_duplicated += 1
+            self._consumed_id = self._latest_frame.frame_id
+            return self._latest_frame
+    
+    def get_capture_stats(self) -> dict:
+        """
+        Get background capture counters.
+        
+        Returns:
+            Dictionary with captured, dropped and duplicated frame counts
+        """
+        with self._capture_lock:
+            return {
+                'threaded': self._capture_running,
+                'frames_captured': self.frames_captured,
+                'frames_dropped': self.frames_dropped,
+                'frames_duplicated': self.frames_duplicated
+            }
     
     def get_frame_info(self) -> dict:
         """
@@ -161,6 +389,7 @@ class CameraModule:
     
     def release(self):
         """Release camera resources."""
+        self.stop_capture_thread()
         if self.cap is not None:
             self.cap.release()
             self.cap = None
@@ -200,7 +429,8 @@ def get_available_demo_videos(demo_dir: str = "demo_videos") -> list:
 
 def create_camera_module(source: str = 'live', video_path: str = None, 
                         resolution: Tuple[int, int] = (1280, 720), 
-                        fps: int = 30) -> CameraModule:
+                        fps: int = 30, threaded: bool = False,
+                        capture_cores: Optional[Set[int]] = None) -> CameraModule:
     """
     Factory function to create camera module with proper configuration.
     
@@ -209,6 +439,8 @@ def create_camera_module(source: str = 'live', video_path: str = None,
         video_path: Path to video file (required for demo mode)
         resolution: Camera resolution
         fps: Target frame rate
+        threaded: Use a background capture thread (live mode only)
+        capture_cores: Cores to pin the background capture thread to (None = any)
         
     Returns:
         Initialized CameraModule instance
@@ -223,4 +455,5 @@ def create_camera_module(source: str = 'live', video_path: str = None,
             raise ValueError("No demo videos found in demo_videos directory")
     
     return CameraModule(source=source, video_path=video_path, 
-                       resolution=resolution, fps=fps) 
\ No newline at end of file
+                       resolution=resolution, fps=fps, threaded=threaded,
+                       capture_cores=capture_cores) 
\ No newline at end of file
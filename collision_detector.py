@@ -1,6 +1,7 @@
 """
 Collision detection module for OpenLCWS (Open Lane and Collision Warning System)
-Detects vehicles ahead using MobileNet-SSD and estimates Time-to-Collision (TTC).
+Detects vehicles ahead using MobileNet-SSD (or another model spec, see model_specs.py)
+and estimates Time-to-Collision (TTC).
 Runs inference on a background thread to avoid blocking the main lane detection loop.
 """
 
@@ -9,24 +10,19 @@ import numpy as np
 import threading
 import time
 import os
-from typing import List, Optional, Dict, Tuple, NamedTuple
+from typing import List, Optional, Dict, Set, Tuple, NamedTuple, Sequence
 import logging
 
+from core_budget import apply_worker_budget
+from model_specs import (DEFAULT_MODEL, VOC_CLASSES, ModelSpec, load_network, model_files,
+                         resolve_model_spec)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-# VOC class labels for MobileNet-SSD
-VOC_CLASSES = [
-    "background", "aeroplane", "bicycle", "bird", "boat",
-    "bottle", "bus", "car", "cat", "chair",
-    "cow", "diningtable", "dog", "horse", "motorbike",
-    "person", "pottedplant", "sheep", "sofa", "train",
-    "tvmonitor"
-]
-
-# Vehicle class IDs (VOC indices): car=7, bus=6, motorbike=14
-VEHICLE_CLASS_IDS = {6, 7, 14}
+# Default IoU above which overlapping boxes are merged by NMS
+NMS_IOU_THRESHOLD = 0.45
 
 
 class Detection(NamedTuple):
@@ -37,11 +33,186 @@ class Detection(NamedTuple):
     bbox: Tuple[int, int, int, int]  # (x1, y1, x2, y2)
 
 
+def decode_ssd_detections(raw_detections: np.ndarray, frame_shape: Tuple[int, int],
+                          confidence_threshold: float, target_classes: set,
+                          nms_threshold: Optional[float] = NMS_IOU_THRESHOLD,
+                          labels: Sequence[str] = VOC_CLASSES) -> List[Detection]:
+    """
+    Decode SSD DetectionOutput rows into frame-space detections.
+
+    Filtering, scaling and clamping run on the whole output array at once.
+    NMS then runs across all target classes together, so one vehicle that the
+    network reports as both "car" and "bus" yields a single detection.
+
+    Args:
+        raw_detections: Network output, shape (1, 1, N, 7) with rows
+                        [image_id, class_id, confidence, x1, y1, x2, y2] (normalized)
+        frame_shape: (height, width) of the frame the boxes are scaled to
+        confidence_threshold: Minimum confidence to accept a detection
+        target_classes: Class IDs to keep
+        nms_threshold: IoU above which the lower-confidence box is dropped (None = no NMS)
+        labels: Label of each class ID
+
+    Returns:
+        List of Detection namedtuples, highest confidence first when NMS runs
+    """
+    h, w = frame_shape[:2]
+    rows = raw_detections.reshape(-1, 7)
+
+    # Step 1: Confidence filtering (usually leaves a handful of the rows)
+    rows = rows[rows[:, 2] >= confidence_threshold]
+    if len(rows) == 0:
+        return []
+
+    # Step 2: Scale boxes to frame coordinates, then filter, clamp and merge
+    boxes = rows[:, 3:7] * np.array([w, h, w, h])
+    return _finish_detections(rows[:, 1].astype(int), rows[:, 2], boxes, frame_shape,
+                              confidence_threshold, target_classes, nms_threshold, labels)
+
+
+def decode_yolov8_detections(raw_output: np.ndarray, frame_shape: Tuple[int, int],
+                             input_size: Tuple[int, int], confidence_threshold: float,
+                             target_classes: set,
+                             nms_threshold: Optional[float] = NMS_IOU_THRESHOLD,
+                             labels: Sequence[str] = ()) -> List[Detection]:
+    """
+    Decode a YOLOv8 detection head into frame-space detections.
+
+    Args:
+        raw_output: Network output, shape (1, 4 + C, N) with columns
+                    [cx, cy, w, h, class scores...] in input pixels
+        frame_shape: (height, width) of the frame the input was resized from
+        input_size: (width, height) the network was fed
+        confidence_threshold: Minimum class score to accept a detection
+        target_classes: Class IDs to keep
+        nms_threshold: IoU above which the lower-confidence box is dropped (None = no NMS)
+        labels: Label of each class ID
+
+    Returns:
+        List of Detection namedtuples, highest confidence first when NMS runs
+    """
+    h, w = frame_shape[:2]
+    predictions = raw_output.reshape(raw_output.shape[-2], raw_output.shape[-1]).T
+
+    # Step 1: Best class per candidate, then confidence filtering
+    scores = predictions[:, 4:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    keep = confidences >= confidence_threshold
+    if not keep.any():
+        return []
+    predictions, class_ids, confidences = predictions[keep], class_ids[keep], confidences[keep]
+
+    # Step 2: Center/size in input pixels to corners in frame pixels
+    sx, sy = w / float(input_size[0]), h / float(input_size[1])
+    cx, cy = predictions[:, 0] * sx, predictions[:, 1] * sy
+    half_w, half_h = predictions[:, 2] * sx / 2.0, predictions[:, 3] * sy / 2.0
+    boxes = np.stack([cx - half_w, cy - half_h, cx + half_w, cy + half_h], axis=1)
+    return _finish_detections(class_ids, confidences, boxes, frame_shape,
+                              confidence_threshold, target_classes, nms_threshold, labels)
+
+
+def _finish_detections(class_ids: np.ndarray, confidences: np.ndarray, boxes: np.ndarray,
+                       frame_shape: Tuple[int, int], confidence_threshold: float,
+                       target_classes: set, nms_threshold: Optional[float],
+                       labels: Sequence[str]) -> List[Detection]:
+    """Class filter, clamp and NMS for decoded frame-space boxes."""
+    h, w = frame_shape[:2]
+
+    # Broadcast compare; np.isin's setup costs more than this on a few rows
+    targets = np.fromiter(target_classes, dtype=int, count=len(target_classes))
+    keep = (class_ids[:, None] == targets[None, :]).any(axis=1)
+    if not keep.any():
+        return []
+    class_ids, confidences = class_ids[keep], confidences[keep]
+
+    # Clamp to frame bounds
+    boxes = boxes[keep].astype(int)
+    np.maximum(boxes[:, :2], 0, out=boxes[:, :2])
+    np.minimum(boxes[:, 2], w, out=boxes[:, 2])
+    np.minimum(boxes[:, 3], h, out=boxes[:, 3])
+
+    # Non-maximum suppression across classes (NMSBoxes takes x, y, w, h)
+    order = np.arange(len(boxes))
+    if nms_threshold is not None and len(boxes) > 1:
+        rects = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+        order = np.asarray(cv2.dnn.NMSBoxes(rects, confidences.astype(np.float32),
+                                            confidence_threshold, nms_threshold),
+                           dtype=int).reshape(-1)
+
+    results = []
+    for i in order:
+        class_id = int(class_ids[i])
+        label = labels[class_id] if class_id < len(labels) else f"class_{class_id}"
+        results.append(Detection(
+            class_id=class_id,
+            label=label,
+            confidence=float(confidences[i]),
+            bbox=tuple(boxes[i].tolist())
+        ))
+    return results
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Intersection over Union of every box in boxes_a against every box in boxes_b.
+
+    Args:
+        boxes_a: Boxes as (x1, y1, x2, y2), shape (N, 4)
+        boxes_b: Boxes as (x1, y1, x2, y2), shape (M, 4)
+
+    Returns:
+        IoU matrix, shape (N, M)
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.where(union > 0, union, 1.0), 0.0)
+
+
+def greedy_assignment(iou: np.ndarray, min_iou: float) -> List[Tuple[int, int]]:
+    """
+    Match rows to columns by descending IoU, each row and column used at most once.
+
+    Args:
+        iou: IoU matrix, shape (N, M)
+        min_iou: IoU a pair must exceed to be matched
+
+    Returns:
+        List of (row, column) pairs
+    """
+    rows, cols = np.nonzero(iou > min_iou)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+
+    used_rows, used_cols = set(), set()
+    pairs = []
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
 class TrackedObject:
     """An object tracked across frames for TTC calculation."""
 
-    def __init__(self, detection: Detection, timestamp: float):
+    def __init__(self, detection: Detection, timestamp: float,
+                 track_id: int = 0, age: int = 1):
         self.detection = detection
+        self.track_id = track_id  # Persistent across frames while the object is matched
+        self.age = age  # Number of detections in this track
         self.bbox = detection.bbox
         self.label = detection.label
         self.confidence = detection.confidence
@@ -53,187 +224,276 @@ class TrackedObject:
 
 class CollisionDetector:
     """
-    Vehicle detection and TTC estimation using MobileNet-SSD.
+    Vehicle detection and TTC estimation using MobileNet-SSD or another model spec.
     """
 
     def __init__(self,
                  model_dir: str = "models",
                  confidence_threshold: float = 0.5,
-                 input_size: int = 300,
+                 input_size: Optional[int] = None,
                  target_classes: set = None,
-                 ema_alpha: float = 0.3):
+                 ema_alpha: float = 0.3,
+                 nms_threshold: Optional[float] = NMS_IOU_THRESHOLD,
+                 match_iou: float = 0.2,
+                 corridor_crop: bool = False,
+                 horizon_tile: bool = False,
+                 horizon_y: Optional[float] = None,
+                 corridor_margin: float = 0.25,
+                 tile_size: int = 300,
+                 model: str = DEFAULT_MODEL,
+                 prefer_fp16: bool = True):
         """
         Initialize collision detector.
 
         Args:
             model_dir: Directory containing model files
             confidence_threshold: Minimum confidence to accept a detection
-            input_size: DNN input resolution (300 for MobileNet-SSD)
-            target_classes: Set of VOC class IDs to detect (default: vehicles)
+            input_size: Square DNN input resolution (None = the model's own,
+                        300x300 for MobileNet-SSD)
+            target_classes: Set of class IDs to detect (default: the model's vehicles)
             ema_alpha: EMA smoothing factor for height derivative (lower = smoother)
+            nms_threshold: IoU above which overlapping vehicle boxes are merged (None = no NMS)
+            match_iou: IoU a detection needs with a previous track to continue it
+            corridor_crop: Feed the network the ego-lane corridor below the horizon
+                           instead of the whole frame
+            horizon_tile: Alternate inferences with a native-resolution tile around
+                          the far end of the ego lane, where distant vehicles are
+            horizon_y: Horizon row in frame pixels (None = middle of the frame);
+                       see set_horizon()
+            corridor_margin: Extra corridor width on each side, in lane widths
+            tile_size: Side of the square horizon tile in frame pixels
+            model: Registered model name or path to a JSON model spec (see model_specs.py)
+            prefer_fp16: Run on the FP16 CPU target where OpenCV supports it
         """
+        self.spec: ModelSpec = resolve_model_spec(model)
         self.confidence_threshold = confidence_threshold
-        self.input_size = input_size
-        self.target_classes = target_classes or VEHICLE_CLASS_IDS
+        self.nms_threshold = nms_threshold
+        self.input_size = (input_size, input_size) if input_size else tuple(self.spec.input_size)
+        self.target_classes = target_classes or self.spec.vehicle_classes
         self.ema_alpha = ema_alpha
+        self.match_iou = match_iou
+        self.corridor_crop = corridor_crop
+        self.horizon_tile = horizon_tile
+        self.horizon_y = horizon_y
+        self.corridor_margin = corridor_margin
+        self.tile_size = tile_size
+        self.inference_count = 0
+        self.prefer_fp16 = prefer_fp16
         self.net = None
+        self.dnn_target: Optional[str] = None
         self.is_initialized = False
 
         # Tracking state
         self.prev_detections: List[Detection] = []
         self.tracked_objects: List[TrackedObject] = []
-        self.prev_timestamp: float = 0.0
+        self.prev_timestamp: Optional[float] = None
+        self.next_track_id = 1
 
         self._load_model(model_dir)
 
     def _load_model(self, model_dir: str):
-        """Load the MobileNet-SSD Caffe model."""
-        prototxt = os.path.join(model_dir, "MobileNetSSD_deploy.prototxt")
-        caffemodel = os.path.join(model_dir, "MobileNetSSD_deploy.caffemodel")
-
-        if not os.path.exists(prototxt):
-            logger.error(f"Model prototxt not found: {prototxt}")
-            logger.error("Run 'python download_models.py' to download model files.")
-            return
-
-        if not os.path.exists(caffemodel):
-            logger.error(f"Model weights not found: {caffemodel}")
-            logger.error("Run 'python download_models.py' to download model files.")
-            return
+        """Load the detection network described by the model spec."""
+        for path in model_files(self.spec, model_dir):
+            if not os.path.exists(path):
+                logger.error(f"Model file not found: {path}")
+                if self.spec.name == DEFAULT_MODEL:
+                    logger.error("Run 'python download_models.py' to download model files.")
+                return
 
         try:
-            self.net = cv2.dnn.readNetFromCaffe(prototxt, caffemodel)
-            # Use OpenCV's CPU backend — leverages NEON SIMD on ARM (RPi)
-            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            self.net, self.dnn_target = load_network(self.spec, model_dir, self.prefer_fp16)
             self.is_initialized = True
-            logger.info("Collision detector model loaded successfully (MobileNet-SSD)")
+            logger.info(f"Collision detector model loaded successfully "
+                        f"({self.spec.name}, {self.input_size[0]}x{self.input_size[1]}, {self.dnn_target})")
         except Exception as e:
             logger.error(f"Failed to load collision detection model: {e}")
 
-    def detect_objects(self, frame: np.ndarray) -> List[Detection]:
+    def set_horizon(self, horizon_y: Optional[float]):
+        """
+        Set the horizon row used to place the corridor crop and horizon tile.
+
+        Args:
+            horizon_y: Horizon row in frame pixels, e.g. from ROI calibration (None = default)
+        """
+        self.horizon_y = horizon_y
+
+    def plan_input_region(self, frame_shape: Tuple[int, int],
+                          left_intercept: Optional[float],
+                          right_intercept: Optional[float]) -> Tuple[Tuple[int, int, int, int], bool]:
+        """
+        Choose the part of the frame fed to the network for the next inference.
+
+        With corridor_crop the region spans the ego lane (plus corridor_margin
+        lane widths on each side) from a little above the horizon to the bottom
+        of the frame, so sky and far-side roadway don't take input pixels. With
+        horizon_tile every other inference instead uses a tile_size square
+        around the far end of the lane, seen at native resolution.
+
+        Args:
+            frame_shape: (height, width) of the frame
+            left_intercept: X-coordinate where left lane line hits frame bottom
+            right_intercept: X-coordinate where right lane line hits frame bottom
+
+        Returns:
+            ((x1, y1, x2, y2) region in frame pixels, True if it is the horizon tile)
+        """
+        h, w = frame_shape[:2]
+        if not (self.corridor_crop or self.horizon_tile):
+            return (0, 0, w, h), False
+
+        self.inference_count += 1
+        horizon = self.horizon_y if self.horizon_y is not None else h * 0.5
+
+        # Lane center and width at the bottom of the frame
+        if left_intercept is not None and right_intercept is not None and right_intercept > left_intercept:
+            center = (left_intercept + right_intercept) / 2.0
+            lane_width = right_intercept - left_intercept
+        elif left_intercept is not None or right_intercept is not None:
+            # One line known: assume the lane is centered on the camera
+            center = w / 2.0
+            known = left_intercept if left_intercept is not None else right_intercept
+            lane_width = 2.0 * abs(center - known)
+        else:
+            # No lane data — same central 40% guess as _is_in_lane
+            center = w / 2.0
+            lane_width = w * 0.4
+
+        if self.horizon_tile and (not self.corridor_crop or self.inference_count % 2 == 0):
+            size = int(min(self.tile_size, w, h))
+            # Distant vehicles sit on the horizon; most of the tile is below it
+            x1 = int(np.clip(center - size / 2.0, 0, w - size))
+            y1 = int(np.clip(horizon - size * 0.4, 0, h - size))
+            return (x1, y1, x1 + size, y1 + size), True
+
+        if self.corridor_crop:
+            half_width = lane_width * (0.5 + self.corridor_margin)
+            x1 = int(np.clip(center - half_width, 0, w - 1))
+            x2 = int(np.clip(center + half_width, x1 + 1, w))
+            # Leave room above the horizon for the height of nearby vehicles
+            y1 = int(np.clip(horizon - 0.25 * (h - horizon), 0, h - 1))
+            return (x1, y1, x2, h), False
+
+        return (0, 0, w, h), False
+
+    def detect_objects(self, frame: np.ndarray,
+                       region: Optional[Tuple[int, int, int, int]] = None) -> List[Detection]:
         """
-        Run MobileNet-SSD inference on a single frame.
+        Run detection inference on a single frame.
 
         Args:
             frame: Input BGR image
+            region: (x1, y1, x2, y2) part of the frame to run on (None = whole frame);
+                    boxes are returned in full-frame coordinates
 
         Returns:
-            List of Detection namedtuples for vehicles only
+            List of Detection namedtuples for vehicles only, after NMS
         """
         if not self.is_initialized or self.net is None:
             return []
 
+        x0, y0 = 0, 0
+        if region is not None:
+            x0, y0, x1, y1 = region
+            frame = frame[y0:y1, x0:x1]
         h, w = frame.shape[:2]
 
-        # Create blob — 300x300 with mean subtraction
+        # Create blob — resized to the model's input with its mean and scale
+        spec = self.spec
         blob = cv2.dnn.blobFromImage(
-            cv2.resize(frame, (self.input_size, self.input_size)),
-            scalefactor=0.007843,
-            size=(self.input_size, self.input_size),
-            mean=127.5
+            cv2.resize(frame, self.input_size),
+            scalefactor=spec.scale,
+            size=self.input_size,
+            mean=spec.mean,
+            swapRB=spec.swap_rb
         )
 
         self.net.setInput(blob)
-        raw_detections = self.net.forward()
-
-        results = []
-        for i in range(raw_detections.shape[2]):
-            confidence = raw_detections[0, 0, i, 2]
-
-            if confidence < self.confidence_threshold:
-                continue
-
-            class_id = int(raw_detections[0, 0, i, 1])
-
-            if class_id not in self.target_classes:
-                continue
-
-            # Scale bounding box back to frame coordinates
-            box = raw_detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-            x1, y1, x2, y2 = box.astype(int)
-
-            # Clamp to frame bounds
-            x1 = max(0, x1)
-            y1 = max(0, y1)
-            x2 = min(w, x2)
-            y2 = min(h, y2)
-
-            label = VOC_CLASSES[class_id] if class_id < len(VOC_CLASSES) else f"class_{class_id}"
-
-            results.append(Detection(
-                class_id=class_id,
-                label=label,
-                confidence=float(confidence),
-                bbox=(x1, y1, x2, y2)
-            ))
-
-        return results
-
-    def _iou(self, box_a: Tuple, box_b: Tuple) -> float:
-        """Calculate Intersection over Union between two bounding boxes."""
-        x1 = max(box_a[0], box_b[0])
-        y1 = max(box_a[1], box_b[1])
-        x2 = min(box_a[2], box_b[2])
-        y2 = min(box_a[3], box_b[3])
-
-        inter = max(0, x2 - x1) * max(0, y2 - y1)
-        area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
-        area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
-        union = area_a + area_b - inter
-
-        return inter / union if union > 0 else 0.0
+        raw_output = self.net.forward()
+
+        if spec.decoder == 'yolov8':
+            detections = decode_yolov8_detections(raw_output, (h, w), self.input_size,
+                                                  self.confidence_threshold, self.target_classes,
+                                                  self.nms_threshold, spec.labels)
+        else:
+            detections = decode_ssd_detections(raw_output, (h, w), self.confidence_threshold,
+                                               self.target_classes, self.nms_threshold, spec.labels)
+        if x0 == 0 and y0 == 0:
+            return detections
+        return [det._replace(bbox=(det.bbox[0] + x0, det.bbox[1] + y0,
+                                   det.bbox[2] + x0, det.bbox[3] + y0))
+                for det in detections]
 
     def calculate_ttc(self, current_detections: List[Detection],
-                      current_time: float) -> List[TrackedObject]:
+                      current_time: float,
+                      observed_region: Optional[Tuple[int, int, int, int]] = None) -> List[TrackedObject]:
         """
         Calculate Time-to-Collision for each detection by tracking
         bounding box height expansion across frames.
 
+        Detections are matched to the previous tracks through one IoU matrix
+        and a greedy one-to-one assignment, so two detections can never
+        continue (and corrupt the height derivative of) the same track.
+
         Args:
             current_detections: Detections from the current frame
             current_time: Timestamp of the current frame
+            observed_region: (x1, y1, x2, y2) the detections were searched in
+                             (None = whole frame); unmatched tracks not fully
+                             inside it were not observable and are kept as-is
 
         Returns:
             List of TrackedObject with TTC estimates
         """
-        dt = current_time - self.prev_timestamp if self.prev_timestamp > 0 else 0.0
+        # Step 1: Assign detections to previous tracks
+        matches: Dict[int, TrackedObject] = {}
+        if current_detections and self.tracked_objects:
+            iou = iou_matrix([det.bbox for det in current_detections],
+                             [obj.bbox for obj in self.tracked_objects])
+            for det_index, track_index in greedy_assignment(iou, self.match_iou):
+                matches[det_index] = self.tracked_objects[track_index]
+
+        # Step 2: Continue matched tracks, start new ones for the rest
         tracked = []
+        for i, det in enumerate(current_detections):
+            prev_obj = matches.get(i)
+            if prev_obj is None:
+                tracked.append(TrackedObject(det, current_time, track_id=self.next_track_id))
+                self.next_track_id += 1
+                continue
 
-        for det in current_detections:
-            obj = TrackedObject(det, current_time)
-
-            if dt > 0 and self.tracked_objects:
-                # Match to previous frame using IoU
-                best_iou = 0.0
-                best_prev = None
-
-                for prev_obj in self.tracked_objects:
-                    iou = self._iou(det.bbox, prev_obj.bbox)
-                    if iou > best_iou:
-                        best_iou = iou
-                        best_prev = prev_obj
-
-                if best_prev is not None and best_iou > 0.2:
-                    # Calculate height derivative
-                    h_curr = det.bbox[3] - det.bbox[1]
-                    h_prev = best_prev.height
-                    h_dot_raw = (h_curr - h_prev) / dt
-
-                    # EMA smoothing
-                    obj.h_dot_smoothed = (
-                        self.ema_alpha * h_dot_raw +
-                        (1 - self.ema_alpha) * best_prev.h_dot_smoothed
-                    )
-
-                    # TTC = h / h_dot (only when object is approaching)
-                    if obj.h_dot_smoothed > 1.0:  # Minimum 1px/s to avoid division noise
-                        obj.ttc = h_curr / obj.h_dot_smoothed
-                    else:
-                        obj.ttc = float('inf')
-
+            obj = TrackedObject(det, current_time, track_id=prev_obj.track_id, age=prev_obj.age + 1)
+            dt = current_time - prev_obj.timestamp
+            if dt > 0:
+                # Calculate height derivative
+                h_dot_raw = (obj.height - prev_obj.height) / dt
+
+                # EMA smoothing
+                obj.h_dot_smoothed = (
+                    self.ema_alpha * h_dot_raw +
+                    (1 - self.ema_alpha) * prev_obj.h_dot_smoothed
+                )
+
+                # TTC = h / h_dot (only when object is approaching)
+                if obj.h_dot_smoothed > 1.0:  # Minimum 1px/s to avoid division noise
+                    obj.ttc = obj.height / obj.h_dot_smoothed
+                else:
+                    obj.ttc = float('inf')
+            else:
+                # Same capture time — nothing new to learn about the expansion rate
+                obj.h_dot_smoothed = prev_obj.h_dot_smoothed
+                obj.ttc = prev_obj.ttc
             tracked.append(obj)
 
+        # Step 3: Keep tracks this inference could not see
+        if observed_region is not None:
+            matched_ids = {id(obj) for obj in matches.values()}
+            rx1, ry1, rx2, ry2 = observed_region
+            for prev_obj in self.tracked_objects:
+                x1, y1, x2, y2 = prev_obj.bbox
+                inside = x1 >= rx1 and y1 >= ry1 and x2 <= rx2 and y2 <= ry2
+                if id(prev_obj) not in matched_ids and not inside:
+                    tracked.append(prev_obj)
+
         # Update state for next frame
         self.tracked_objects = tracked
         self.prev_detections = current_detections
@@ -241,7 +501,8 @@ class CollisionDetector:
 
         return tracked
 
-    def get_closest_threat(self, tracked: List[TrackedObject]) -> Optional[TrackedObject]:
+    @staticmethod
+    def get_closest_threat(tracked: List[TrackedObject]) -> Optional[TrackedObject]:
         """
         Return the tracked object with the lowest positive TTC.
 
@@ -256,26 +517,246 @@ class CollisionDetector:
             return None
         return min(threats, key=lambda o: o.ttc)
 
+    def process_frame(self, frame: np.ndarray,
+                      left_intercept: Optional[float],
+                      right_intercept: Optional[float],
+                      timestamp: float) -> Tuple[List[TrackedObject], Optional[TrackedObject]]:
+        """
+        Run the full FCW step on one frame: detect, keep ego-lane vehicles, update TTC.
+
+        Args:
+            frame: Input BGR image
+            left_intercept: X-coordinate where left lane line hits frame bottom
+            right_intercept: X-coordinate where right lane line hits frame bottom
+            timestamp: Capture time of the frame in seconds
+
+        Returns:
+            (tracked_objects, closest_threat)
+        """
+        h, w = frame.shape[:2]
+        region, is_tile = self.plan_input_region(frame.shape, left_intercept, right_intercept)
+        all_detections = self.detect_objects(frame, region)
+
+        if is_tile:
+            # The tile is for distant vehicles; boxes cut off by a tile edge are partial
+            all_detections = [d for d in all_detections if not self._touches_tile_edge(d, region, w, h)]
+
+        # Filter: only keep vehicles inside the ego-lane corridor
+        lane_detections = [
+            d for d in all_detections
+            if self._is_in_lane(d, left_intercept, right_intercept, w)
+        ]
+
+        tracked = self.calculate_ttc(lane_detections, timestamp,
+                                     observed_region=region if is_tile else None)
+        return tracked, self.get_closest_threat(tracked)
+
+    @staticmethod
+    def _touches_tile_edge(det: Detection, tile: Tuple[int, int, int, int],
+                           frame_width: int, frame_height: int, tolerance: int = 2) -> bool:
+        """Check whether a box reaches an edge of the tile that is not a frame edge."""
+        x1, y1, x2, y2 = det.bbox
+        tx1, ty1, tx2, ty2 = tile
+        return ((tx1 > 0 and x1 <= tx1 + tolerance) or
+                (ty1 > 0 and y1 <= ty1 + tolerance) or
+                (tx2 < frame_width and x2 >= tx2 - tolerance) or
+                (ty2 < frame_height and y2 >= ty2 - tolerance))
+
+    @staticmethod
+    def _is_in_lane(det: Detection, left_x: Optional[float],
+                    right_x: Optional[float], frame_width: int) -> bool:
+        """
+        Check whether a detection's center falls within the ego-lane corridor.
+
+        Edge cases:
+          - Both intercepts None → no lane data, fall back to center 40% of frame
+          - Only left known  → corridor is [left, frame_width]
+          - Only right known → corridor is [0, right]
+          - Both known       → corridor is [left, right]
+        """
+        box_center_x = (det.bbox[0] + det.bbox[2]) / 2.0
+
+        if left_x is None and right_x is None:
+            # No lane data — use the central 40% of frame as a conservative guess
+            margin = frame_width * 0.30
+            return margin <= box_center_x <= (frame_width - margin)
+
+        lo = left_x if left_x is not None else 0
+        hi = right_x if right_x is not None else frame_width
+        return lo <= box_center_x <= hi
+
+
+class DetectionSnapshot(NamedTuple):
+    """An immutable FCW result, tagged with the frame it was computed on."""
+    tracked: Tuple[TrackedObject, ...]
+    closest_threat: Optional[TrackedObject]
+    frame_id: int                  # Frame ID passed to update_frame (-1 = no result yet)
+    timestamp: Optional[float]     # Capture time of that frame (TTC clock)
+    posted_time: float             # time.monotonic() when the frame was handed over
+    inference_ms: float            # Time spent in process_frame
+
+
+EMPTY_SNAPSHOT = DetectionSnapshot((), None, -1, None, 0.0, 0.0)
+
+
+class InferenceScheduler:
+    """
+    Risk-adaptive FCW inference rate.
+
+    After each inference the rate is set from the threat picture: max_rate when
+    the closest threat's TTC is at or below fast_ttc, easing down to a cruise
+    rate as the lowest TTC approaches closing_ttc (vehicles still closing),
+    the cruise rate while anything is tracked, and min_rate once nothing has
+    been tracked for empty_hold seconds. The worker holds the next inference
+    until 1 / rate after the previous one started.
+    """
+
+    def __init__(self,
+                 min_rate: float = 2.0,
+                 max_rate: float = 10.0,
+                 cruise_rate: Optional[float] = None,
+                 fast_ttc: float = 3.0,
+                 closing_ttc: float = 8.0,
+                 empty_hold: float = 3.0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            min_rate: Inferences per second with an empty corridor
+            max_rate: Inferences per second with an imminent or closing vehicle
+            cruise_rate: Inferences per second while vehicles are tracked but not
+                         closing (None = midway between min_rate and max_rate)
+            fast_ttc: TTC (s) at or below which max_rate is used
+            closing_ttc: TTC (s) above which a vehicle no longer raises the rate
+            empty_hold: Seconds without tracked vehicles before dropping to min_rate
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.cruise_rate = cruise_rate if cruise_rate is not None else (min_rate + max_rate) / 2.0
+        self.fast_ttc = fast_ttc
+        self.closing_ttc = closing_ttc
+        self.empty_hold = empty_hold
+
+        self.rate = self.cruise_rate
+        self.last_start: Optional[float] = None
+        self.last_seen: Optional[float] = None
+
+        # Statistics
+        self.busy_time = 0.0  # Seconds spent in inference
+        self.held_time = 0.0  # Seconds a pending frame was held back
+
+    def target_rate(self, tracked: Sequence[TrackedObject],
+                    closest: Optional[TrackedObject], now: float) -> float:
+        """
+        Inference rate for a threat picture.
+
+        Args:
+            tracked: Tracked objects from the latest inference
+            closest: Most imminent threat from get_closest_threat
+            now: Monotonic time of the inference in seconds
+
+        Returns:
+            Inferences per second
+        """
+        if tracked or self.last_seen is None:
+            self.last_seen = now
+
+        if closest is not None and closest.ttc < self.closing_ttc:
+            if closest.ttc <= self.fast_ttc:
+                return self.max_rate
+            # Linear from max_rate at fast_ttc to cruise_rate at closing_ttc
+            t = (closest.ttc - self.fast_ttc) / (self.closing_ttc - self.fast_ttc)
+            return self.max_rate + t * (self.cruise_rate - self.max_rate)
+        if tracked or now - self.last_seen < self.empty_hold:
+            return self.cruise_rate
+        return self.min_rate
+
+    def time_until_next(self, now: float) -> float:
+        """Seconds until the next inference may start (<= 0 = now)."""
+        if self.last_start is None:
+            return 0.0
+        return self.last_start + 1.0 / self.rate - now
+
+    def record_hold(self, seconds: float):
+        """Account time a pending frame was held back."""
+        self.held_time += seconds
+
+    def record_inference(self, start: float, duration: float,
+                         tracked: Sequence[TrackedObject], closest: Optional[TrackedObject]):
+        """
+        Account an inference and set the rate for the next one.
+
+        Args:
+            start: Monotonic start time of the inference in seconds
+            duration: Inference time in seconds
+            tracked: Tracked objects it produced
+            closest: Most imminent threat it produced
+        """
+        self.last_start = start
+        self.busy_time += duration
+        self.rate = self.target_rate(tracked, closest, start + duration)
+
+    def get_stats(self) -> Dict:
+        """
+        Current rate and the share of worker time saved versus back-to-back inference.
+        """
+        active = self.busy_time + self.held_time
+        return {
+            'rate_hz': self.rate,
+            'cpu_saved_pct': self.held_time / active * 100.0 if active > 0 else 0.0
+        }
+
 
 class AsyncDetector:
     """
     Threaded wrapper that runs CollisionDetector on a background daemon thread.
     The main loop hands frames in and reads results out without blocking.
+
+    update_frame() wakes the worker through a condition variable, so it starts
+    as soon as a frame is posted and sleeps without polling while none are
+    (e.g. while FCW is toggled off). Results are published as immutable
+    DetectionSnapshots that readers use without copying. With a scheduler,
+    inferences are paced to a risk-dependent rate instead of back-to-back.
     """
 
-    def __init__(self, detector: CollisionDetector):
+    def __init__(self, detector: CollisionDetector, propagate: bool = False,
+                 scheduler: Optional[InferenceScheduler] = None,
+                 worker_cores: Optional[Set[int]] = None,
+                 worker_threads: Optional[int] = None):
         """
         Args:
             detector: Initialized CollisionDetector instance
+            propagate: Move boxes and update TTC on every frame with optical
+                       flow between inferences (see box_propagation.py)
+            scheduler: Adaptive inference rate (None = run back-to-back)
+            worker_cores: Cores to pin the worker to (None = any)
+            worker_threads: OpenCV threads for inference (see core_budget.py)
         """
         self.detector = detector
+        self.scheduler = scheduler
+        self.worker_cores = worker_cores
+        self.worker_threads = worker_threads
         self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
         self._frame = None
-        self._lane_bounds: Tuple[Optional[float], Optional[float]] = (None, None)
-        self._results: List[TrackedObject] = []
-        self._closest_threat: Optional[TrackedObject] = None
+        self._frame_info: Tuple = ()
+        self._snapshot = EMPTY_SNAPSHOT
         self._running = False
         self._thread: Optional[threading.Thread] = None
+        self._next_frame_id = 0
+
+        # Statistics
+        self.frames_posted = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0  # Replaced before the worker picked them up
+        self.total_inference_ms = 0.0
+
+        # Optional per-frame propagation, only touched from the caller's thread
+        self.propagator = None
+        if propagate:
+            from box_propagation import BoxPropagator
+            self.propagator = BoxPropagator()
+        self._propagated_snapshot = EMPTY_SNAPSHOT
 
     def start(self):
         """Start the background detection thread."""
@@ -290,14 +771,18 @@ class AsyncDetector:
 
     def stop(self):
         """Stop the background detection thread."""
-        self._running = False
+        with self._frame_ready:
+            self._running = False
+            self._frame_ready.notify_all()
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=2.0)
-        logger.info("Async collision detector thread stopped.")
+        logger.info(f"Async collision detector thread stopped. Stats: {self.get_stats()}")
 
     def update_frame(self, frame: np.ndarray,
                      left_intercept: Optional[float] = None,
-                     right_intercept: Optional[float] = None):
+                     right_intercept: Optional[float] = None,
+                     timestamp: Optional[float] = None,
+                     frame_id: Optional[int] = None):
         """
         Hand the latest frame to the detection thread.
         If the thread is still processing, this simply replaces the pending frame.
@@ -307,74 +792,148 @@ class AsyncDetector:
             frame: Current video frame
             left_intercept: X-coordinate where left lane line hits frame bottom
             right_intercept: X-coordinate where right lane line hits frame bottom
+            timestamp: Capture time of the frame in seconds (None = time of this call)
+            frame_id: ID of the frame, reported back in its snapshot (None = count calls)
+        """
+        posted_time = time.monotonic()
+        if timestamp is None:
+            timestamp = posted_time
+        if frame_id is None:
+            frame_id = self._next_frame_id
+        self._next_frame_id = frame_id + 1
+
+        self.frames_posted += 1
+        self._post_frame(frame, (frame_id, timestamp, posted_time, left_intercept, right_intercept))
+
+        if self.propagator is not None:
+            self._propagate(frame, timestamp)
+
+    def _post_frame(self, frame: np.ndarray, frame_info: Tuple):
         """
-        with self._lock:
+        Replace the pending frame and wake the worker.
+
+        Args:
+            frame: Frame to process
+            frame_info: (frame_id, timestamp, posted_time, left_intercept, right_intercept)
+        """
+        with self._frame_ready:
+            if self._frame is not None:
+                self.frames_skipped += 1
             self._frame = frame
-            self._lane_bounds = (left_intercept, right_intercept)
+            self._frame_info = frame_info
+            self._frame_ready.notify()
 
-    def get_latest_results(self) -> Tuple[List[TrackedObject], Optional[TrackedObject]]:
+    def _published(self) -> DetectionSnapshot:
+        """Latest published snapshot."""
+        # A single reference read; snapshots are never modified after publication
+        return self._snapshot
+
+    def set_horizon(self, horizon_y: Optional[float]):
         """
-        Read the latest detection results from the background thread.
+        Set the horizon row used to place FCW input regions.
 
-        Returns:
-            (tracked_objects, closest_threat)
+        Args:
+            horizon_y: Horizon row in frame pixels (None = default)
         """
-        with self._lock:
-            return list(self._results), self._closest_threat
+        self.detector.set_horizon(horizon_y)
 
-    @staticmethod
-    def _is_in_lane(det: Detection, left_x: Optional[float],
-                    right_x: Optional[float], frame_width: int) -> bool:
+    def _propagate(self, frame: np.ndarray, timestamp: float):
+        """Move the boxes to this frame, then take over any newly published result."""
+        self.propagator.step(frame, timestamp)
+
+        snapshot = self._published()
+        if snapshot is not self._propagated_snapshot:
+            self.propagator.reconcile(list(snapshot.tracked), snapshot.timestamp)
+            self._propagated_snapshot = snapshot
+
+    def get_latest_results(self) -> Tuple[Sequence[TrackedObject], Optional[TrackedObject]]:
         """
-        Check whether a detection's center falls within the ego-lane corridor.
+        Read the latest detection results from the background thread.
 
-        Edge cases:
-          - Both intercepts None → no lane data, fall back to center 40% of frame
-          - Only left known  → corridor is [left, frame_width]
-          - Only right known → corridor is [0, right]
-          - Both known       → corridor is [left, right]
+        Returns:
+            (tracked_objects, closest_threat); propagated to the latest frame
+            when propagation is enabled
         """
-        box_center_x = (det.bbox[0] + det.bbox[2]) / 2.0
+        if self.propagator is not None:
+            tracked = self.propagator.get_tracks()
+            return tracked, CollisionDetector.get_closest_threat(tracked)
 
-        if left_x is None and right_x is None:
-            # No lane data — use the central 40% of frame as a conservative guess
-            margin = frame_width * 0.30
-            return margin <= box_center_x <= (frame_width - margin)
+        snapshot = self._published()
+        return snapshot.tracked, snapshot.closest_threat
 
-        lo = left_x if left_x is not None else 0
-        hi = right_x if right_x is not None else frame_width
-        return lo <= box_center_x <= hi
+    def get_snapshot(self) -> DetectionSnapshot:
+        """
+        Latest detection result with the ID and capture time of its source frame.
+
+        Returns:
+            DetectionSnapshot (EMPTY_SNAPSHOT before the first result)
+        """
+        return self._published()
+
+    def get_stats(self) -> Dict:
+        """Get handoff and inference statistics."""
+        snapshot = self._published()
+        return {
+            'frames_posted': self.frames_posted,
+            'frames_processed': self.frames_processed,
+            'frames_skipped': self.frames_skipped,
+            'last_inference_ms': snapshot.inference_ms,
+            'mean_inference_ms': (self.total_inference_ms / self.frames_processed
+                                  if self.frames_processed else 0.0),
+            'result_age_ms': ((time.monotonic() - snapshot.posted_time) * 1000.0
+                              if snapshot.frame_id >= 0 else None),
+            'result_frame_id': snapshot.frame_id,
+            **self._scheduler_stats()
+        }
+
+    def _scheduler_stats(self) -> Dict:
+        """Inference rate statistics (empty without a scheduler)."""
+        return self.scheduler.get_stats() if self.scheduler is not None else {}
+
+    def _publish(self, snapshot: DetectionSnapshot):
+        """Publish a new snapshot and update statistics."""
+        self.frames_processed += 1
+        self.total_inference_ms += snapshot.inference_ms
+        self._snapshot = snapshot
 
     def _detection_loop(self):
-        """Background loop: grab latest frame, run inference, filter by lane, update results."""
-        while self._running:
-            # Grab latest frame and lane bounds
-            with self._lock:
+        """Background loop: wait for a frame, run inference, filter by lane, publish a snapshot."""
+        apply_worker_budget(self.worker_cores, self.worker_threads, own_process=False)
+
+        while True:
+            # Sleep until a frame is posted (or stop() is called)
+            with self._frame_ready:
+                while self._running and self._frame is None:
+                    self._frame_ready.wait()
+
+                # Hold it until the scheduler's next slot; newer frames replace it meanwhile
+                while self._running and self.scheduler is not None:
+                    delay = self.scheduler.time_until_next(time.monotonic())
+                    if delay <= 0:
+                        break
+                    held_from = time.monotonic()
+                    self._frame_ready.wait(delay)
+                    self.scheduler.record_hold(time.monotonic() - held_from)
+                if not self._running:
+                    break
                 frame = self._frame
+                frame_id, frame_time, posted_time, lane_left, lane_right = self._frame_info
                 self._frame = None  # Mark as consumed
-                lane_left, lane_right = self._lane_bounds
-
-            if frame is None:
-                time.sleep(0.01)  # Avoid busy-wait
-                continue
 
             try:
-                current_time = time.time()
-                h, w = frame.shape[:2]
-                all_detections = self.detector.detect_objects(frame)
-
-                # Filter: only keep vehicles inside the ego-lane corridor
-                lane_detections = [
-                    d for d in all_detections
-                    if self._is_in_lane(d, lane_left, lane_right, w)
-                ]
-
-                tracked = self.detector.calculate_ttc(lane_detections, current_time)
-                closest = self.detector.get_closest_threat(tracked)
-
-                with self._lock:
-                    self._results = tracked
-                    self._closest_threat = closest
+                # TTC uses the capture time so inference jitter does not leak into dt
+                started = time.monotonic()
+                start = time.perf_counter()
+                tracked, closest = self.detector.process_frame(
+                    frame, lane_left, lane_right, frame_time
+                )
+                duration = time.perf_counter() - start
+                inference_ms = duration * 1000.0
+                if self.scheduler is not None:
+                    self.scheduler.record_inference(started, duration, tracked, closest)
+
+                self._publish(DetectionSnapshot(tuple(tracked), closest, frame_id, frame_time,
+                                                posted_time, inference_ms))
 
             except Exception as e:
                 logger.error(f"Error in collision detection thread: {e}")
@@ -382,20 +941,60 @@ class AsyncDetector:
 
 
 def create_collision_detector(model_dir: str = "models",
-                              confidence_threshold: float = 0.5) -> Tuple[CollisionDetector, AsyncDetector]:
+                              confidence_threshold: float = 0.5,
+                              propagate: bool = False,
+                              corridor_crop: bool = False,
+                              horizon_tile: bool = False,
+                              backend: str = 'thread',
+                              adaptive_rate: bool = False,
+                              min_rate: float = 2.0,
+                              max_rate: float = 10.0,
+                              model: str = DEFAULT_MODEL,
+                              worker_cores: Optional[Set[int]] = None,
+                              worker_threads: Optional[int] = None) -> Tuple[Optional[CollisionDetector], AsyncDetector]:
     """
     Factory function to create collision detector with async wrapper.
 
     Args:
         model_dir: Path to directory containing model files
         confidence_threshold: Minimum detection confidence
+        propagate: Propagate boxes and TTC with optical flow between inferences
+        corridor_crop: Run the network on the ego-lane corridor instead of the whole frame
+        horizon_tile: Alternate inferences with a native-resolution tile at the horizon
+        backend: 'thread' (worker thread in this process) or 'process' (worker
+                 process fed through shared memory, see fcw_process.py)
+        adaptive_rate: Pace inferences by threat level (see InferenceScheduler)
+        min_rate: Inferences per second with an empty corridor
+        max_rate: Inferences per second with an imminent or closing vehicle
+        model: Registered model name or path to a JSON model spec
+        worker_cores: Cores to pin the FCW worker thread or process to (None = any)
+        worker_threads: OpenCV threads for inference; separate from lane
+                        detection's only in the process backend
 
     Returns:
-        Tuple of (CollisionDetector, AsyncDetector)
+        Tuple of (CollisionDetector, AsyncDetector); the CollisionDetector is
+        None for the process backend, which builds its own in the worker
     """
-    detector = CollisionDetector(
+    options = dict(
         model_dir=model_dir,
-        confidence_threshold=confidence_threshold
+        confidence_threshold=confidence_threshold,
+        corridor_crop=corridor_crop,
+        horizon_tile=horizon_tile,
+        model=model
     )
-    async_detector = AsyncDetector(detector)
+
+    scheduler_options = dict(min_rate=min_rate, max_rate=max_rate) if adaptive_rate else None
+
+    if backend == 'process':
+        from fcw_process import ProcessDetector
+        return None, ProcessDetector(options, propagate=propagate,
+                                     scheduler_options=scheduler_options,
+                                     worker_cores=worker_cores, worker_threads=worker_threads)
+    if backend != 'thread':
+        raise ValueError(f"Unknown FCW backend: {backend} (available: thread, process)")
+
+    detector = CollisionDetector(**options)
+    scheduler = InferenceScheduler(**scheduler_options) if scheduler_options else None
+    async_detector = AsyncDetector(detector, propagate=propagate, scheduler=scheduler,
+                                   worker_cores=worker_cores, worker_threads=worker_threads)
     return detector, async_detector
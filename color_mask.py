@@ -0,0 +1,103 @@
+"""
+Lane paint color masking for OpenLCWS (Open Lane and Collision Warning System)
+Classifies white and yellow lane paint with a lookup table over quantized BGR
+colors, precomputed once from HLS and HSV rules, so no per-frame color space
+conversion is needed.
+"""
+
+import cv2
+import numpy as np
+from typing import Tuple, Optional
+
+# Bits kept per BGR channel for the lookup index (5 bits -> 32768 entries)
+LUT_BITS = 5
+
+
+def build_lane_color_lut(white_min_lightness: int = 200,
+                         yellow_hue: Tuple[int, int] = (15, 35),
+                         yellow_min_saturation: int = 80,
+                         yellow_min_value: int = 100) -> np.ndarray:
+    """
+    Build the paint lookup table for every quantized BGR color.
+
+    White paint is bright in HLS lightness; yellow paint is a saturated hue
+    band in HSV. Each table entry classifies the center of its color bin.
+
+    Args:
+        white_min_lightness: Minimum HLS lightness of white paint
+        yellow_hue: OpenCV hue range (0-180) of yellow paint
+        yellow_min_saturation: Minimum HSV saturation of yellow paint
+        yellow_min_value: Minimum HSV value of yellow paint
+
+    Returns:
+        uint8 table of 2**(3*LUT_BITS) entries, 255 for paint and 0 otherwise
+    """
+    levels = 1 << LUT_BITS
+    shift = 8 - LUT_BITS
+    centers = (np.arange(levels, dtype=np.uint16) << shift) + (1 << (shift - 1))
+
+    # Index layout matches LaneColorMask: b << 2*LUT_BITS | g << LUT_BITS | r
+    b, g, r = np.meshgrid(centers, centers, centers, indexing='ij')
+    colors = np.stack([b, g, r], axis=-1).astype(np.uint8).reshape(-1, 1, 3)
+
+    hls = cv2.cvtColor(colors, cv2.COLOR_BGR2HLS).reshape(-1, 3)
+    hsv = cv2.cvtColor(colors, cv2.COLOR_BGR2HSV).reshape(-1, 3)
+
+    white = hls[:, 1] >= white_min_lightness
+    yellow = ((hsv[:, 0] >= yellow_hue[0]) & (hsv[:, 0] <= yellow_hue[1]) &
+              (hsv[:, 1] >= yellow_min_saturation) & (hsv[:, 2] >= yellow_min_value))
+    return np.where(white | yellow, 255, 0).astype(np.uint8)
+
+
+class LaneColorMask:
+    """
+    White/yellow paint mask from a precomputed BGR lookup table.
+    """
+
+    def __init__(self, **lut_options):
+        """
+        Initialize the color mask.
+
+        Args:
+            **lut_options: Paint thresholds passed to build_lane_color_lut
+        """
+        self.lut = build_lane_color_lut(**lut_options)
+
+        # Per-channel tables mapping a channel value to its shifted index bits
+        shift = 8 - LUT_BITS
+        quantized = np.arange(256, dtype=np.uint16) >> shift
+        self.index_lut = np.stack([quantized << (2 * LUT_BITS), quantized << LUT_BITS, quantized],
+                                  axis=-1).reshape(1, 256, 3)
+        self.channel_sum = np.ones((1, 3), dtype=np.float32)
+
+        # Reused buffers, sized on first use
+        self.index_bits: Optional[np.ndarray] = None
+        self.index: Optional[np.ndarray] = None
+        self.mask: Optional[np.ndarray] = None
+        self.allocations = 0
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """
+        Compute the paint mask of a BGR image.
+
+        Args:
+            image: BGR image (typically the ROI crop at processing resolution)
+
+        Returns:
+            uint8 mask, 255 on paint; the buffer is reused by the next call
+        """
+        if self.mask is None or self.mask.shape != image.shape[:2]:
+            self.index_bits = np.empty(image.shape, dtype=np.uint16)
+            self.index = np.empty(image.shape[:2], dtype=np.uint16)
+            self.mask = np.empty(image.shape[:2], dtype=np.uint8)
+            self.allocations += 1
+
+        # Step 1: Quantize each channel straight into its index bits
+        cv2.LUT(image, self.index_lut, dst=self.index_bits)
+
+        # Step 2: Combine the channels (their bits don't overlap, so a sum is an OR)
+        cv2.transform(self.index_bits, self.channel_sum, dst=self.index)
+
+        # Step 3: Look up the paint class of every pixel
+        self.lut.take(self.index, out=self.mask, mode='clip')
+        return self.mask
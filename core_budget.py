@@ -0,0 +1,139 @@
+"""
+Thread and core budget for OpenLCWS (Open Lane and Collision Warning System)
+Splits the CPU between lane detection, FCW inference and frame capture: OpenCV
+thread counts per stage and optional core pinning with os.sched_setaffinity.
+
+OpenCV has one thread pool per process, and its threads inherit the core mask
+of the thread that first uses it. Separate lane and FCW thread counts therefore
+take effect with the process FCW backend; with the thread backend the FCW
+thread can be pinned, but it shares the lane stage's OpenCV pool.
+"""
+
+import os
+import cv2
+from typing import NamedTuple, Optional, Set
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CoreBudget(NamedTuple):
+    """OpenCV thread counts and core sets per stage (None = leave as is)."""
+    lane_threads: Optional[int] = None
+    fcw_threads: Optional[int] = None
+    lane_cores: Optional[Set[int]] = None     # Main loop: capture reads, lane detection, display
+    fcw_cores: Optional[Set[int]] = None      # FCW worker thread or process
+    capture_cores: Optional[Set[int]] = None  # Background capture thread
+
+    @property
+    def is_set(self) -> bool:
+        """Whether any part of the budget is configured."""
+        return any(value is not None for value in self)
+
+
+def parse_core_list(text: Optional[str]) -> Optional[Set[int]]:
+    """
+    Parse a core list such as "2,3" or "0-1".
+
+    Args:
+        text: Comma-separated core numbers and ranges (None or "" = no pinning)
+
+    Returns:
+        Set of core numbers, or None
+    """
+    if not text:
+        return None
+    cores = set()
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cores.update(range(int(first), int(last) + 1))
+        else:
+            cores.add(int(part))
+    return cores
+
+
+def fill_worker_cores(budget: CoreBudget) -> CoreBudget:
+    """
+    Give unpinned FCW and capture stages every core the calling thread may use.
+
+    Threads (and spawned processes) inherit the core mask of the thread that
+    starts them, so once the main loop is pinned to lane_cores an unpinned
+    worker would compete for the lane cores. Call this before pinning the
+    main loop; workers then pin themselves back to the full set.
+
+    Args:
+        budget: Budget as configured
+
+    Returns:
+        Budget with fcw_cores and capture_cores set when lane_cores is
+    """
+    if not budget.lane_cores or not hasattr(os, 'sched_getaffinity'):
+        return budget
+    available = set(os.sched_getaffinity(0))
+    return budget._replace(fcw_cores=budget.fcw_cores or set(available),
+                           capture_cores=budget.capture_cores or set(available))
+
+
+def pin_current_thread(cores: Optional[Set[int]], label: str) -> bool:
+    """
+    Pin the calling thread (and threads it starts later) to a set of cores.
+
+    Args:
+        cores: Core numbers to allow (None = leave as is)
+        label: Stage name for the log
+
+    Returns:
+        True if the thread was pinned
+    """
+    if not cores:
+        return False
+    if not hasattr(os, 'sched_setaffinity'):
+        logger.warning(f"Core pinning not supported on this platform — {label} not pinned")
+        return False
+    try:
+        # On Linux pid 0 is the calling thread, not the whole process
+        os.sched_setaffinity(0, cores)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not pin {label} to cores {sorted(cores)}: {e}")
+        return False
+    logger.info(f"Pinned {label} to cores {sorted(os.sched_getaffinity(0))}")
+    return True
+
+
+def set_opencv_threads(count: Optional[int], label: str) -> int:
+    """
+    Set the size of this process's OpenCV thread pool.
+
+    Args:
+        count: Threads for OpenCV parallel loops (None = leave as is; 1 = sequential)
+        label: Stage name for the log
+
+    Returns:
+        The resulting cv2.getNumThreads()
+    """
+    if count is not None:
+        cv2.setNumThreads(count)
+        logger.info(f"OpenCV threads for {label}: {cv2.getNumThreads()}")
+    return cv2.getNumThreads()
+
+
+def apply_worker_budget(cores: Optional[Set[int]], threads: Optional[int],
+                        own_process: bool, label: str = 'FCW worker'):
+    """
+    Apply the FCW part of a budget from inside the worker thread or process.
+
+    Args:
+        cores: Core numbers for the worker
+        threads: OpenCV threads for inference
+        own_process: True in a worker process, which has its own OpenCV pool
+        label: Stage name for the log
+    """
+    pin_current_thread(cores, label)
+    if own_process:
+        set_opencv_threads(threads, label)
+    elif threads is not None:
+        logger.warning(f"{label}: OpenCV's thread pool is shared with lane detection in the "
+                       f"thread backend — use the process backend for a separate thread count")
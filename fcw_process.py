@@ -0,0 +1,355 @@
+"""
+Multi-process FCW backend for OpenLCWS (Open Lane and Collision Warning System)
+Runs CollisionDetector in a separate process so its inference and Python
+post-processing don't compete with the lane loop for the GIL. Frames travel
+through a shared-memory ring buffer without pickling; results come back as
+compact tuples.
+"""
+
+import math
+import queue
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from typing import List, Optional, Dict, Set, Tuple
+import logging
+
+from core_budget import apply_worker_budget
+from collision_detector import (AsyncDetector, CollisionDetector, Detection, DetectionSnapshot,
+                                InferenceScheduler, TrackedObject)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Layout of the shared handoff state (float64 slots, guarded by the condition's lock)
+(_SEQ, _SLOT, _GENERATION, _BUSY, _CLAIMED, _FRAME_ID, _TIME, _POSTED,
+ _LEFT, _RIGHT) = range(10)
+_STATE_SIZE = 10
+
+# Longest the idle worker sleeps before re-checking the stop event
+_IDLE_WAIT = 0.5
+
+
+def _encode_track(obj: TrackedObject) -> Tuple:
+    """Compact picklable record of a tracked object."""
+    return (obj.track_id, obj.age, obj.detection.class_id, obj.label, obj.confidence,
+            obj.bbox, obj.timestamp, obj.ttc, obj.h_dot_smoothed)
+
+
+def _decode_track(record: Tuple) -> TrackedObject:
+    """Rebuild a tracked object from its record."""
+    track_id, age, class_id, label, confidence, bbox, timestamp, ttc, h_dot_smoothed = record
+    obj = TrackedObject(Detection(class_id, label, confidence, bbox), timestamp,
+                        track_id=track_id, age=age)
+    obj.ttc = ttc
+    obj.h_dot_smoothed = h_dot_smoothed
+    return obj
+
+
+def _to_shared(value: Optional[float]) -> float:
+    """Encode an optional float for the shared state (None -> NaN)."""
+    return float('nan') if value is None else float(value)
+
+
+def _from_shared(value: float) -> Optional[float]:
+    """Decode an optional float from the shared state."""
+    return None if math.isnan(value) else value
+
+
+class FrameRing:
+    """
+    Fixed-size frames in one shared-memory block.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], slots: int, name: Optional[str] = None):
+        """
+        Create a ring, or attach to an existing one by name.
+
+        Args:
+            shape: Shape of one uint8 frame
+            slots: Number of frames in the ring
+            name: Shared-memory block to attach to (None = create a new one)
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = int(np.prod(self.shape)) * slots
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        """Name of the shared-memory block."""
+        return self.shm.name
+
+    def close(self, unlink: bool = False):
+        """Detach from the block, and remove it when unlink is set (owner only)."""
+        self.frames = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _fcw_worker(detector_options: Dict, scheduler_options: Optional[Dict],
+                worker_cores: Optional[Set[int]], worker_threads: Optional[int],
+                state, condition, commands, results, stop_event):
+    """
+    Worker process: wait for the newest frame in the ring, run FCW, send results.
+
+    The slot being processed is marked busy so the producer never writes into it.
+    With scheduler_options, inferences are paced by an InferenceScheduler.
+    """
+    # Before the model loads, so OpenCV's pool starts with this mask and size
+    apply_worker_budget(worker_cores, worker_threads, own_process=True, label='FCW process')
+    try:
+        detector = CollisionDetector(**detector_options)
+        scheduler = InferenceScheduler(**scheduler_options) if scheduler_options else None
+    except Exception as e:
+        # A bad model name or spec file; tell the parent instead of leaving it waiting
+        logger.error(f"Failed to set up collision detector process: {e}")
+        results.put(('ready', False))
+        return
+    results.put(('ready', detector.is_initialized))
+    if not detector.is_initialized:
+        return
+
+    ring = None
+    generation = -1.0
+    last_seq = 0.0
+    ring_pending = False
+
+    while not stop_event.is_set():
+        # Step 1: Apply commands (new ring after a frame size change, horizon);
+        # block briefly when a posted frame's ring command is still in flight
+        while True:
+            try:
+                command = commands.get(timeout=0.1) if ring_pending else commands.get_nowait()
+            except queue.Empty:
+                break
+            ring_pending = False
+            if command[0] == 'ring':
+                _, generation, name, shape, slots = command
+                if ring is not None:
+                    ring.close()
+                ring = FrameRing(shape, slots, name=name)
+            elif command[0] == 'horizon':
+                detector.set_horizon(command[1])
+
+        # Step 2: Claim the newest frame, sleeping until one is posted
+        claimed = False
+        with condition:
+            delay = scheduler.time_until_next(time.monotonic()) if scheduler is not None else 0.0
+            if stop_event.is_set():
+                # stop() may have notified before this wait; don't sleep through it
+                break
+            if state[_SEQ] == last_seq:
+                condition.wait(_IDLE_WAIT)
+            elif state[_GENERATION] != generation:
+                ring_pending = True
+            elif delay > 0:
+                # Hold the frame until the scheduler's next slot
+                held_from = time.monotonic()
+                condition.wait(delay)
+                scheduler.record_hold(time.monotonic() - held_from)
+            else:
+                slot = int(state[_SLOT])
+                last_seq = state[_SEQ]
+                frame_id = int(state[_FRAME_ID])
+                frame_time = state[_TIME]
+                posted_time = state[_POSTED]
+                lane_left = _from_shared(state[_LEFT])
+                lane_right = _from_shared(state[_RIGHT])
+                state[_BUSY] = slot
+                state[_CLAIMED] = last_seq
+                claimed = True
+        if not claimed:
+            continue
+
+        # Step 3: Run FCW straight from shared memory
+        try:
+            started = time.monotonic()
+            start = time.perf_counter()
+            tracked, closest = detector.process_frame(ring.frames[slot], lane_left, lane_right, frame_time)
+            duration = time.perf_counter() - start
+            scheduler_stats = {}
+            if scheduler is not None:
+                scheduler.record_inference(started, duration, tracked, closest)
+                scheduler_stats = scheduler.get_stats()
+            closest_index = next((i for i, obj in enumerate(tracked) if obj is closest), -1)
+            results.put(('result', frame_id, frame_time, posted_time, duration * 1000.0,
+                         [_encode_track(obj) for obj in tracked], closest_index, scheduler_stats))
+        except Exception as e:
+            logger.error(f"Error in collision detection process: {e}")
+        finally:
+            with condition:
+                state[_BUSY] = -1
+
+    if ring is not None:
+        ring.close()
+
+
+class ProcessDetector(AsyncDetector):
+    """
+    Drop-in AsyncDetector that runs CollisionDetector in a worker process.
+
+    update_frame() copies the frame into a free slot of a shared-memory ring
+    (never the one the worker is reading, nor the newest one it may claim
+    next) and wakes the worker; results arrive on a queue as compact tuples.
+    """
+
+    def __init__(self, detector_options: Optional[Dict] = None, propagate: bool = False,
+                 scheduler_options: Optional[Dict] = None,
+                 worker_cores: Optional[Set[int]] = None,
+                 worker_threads: Optional[int] = None,
+                 slots: int = 3, start_timeout: float = 30.0):
+        """
+        Args:
+            detector_options: Keyword arguments for the worker's CollisionDetector
+            propagate: Move boxes and update TTC on every frame with optical flow
+            scheduler_options: Keyword arguments for the worker's InferenceScheduler
+                               (None = run back-to-back)
+            worker_cores: Cores to pin the worker process to (None = any)
+            worker_threads: OpenCV threads in the worker process (None = OpenCV default)
+            slots: Frames in the ring (3 = one being read, one pending, one being written)
+            start_timeout: Seconds to wait for the worker to load its model
+        """
+        super().__init__(None, propagate=propagate, worker_cores=worker_cores,
+                         worker_threads=worker_threads)
+        self.detector_options = detector_options or {}
+        self.scheduler_options = scheduler_options
+        self._worker_scheduler_stats: Dict = {}
+        self.slots = slots
+        self.start_timeout = start_timeout
+        self.is_initialized = False
+
+        context = mp.get_context('spawn')
+        self._context = context
+        self._state = context.Array('d', _STATE_SIZE, lock=False)
+        self._state[_BUSY] = -1
+        self._condition = context.Condition()
+        self._commands = context.Queue()
+        self._result_queue = context.Queue()
+        self._stop_event = context.Event()
+        self._process = None
+
+        self._ring: Optional[FrameRing] = None
+        self._generation = 0
+        self._seq = 0
+
+    def start(self):
+        """Start the worker process and wait until its model is loaded."""
+        self._stop_event.clear()
+        self._process = self._context.Process(
+            target=_fcw_worker,
+            args=(self.detector_options, self.scheduler_options, self.worker_cores,
+                  self.worker_threads, self._state, self._condition,
+                  self._commands, self._result_queue, self._stop_event),
+            daemon=True
+        )
+        self._process.start()
+
+        # Poll so a worker that dies during setup is noticed before the timeout
+        self.is_initialized = False
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            try:
+                _, self.is_initialized = self._result_queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if not self._process.is_alive() and self._result_queue.empty():
+                    break
+        if not self.is_initialized:
+            logger.warning("Collision detector process failed to initialize — FCW disabled.")
+            self.stop()
+            return
+        logger.info("Collision detector process started.")
+
+    def stop(self):
+        """Stop the worker process and release the shared memory."""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._process is not None:
+            # Unread results would keep the worker's queue from flushing on exit
+            self._drain_results()
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._ring is not None:
+            self._ring.close(unlink=True)
+            self._ring = None
+        logger.info(f"Collision detector process stopped. Stats: {self.get_stats()}")
+
+    def set_horizon(self, horizon_y: Optional[float]):
+        """Set the horizon row used to place FCW input regions in the worker."""
+        self._commands.put(('horizon', horizon_y))
+
+    def _post_frame(self, frame: np.ndarray, frame_info: Tuple):
+        """Copy the frame into a free ring slot and publish it as the newest."""
+        if not self.is_initialized:
+            return
+        frame_id, timestamp, posted_time, left_intercept, right_intercept = frame_info
+
+        # A new frame size gets a new ring; the worker attaches before using it
+        if self._ring is None or self._ring.shape != frame.shape:
+            if self._ring is not None:
+                self._ring.close(unlink=True)
+            self._ring = FrameRing(frame.shape, self.slots)
+            self._generation += 1
+            self._commands.put(('ring', float(self._generation), self._ring.name,
+                                frame.shape, self.slots))
+            newest = -1
+        else:
+            with self._condition:
+                newest = int(self._state[_SLOT])
+
+        with self._condition:
+            busy = int(self._state[_BUSY])
+            if self._seq > self._state[_CLAIMED]:
+                self.frames_skipped += 1
+        slot = next(i for i in range(self.slots) if i != busy and i != newest)
+        self._ring.frames[slot] = frame
+
+        self._seq += 1
+        with self._condition:
+            self._state[_SEQ] = self._seq
+            self._state[_SLOT] = slot
+            self._state[_GENERATION] = self._generation
+            self._state[_FRAME_ID] = frame_id
+            self._state[_TIME] = timestamp
+            self._state[_POSTED] = posted_time
+            self._state[_LEFT] = _to_shared(left_intercept)
+            self._state[_RIGHT] = _to_shared(right_intercept)
+            self._condition.notify()
+
+    def _drain_results(self) -> List[Tuple]:
+        """Read every queued message."""
+        messages = []
+        while True:
+            try:
+                messages.append(self._result_queue.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def _published(self) -> DetectionSnapshot:
+        """Drain the result queue and publish the newest result as a snapshot."""
+        results = [message for message in self._drain_results() if message[0] == 'result']
+
+        # Results superseded before they were read still count as processed
+        for message in results[:-1]:
+            self.frames_processed += 1
+            self.total_inference_ms += message[4]
+        if results:
+            (_, frame_id, frame_time, posted_time, inference_ms, records, closest_index,
+             self._worker_scheduler_stats) = results[-1]
+            tracked = tuple(_decode_track(record) for record in records)
+            closest = tracked[closest_index] if closest_index >= 0 else None
+            self._publish(DetectionSnapshot(tracked, closest, frame_id, frame_time,
+                                            posted_time, inference_ms))
+        return self._snapshot
+
+    def _scheduler_stats(self) -> Dict:
+        """Inference rate statistics reported with the worker's latest result."""
+        return self._worker_scheduler_stats
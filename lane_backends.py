@@ -0,0 +1,385 @@
+"""
+Lane detection backends for OpenLCWS (Open Lane and Collision Warning System)
+Each backend turns the ROI crop of a frame into lane line segments. ROI handling,
+smoothing and departure logic stay in LaneDetector, so backends are interchangeable.
+"""
+
+import os
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Type
+import logging
+
+from birdseye_lane import BirdsEyeLaneEngine
+from color_mask import LaneColorMask
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LaneBackend:
+    """
+    Base class for lane-finding backends.
+
+    find_lane_lines() receives the owning LaneDetector, whose ROI cache is
+    already up to date for the current frame, and the ROI crop of the frame.
+    """
+
+    name = ''
+
+    def __init__(self):
+        """Initialize backend."""
+        self.is_initialized = True
+
+    def find_lane_lines(self, detector, roi_frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Find lane line segments in an ROI crop.
+
+        Args:
+            detector: LaneDetector owning this backend
+            roi_frame: BGR crop of the frame at detector.cached_roi_rect
+
+        Returns:
+            Line segments in full-frame coordinates, shape (N, 1, 4), or None
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Drop state tied to the previous ROI or frame size."""
+        pass
+
+
+class HoughBackend(LaneBackend):
+    """Canny edges and HoughLinesP, with optional tracking between full searches."""
+
+    name = 'hough'
+
+    def find_lane_lines(self, detector, roi_frame: np.ndarray) -> Optional[np.ndarray]:
+        """Run the detector's built-in edge and Hough pipeline."""
+        return detector._find_hough_lines(roi_frame)
+
+
+class BirdsEyeBackend(LaneBackend):
+    """Sliding-window polynomial fits on a top-down warp of the ROI."""
+
+    name = 'birdseye'
+
+    def __init__(self, **engine_options):
+        """
+        Initialize backend.
+
+        Args:
+            **engine_options: Keyword arguments for BirdsEyeLaneEngine
+        """
+        super().__init__()
+        self.engine = BirdsEyeLaneEngine(**engine_options)
+
+    def find_lane_lines(self, detector, roi_frame: np.ndarray) -> Optional[np.ndarray]:
+        """Warp the preprocessed crop and fit lanes in the top-down view."""
+        # Follow the detector's (runtime adjustable) Canny thresholds
+        self.engine.canny_low = detector.canny_low
+        self.engine.canny_high = detector.canny_high
+        processed = detector._preprocess_frame(roi_frame)
+        x0, y0 = detector.cached_roi_rect[:2]
+        return self.engine.find_lane_lines(processed, detector.roi_vertices,
+                                           (x0, y0), detector.cached_scale)
+
+    def reset(self):
+        """Rebuild the remap tables for the new ROI."""
+        self.engine.invalidate()
+
+
+class ColorBackend(LaneBackend):
+    """White and yellow paint from the color lookup table, followed by Hough."""
+
+    name = 'color'
+
+    def __init__(self, **lut_options):
+        """
+        Initialize backend.
+
+        Args:
+            **lut_options: Paint thresholds passed to color_mask.build_lane_color_lut
+        """
+        super().__init__()
+        self.color_mask = LaneColorMask(**lut_options)
+
+    def find_lane_lines(self, detector, roi_frame: np.ndarray) -> Optional[np.ndarray]:
+        """Mask paint colors and run Hough on the outlines of the mask."""
+        paint = self.color_mask.apply(detector._scale_crop(roi_frame))
+        outline = cv2.morphologyEx(paint, cv2.MORPH_GRADIENT, detector.morph_kernel,
+                                   dst=detector._work_buffer('paint_outline', paint.shape))
+        masked_edges = detector._apply_roi_mask(outline, detector.cached_frame_shape)
+        return detector._hough_on_crop(masked_edges)
+
+
+class RansacBackend(LaneBackend):
+    """
+    One dominant line per ROI half from Canny edge points with vectorized RANSAC.
+
+    Edge points are read once per half with cv2.findNonZero and every hypothesis
+    is scored against all points in a single array operation, with a fixed
+    iteration budget so the cost per frame is predictable.
+    """
+
+    name = 'ransac'
+
+    def __init__(self,
+                 iterations: int = 64,
+                 inlier_distance: float = 4.0,
+                 min_inliers: int = 40,
+                 max_points: int = 2000,
+                 seed: int = 0):
+        """
+        Initialize backend.
+
+        Args:
+            iterations: Random hypotheses scored per side and frame
+            inlier_distance: Horizontal distance from a line counted as inlier (full-frame pixels)
+            min_inliers: Inliers needed to accept a side's line
+            max_points: Edge points per side kept for scoring (evenly subsampled)
+            seed: Random seed, so runs are reproducible
+        """
+        super().__init__()
+        self.iterations = iterations
+        self.inlier_distance = inlier_distance
+        self.min_inliers = min_inliers
+        self.max_points = max_points
+        self.rng = np.random.default_rng(seed)
+
+        # Previous frame's lines as x = a*y + b, used as seed hypotheses
+        self.previous: Dict[str, Optional[Tuple[float, float]]] = {'left': None, 'right': None}
+
+    def reset(self):
+        """Forget the previous lines (they belong to the old ROI)."""
+        self.previous = {'left': None, 'right': None}
+
+    def find_lane_lines(self, detector, roi_frame: np.ndarray) -> Optional[np.ndarray]:
+        """Fit one line per ROI half to the masked Canny edges of the crop."""
+        processed = detector._preprocess_frame(roi_frame)
+        edges = detector._detect_edges(processed)
+        masked_edges = detector._apply_roi_mask(edges, detector.cached_frame_shape)
+        return self.fit_lines(detector, masked_edges)
+
+    def fit_lines(self, detector, masked_edges: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Fit one line per ROI half to a masked edge crop (the HoughLinesP step).
+
+        Args:
+            detector: LaneDetector whose ROI cache matches the crop
+            masked_edges: ROI-masked edge map at processing resolution
+
+        Returns:
+            One segment per fitted side spanning the ROI height, full-frame
+            coordinates, shape (N, 1, 4), or None
+        """
+        sx0, sy0 = detector.cached_scaled_rect[:2]
+        scale = detector.cached_scale
+        vertices = np.asarray(detector.roi_vertices).reshape(-1, 2)
+        y_top = float(vertices[:, 1].min())
+        y_bottom = float(vertices[:, 1].max())
+
+        # Split at the ROI's horizontal center, in crop pixels
+        center_x = float(vertices[:, 0].min() + vertices[:, 0].max()) / 2.0
+        split = int(np.clip(round(center_x * scale) - sx0, 0, masked_edges.shape[1]))
+
+        segments = []
+        for side, half, x_offset in (('left', masked_edges[:, :split], 0),
+                                     ('right', masked_edges[:, split:], split)):
+            model = None
+            points = cv2.findNonZero(half)
+            if points is not None and len(points) >= self.min_inliers:
+                points = points.reshape(-1, 2)
+                if len(points) > self.max_points:
+                    points = points[::int(np.ceil(len(points) / self.max_points))]
+                # Full-frame coordinates
+                xs = (points[:, 0] + x_offset + sx0) / scale
+                ys = (points[:, 1] + sy0) / scale
+                model = self._fit_side(xs, ys, side)
+
+            self.previous[side] = model
+            if model is not None:
+                a, b = model
+                segments.append([a * y_bottom + b, y_bottom, a * y_top + b, y_top])
+
+        if not segments:
+            return None
+        return np.round(np.array(segments)).astype(np.int32).reshape(-1, 1, 4)
+
+    def _fit_side(self, xs: np.ndarray, ys: np.ndarray, side: str) -> Optional[Tuple[float, float]]:
+        """
+        RANSAC fit of x = a*y + b to one side's edge points.
+
+        Args:
+            xs: Edge point x coordinates (full-frame)
+            ys: Edge point y coordinates (full-frame)
+            side: 'left' or 'right', which fixes the accepted slope sign
+
+        Returns:
+            (a, b) refit on the inliers of the best hypothesis, or None
+        """
+        # Hypotheses from random point pairs, plus the previous line as a seed
+        pairs = self.rng.integers(0, len(xs), size=(self.iterations, 2))
+        x1, x2 = xs[pairs[:, 0]], xs[pairs[:, 1]]
+        y1, y2 = ys[pairs[:, 0]], ys[pairs[:, 1]]
+        dy = y2 - y1
+        a = (x2 - x1) / np.where(dy == 0, 1.0, dy)
+        b = x1 - a * y1
+        valid = dy != 0
+
+        if self.previous[side] is not None:
+            a = np.append(a, self.previous[side][0])
+            b = np.append(b, self.previous[side][1])
+            valid = np.append(valid, True)
+
+        # Same slope rules as calculate_lane_center (slope = 1/a in image terms)
+        with np.errstate(divide='ignore'):
+            slope = np.where(a != 0, 1.0 / a, np.inf)
+        valid &= (np.abs(slope) >= 0.5) & (np.abs(slope) <= 2.0)
+        valid &= (slope < 0) if side == 'left' else (slope > 0)
+        if not valid.any():
+            return None
+
+        # Score every hypothesis against every point at once
+        residuals = np.abs(xs[None, :] - (a[:, None] * ys[None, :] + b[:, None]))
+        inlier_counts = np.count_nonzero(residuals <= self.inlier_distance, axis=1)
+        inlier_counts[~valid] = -1
+        best = int(np.argmax(inlier_counts))
+        if inlier_counts[best] < self.min_inliers:
+            return None
+
+        inliers = residuals[best] <= self.inlier_distance
+        a_fit, b_fit = np.polyfit(ys[inliers], xs[inliers], 1)
+        if a_fit == 0 or not 0.5 <= abs(1.0 / a_fit) <= 2.0:
+            return float(a[best]), float(b[best])
+        return float(a_fit), float(b_fit)
+
+
+class SegmentationBackend(LaneBackend):
+    """Per-pixel lane segmentation network loaded with cv2.dnn, followed by Hough."""
+
+    name = 'segmentation'
+
+    def __init__(self,
+                 model_path: str = os.path.join("models", "lane_segmentation.onnx"),
+                 input_size: Tuple[int, int] = (512, 256),
+                 lane_channel: int = 1,
+                 probability_threshold: float = 0.5):
+        """
+        Initialize backend.
+
+        Args:
+            model_path: Network file readable by cv2.dnn.readNet (ONNX, TF, ...)
+            input_size: (width, height) the network expects
+            lane_channel: Output channel holding lane probability when the
+                          network outputs several classes
+            probability_threshold: Minimum probability for a lane pixel
+        """
+        super().__init__()
+        self.model_path = model_path
+        self.input_size = input_size
+        self.lane_channel = lane_channel
+        self.probability_threshold = probability_threshold
+        self.net = None
+        self.is_initialized = False
+        self._load_model()
+
+    def _load_model(self):
+        """Load the segmentation network."""
+        if not os.path.exists(self.model_path):
+            logger.error(f"Lane segmentation model not found: {self.model_path}")
+            return
+
+        try:
+            self.net = cv2.dnn.readNet(self.model_path)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            self.is_initialized = True
+            logger.info(f"Lane segmentation model loaded: {self.model_path}")
+        except Exception as e:
+            logger.error(f"Failed to load lane segmentation model: {e}")
+
+    def find_lane_lines(self, detector, roi_frame: np.ndarray) -> Optional[np.ndarray]:
+        """Segment lane pixels in the crop and run Hough on their outlines."""
+        if not self.is_initialized:
+            return None
+
+        blob = cv2.dnn.blobFromImage(roi_frame, scalefactor=1.0 / 255.0,
+                                     size=self.input_size, swapRB=True, crop=False)
+        self.net.setInput(blob)
+        output = self.net.forward()
+
+        # Accept (1, H, W), (1, 1, H, W) and (1, C, H, W) probability maps
+        output = np.squeeze(output, axis=0)
+        if output.ndim == 3:
+            output = output[self.lane_channel if output.shape[0] > 1 else 0]
+        lane_mask = ((output > self.probability_threshold) * 255).astype(np.uint8)
+
+        # Back to the processing-resolution crop the ROI mask is built for
+        sx0, sy0, sx1, sy1 = detector.cached_scaled_rect
+        lane_mask = cv2.resize(lane_mask, (sx1 - sx0, sy1 - sy0),
+                               dst=detector._work_buffer('segmentation', (sy1 - sy0, sx1 - sx0)),
+                               interpolation=cv2.INTER_NEAREST)
+
+        edges = detector._detect_edges(lane_mask)
+        masked_edges = detector._apply_roi_mask(edges, detector.cached_frame_shape)
+        return detector._hough_on_crop(masked_edges)
+
+
+# Registry of backend name -> class, extended with register_lane_backend()
+LANE_BACKENDS: Dict[str, Type[LaneBackend]] = {
+    HoughBackend.name: HoughBackend,
+    BirdsEyeBackend.name: BirdsEyeBackend,
+    ColorBackend.name: ColorBackend,
+    RansacBackend.name: RansacBackend,
+    SegmentationBackend.name: SegmentationBackend
+}
+
+
+def register_lane_backend(backend_class: Type[LaneBackend]):
+    """
+    Register a lane backend class under its name.
+
+    Args:
+        backend_class: LaneBackend subclass with a unique name
+    """
+    LANE_BACKENDS[backend_class.name] = backend_class
+
+
+def get_available_lane_backends() -> List[str]:
+    """Get the names of all registered lane backends."""
+    return list(LANE_BACKENDS)
+
+
+def create_lane_backend(name: str, **options) -> LaneBackend:
+    """
+    Factory function to create a registered lane backend.
+
+    Args:
+        name: Registered backend name
+        **options: Keyword arguments for the backend constructor
+
+    Returns:
+        Backend instance
+    """
+    if name not in LANE_BACKENDS:
+        raise ValueError(f"Unknown lane backend: {name} "
+                         f"(available: {', '.join(get_available_lane_backends())})")
+    return LANE_BACKENDS[name](**options)
+
+
+def lane_backend_options(name: str, model_path: Optional[str] = None) -> Dict:
+    """
+    Build constructor options for a backend from command-line style settings.
+
+    Args:
+        name: Registered backend name
+        model_path: Model file for model-based backends (None = backend default)
+
+    Returns:
+        Keyword arguments for create_lane_backend()
+    """
+    if model_path and name == SegmentationBackend.name:
+        return {'model_path': model_path}
+    return {}
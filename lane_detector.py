@@ -4,13 +4,15 @@ Processes frames to detect lane lines and calculate vehicle drift from lane cent
 """
 
 import cv2
+import time
 import numpy as np
 from typing import Tuple, List, Optional, Dict
 import logging
 from utils import (create_roi_mask, get_default_roi_vertices, 
                    calculate_center_offset, is_lane_departure,
-                   draw_lane_lines, draw_drift_indicator, 
-                   calculate_lane_center)
+                   draw_lane_overlays, calculate_lane_center)
+from lane_backends import create_lane_backend
+from color_mask import LaneColorMask
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,7 +35,19 @@ class LaneDetector:
                  roi_vertices: Optional[np.ndarray] = None,
                  car_width: float = 70.0,
                  lane_width: float = 144.0,
-                 camera_offset: float = 0.0):
+                 camera_offset: float = 0.0,
+                 processing_scale: float = 1.0,
+                 processing_width: Optional[int] = None,
+                 roi_crop: bool = False,
+                 weight_by_length: bool = False,
+                 tracking: bool = False,
+                 full_search_interval: int = 10,
+                 track_band_width: float = 40.0,
+                 min_track_points: int = 40,
+                 backend: str = 'hough',
+                 backend_options: Optional[Dict] = None,
+                 color_fusion: Optional[str] = None,
+                 color_options: Optional[Dict] = None):
         """
         Initialize lane detector with configurable parameters.
         
@@ -46,6 +60,27 @@ class LaneDetector:
             max_line_gap: Maximum gap between line segments
             departure_threshold: Threshold for lane departure detection (pixels)
             roi_vertices: Custom ROI vertices (None for default)
+            processing_scale: Downscale factor for edges and Hough (1.0 = full resolution).
+                              Line lengths and gaps are given in full-frame pixels and
+                              rescaled internally; results stay in full-frame pixels.
+            processing_width: Target processing width in pixels; overrides processing_scale
+            roi_crop: Run blur and Canny on the padded ROI bounding rectangle only.
+                      Faster, but approximate: Canny hysteresis chains cut at the
+                      crop border can change edges, segments and offsets compared
+                      with full-frame processing (the default)
+            weight_by_length: Weight lane intercepts by segment length
+            tracking: Refit lanes from narrow bands around the last detection
+                      between full Hough searches
+            full_search_interval: Frames between full ROI searches in tracking mode
+            track_band_width: Width of the search band around each tracked line (pixels)
+            min_track_points: Edge pixels required per side to trust a tracked refit
+            backend: Registered lane backend name ('hough', 'birdseye', 'color',
+                     'segmentation'); tracking applies to the Hough backend only
+            backend_options: Keyword arguments for the backend constructor
+            color_fusion: Fuse a white/yellow paint mask with the Canny edges before
+                          Hough: 'and' keeps only edges on paint, 'or' adds paint
+                          outlines to the edges, None disables the color stage
+            color_options: Paint thresholds for the color lookup table
         """
         self.canny_low = canny_low
         self.canny_high = canny_high
@@ -55,15 +90,58 @@ class LaneDetector:
         self.max_line_gap = max_line_gap
         self.departure_threshold = departure_threshold
         self.roi_vertices = roi_vertices
+        self.processing_scale = min(1.0, max(0.05, processing_scale))
+        self.processing_width = processing_width
+        self.roi_crop = roi_crop
+        self.weight_by_length = weight_by_length
+        
+        # Lane tracking between full searches; models are x = a*y + b per side
+        self.tracking = tracking
+        self.full_search_interval = max(1, full_search_interval)
+        self.track_band_width = track_band_width
+        self.min_track_points = min_track_points
+        self.lane_models: Dict[str, Optional[Tuple[float, float]]] = {'left': None, 'right': None}
+        self.frames_since_full_search = 0
+        self.tracked_frames = 0
+        self.full_searches = 0
+        
+        # Optional paint color stage of the Hough pipeline
+        if color_fusion not in (None, 'and', 'or'):
+            raise ValueError(f"Unknown color fusion mode: {color_fusion}")
+        self.color_fusion = color_fusion
+        self.color_mask = LaneColorMask(**(color_options or {})) if color_fusion else None
+        self.morph_kernel = np.ones((3, 3), dtype=np.uint8)
+        
+        # Accumulated per-stage processing time (seconds) and frames timed
+        self.stage_totals: Dict[str, float] = {}
+        self.timed_frames = 0
+        
+        # Lane-finding backend; ROI, smoothing and departure logic stay here
+        self.backend = create_lane_backend(backend, **(backend_options or {}))
+        if not self.backend.is_initialized:
+            logger.warning(f"Lane backend '{backend}' unavailable — falling back to 'hough'")
+            self.backend = create_lane_backend('hough')
         
         self.car_width = car_width
         self.lane_width = lane_width
         self.camera_offset = camera_offset
         self.last_lane_width_pixels = 400.0  # Safe initial pixel estimate
         
-        # Cache for ROI mask to optimize processing
+        # Cache for the processing rectangle (the whole frame, or the ROI crop
+        # with roi_crop) and mask. Setting cached_roi_mask to None invalidates both.
         self.cached_roi_mask = None
+        self.cached_roi_rect = None
+        self.cached_scaled_rect = None
+        self.cached_crop_shape = None
+        self.cached_edge_canvas = None
+        self.cached_scale = 1.0
         self.cached_frame_shape = None
+        
+        # Persistent per-stage work buffers handed to OpenCV as dst, and
+        # counters showing how often they had to be (re)allocated
+        self.work_buffers: Dict[str, np.ndarray] = {}
+        self.frame_allocations = 0
+        self.total_allocations = 0
 
         # State tracking
         self.last_lane_center = None
@@ -71,12 +149,14 @@ class LaneDetector:
         
         logger.info(f"Lane detector initialized with departure threshold: {departure_threshold}px")
     
-    def detect_lanes(self, frame: np.ndarray) -> Dict:
+    def detect_lanes(self, frame: np.ndarray, timestamp: Optional[float] = None) -> Dict:
         """
-        Detect lane lines in the given frame.
+        Detect lane lines in the given frame and render overlays onto a copy.
+        Use detect() when no image output is needed.
         
         Args:
             frame: Input BGR image frame
+            timestamp: Capture time of the frame in seconds (carried into the result)
             
         Returns:
             Dictionary containing detection results:
@@ -86,37 +166,295 @@ class LaneDetector:
             - 'offset': Offset from lane center
             - 'off_lane': Boolean indicating lane departure
             - 'processed_frame': Frame with visual overlays
+            - 'timestamp': Capture time passed in by the caller
+        """
+        result = self.detect(frame, timestamp)
+        if frame is not None and result['lane_center'] is not None:
+            result['processed_frame'] = self._add_visual_overlays(
+                frame.copy(), result['lines'], result['offset'], result['lane_center']
+            )
+        return result
+    
+    def detect(self, frame: np.ndarray, timestamp: Optional[float] = None) -> Dict:
+        """
+        Detect lane lines in the given frame without producing any image output.
+        
+        Args:
+            frame: Input BGR image frame
+            timestamp: Capture time of the frame in seconds (carried into the result)
+            
+        Returns:
+            Same dictionary as detect_lanes(), with 'processed_frame' set to None
         """
         if frame is None:
             logger.error("Input frame is None")
-            return self._empty_result()
+            return self._empty_result(timestamp)
+        
+        self.frame_allocations = 0
         
         try:
-            # Step 1: Preprocess the frame
-            processed = self._preprocess_frame(frame)
-            
-            # Step 2: Detect edges
-            edges = self._detect_edges(processed)
+            start = time.perf_counter()
             
-            # Step 3: Apply region of interest mask
-            masked_edges = self._apply_roi_mask(edges, frame.shape)
+            # Steps 1-5: ROI crop, preprocess, edges, mask, Hough
+            lines = self._find_lane_lines(frame)
             
-            # Step 4: Detect lines using Hough transform
-            lines = self._detect_lines(masked_edges)
-            
-            # Step 5: Calculate lane center and drift
+            # Step 6: Calculate lane center and drift
+            stage_start = time.perf_counter()
             result = self._calculate_drift(frame, lines)
+            end = self._time_stage('lane_center', stage_start)
+            self.stage_totals['total'] = self.stage_totals.get('total', 0.0) + end - start
+            self.timed_frames += 1
             
-            # Step 6: Add visual overlays
-            result['processed_frame'] = self._add_visual_overlays(
-                frame.copy(), lines, result['offset'], result['lane_center']
-            )
+            result['processed_frame'] = None
+            result['timestamp'] = timestamp
             
             return result
             
         except Exception as e:
             logger.error(f"Error in lane detection: {e}")
-            return self._empty_result()
+            return self._empty_result(timestamp)
+    
+    def _find_lane_lines(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Run the edge and Hough pipeline on the ROI of a frame.
+        
+        Args:
+            frame: Input BGR frame
+            
+        Returns:
+            Detected line segments in full-frame coordinates, or None
+        """
+        # Step 1: Take the processing rectangle: the whole frame, or with
+        # roi_crop the ROI bounding rectangle so later steps skip pixels the
+        # mask would discard anyway
+        x0, y0, x1, y1 = self._get_roi_rect(frame.shape)
+        roi_frame = frame[y0:y1, x0:x1]
+        if roi_frame.size == 0:
+            return None
+        
+        # Steps 2-5: Backend-specific lane search on the crop. The Hough
+        # pipeline times its own steps; other backends are timed as one stage.
+        if self.backend.name == 'hough':
+            return self.backend.find_lane_lines(self, roi_frame)
+        stage_start = time.perf_counter()
+        lines = self.backend.find_lane_lines(self, roi_frame)
+        self._time_stage(self.backend.name, stage_start)
+        return lines
+    
+    def _find_hough_lines(self, roi_frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Run the edge and Hough pipeline (the 'hough' backend) on an ROI crop.
+        
+        Args:
+            roi_frame: BGR crop of the frame at cached_roi_rect
+            
+        Returns:
+            Detected line segments in full-frame coordinates, or None
+        """
+        # Step 2: Preprocess the crop (downscaled to processing resolution)
+        stage_start = time.perf_counter()
+        processed = self._preprocess_frame(roi_frame)
+        stage_start = self._time_stage('preprocess', stage_start)
+        
+        # Step 3: Detect edges
+        edges = self._detect_edges(processed)
+        stage_start = self._time_stage('edges', stage_start)
+        
+        # Step 3b: Keep (or add) edges on white/yellow paint
+        if self.color_mask is not None:
+            paint = self.color_mask.apply(self._scale_crop(roi_frame))
+            stage_start = self._time_stage('color_mask', stage_start)
+            self._fuse_color_mask(edges, paint)
+            stage_start = self._time_stage('color_fuse', stage_start)
+        
+        # Step 4: Apply region of interest mask (cached at crop size)
+        masked_edges = self._apply_roi_mask(edges, self.cached_frame_shape)
+        stage_start = self._time_stage('roi_mask', stage_start)
+        
+        # Step 5a: Between full searches, refit the tracked lane models from
+        # edge pixels near their predicted position instead of running Hough
+        if self.tracking:
+            if self.frames_since_full_search < self.full_search_interval:
+                lines = self._track_lines(masked_edges)
+                stage_start = self._time_stage('track', stage_start)
+                if lines is not None:
+                    self.frames_since_full_search += 1
+                    self.tracked_frames += 1
+                    return lines
+            # Interval elapsed or tracking confidence dropped: full search
+            self.frames_since_full_search = 0
+            self.full_searches += 1
+        
+        # Step 5: Detect lines using Hough transform
+        lines = self._hough_on_crop(masked_edges)
+        self._time_stage('hough', stage_start)
+        
+        if self.tracking:
+            self._update_lane_models(lines)
+        
+        return lines
+    
+    def _fuse_color_mask(self, edges: np.ndarray, paint: np.ndarray):
+        """
+        Fuse a paint mask into an edge map in place.
+        
+        Canny edges sit on the paint boundary, so 'and' dilates the paint mask
+        before intersecting, and 'or' adds the outline of the paint mask.
+        
+        Args:
+            edges: Edge map of the crop (modified in place)
+            paint: Paint mask of the crop, same shape
+        """
+        if self.color_fusion == 'and':
+            near_paint = cv2.dilate(paint, self.morph_kernel, iterations=2,
+                                    dst=self._work_buffer('paint_dilated', paint.shape))
+            cv2.bitwise_and(edges, near_paint, dst=edges)
+        else:
+            outline = cv2.morphologyEx(paint, cv2.MORPH_GRADIENT, self.morph_kernel,
+                                       dst=self._work_buffer('paint_outline', paint.shape))
+            cv2.bitwise_or(edges, outline, dst=edges)
+    
+    def _time_stage(self, name: str, start: float) -> float:
+        """
+        Add the time since start to a stage's total.
+        
+        Args:
+            name: Stage name
+            start: perf_counter() value when the stage started
+            
+        Returns:
+            Current perf_counter() value, the start of the next stage
+        """
+        now = time.perf_counter()
+        self.stage_totals[name] = self.stage_totals.get(name, 0.0) + now - start
+        return now
+    
+    def get_stage_timings(self) -> Dict[str, float]:
+        """
+        Get the mean per-frame cost of each pipeline stage.
+        
+        Stages that only run on some frames (e.g. 'track', 'hough' with tracking)
+        are still averaged over all timed frames, so the stages add up to 'total'
+        apart from the ROI crop and backend dispatch.
+        
+        Returns:
+            Dictionary of stage name -> milliseconds per frame
+        """
+        frames = max(1, self.timed_frames)
+        return {name: total * 1000.0 / frames for name, total in self.stage_totals.items()}
+    
+    def reset_stage_timings(self):
+        """Clear accumulated stage timings."""
+        self.stage_totals = {}
+        self.timed_frames = 0
+    
+    def _hough_on_crop(self, masked_edges: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Run HoughLinesP on a masked edge crop and return full-frame segments.
+        
+        The crop is placed on a zeroed frame-sized canvas: Hough only visits
+        nonzero pixels, and keeping frame coordinates keeps the rho binning (and
+        so the detected segments) identical to a full-frame run.
+        
+        Args:
+            masked_edges: ROI-masked edge map at processing resolution
+            
+        Returns:
+            Detected line segments in full-frame coordinates, or None
+        """
+        sx0, sy0, sx1, sy1 = self.cached_scaled_rect
+        self.cached_edge_canvas[sy0:sy1, sx0:sx1] = masked_edges
+        lines = self._detect_lines(self.cached_edge_canvas, self.cached_scale)
+        
+        if lines is not None and self.cached_scale != 1.0:
+            # Back to full-frame pixels
+            lines = np.round(lines / self.cached_scale).astype(np.int32)
+        
+        return lines
+    
+    def _update_lane_models(self, lines: Optional[np.ndarray]):
+        """
+        Fit per-side lane models x = a*y + b to the segments of a full search.
+        
+        Args:
+            lines: Hough segments in full-frame coordinates
+        """
+        self.lane_models = {'left': None, 'right': None}
+        if lines is None or len(lines) == 0:
+            return
+        
+        segments = lines.reshape(-1, 4).astype(np.float64)
+        dx = segments[:, 2] - segments[:, 0]
+        dy = segments[:, 3] - segments[:, 1]
+        slope = dy / np.where(dx == 0, 1.0, dx)
+        # Same classification rules as calculate_lane_center
+        keep = (dx != 0) & (np.abs(slope) >= 0.5) & (np.abs(slope) <= 2.0)
+        
+        for side, selected in (('left', keep & (slope < 0)), ('right', keep & (slope > 0))):
+            if not selected.any():
+                continue
+            xs = segments[selected][:, [0, 2]].ravel()
+            ys = segments[selected][:, [1, 3]].ravel()
+            a, b = np.polyfit(ys, xs, 1)
+            self.lane_models[side] = (a, b)
+    
+    def _track_lines(self, masked_edges: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Refit both lane models from edge pixels inside narrow bands around the
+        previously detected lines.
+        
+        Args:
+            masked_edges: ROI-masked edge map at processing resolution
+            
+        Returns:
+            One synthetic segment per side spanning the ROI height, in full-frame
+            coordinates, or None when either side lost confidence
+        """
+        if self.lane_models['left'] is None or self.lane_models['right'] is None:
+            return None
+        
+        points = cv2.findNonZero(masked_edges)
+        if points is None:
+            return None
+        
+        # Edge pixel coordinates back in full-frame pixels
+        sx0, sy0, _, _ = self.cached_scaled_rect
+        points = points.reshape(-1, 2).astype(np.float64)
+        xs = (points[:, 0] + sx0) / self.cached_scale
+        ys = (points[:, 1] + sy0) / self.cached_scale
+        
+        vertices = self.roi_vertices.reshape(-1, 2)
+        y_top = float(vertices[:, 1].min())
+        y_bottom = float(vertices[:, 1].max())
+        half_band = self.track_band_width / 2.0
+        
+        segments = []
+        new_models = {}
+        for side in ('left', 'right'):
+            a, b = self.lane_models[side]
+            in_band = np.abs(xs - (a * ys + b)) <= half_band
+            if np.count_nonzero(in_band) < self.min_track_points:
+                return None
+            
+            a, b = np.polyfit(ys[in_band], xs[in_band], 1)
+            # Reject refits that calculate_lane_center would discard or misclassify
+            if a == 0:
+                return None
+            slope = 1.0 / a
+            if not 0.5 <= abs(slope) <= 2.0 or (slope < 0) != (side == 'left'):
+                return None
+            
+            new_models[side] = (a, b)
+            segments.append([a * y_bottom + b, y_bottom, a * y_top + b, y_top])
+        
+        self.lane_models = new_models
+        return np.round(np.array(segments)).astype(np.int32).reshape(-1, 1, 4)
+    
+    def _resolve_scale(self, frame_width: int) -> float:
+        """Get the processing scale for a frame width."""
+        if self.processing_width:
+            return min(1.0, self.processing_width / float(frame_width))
+        return self.processing_scale
     
     def _preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -129,42 +467,136 @@ class LaneDetector:
             Preprocessed grayscale frame
         """
         # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY,
+                            dst=self._work_buffer('gray', frame.shape[:2]))
+        
+        # Downscale the ROI crop to processing resolution
+        gray = self._scale_crop(gray)
         
         # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (self.gaussian_kernel, self.gaussian_kernel), 0)
+        blurred = cv2.GaussianBlur(gray, (self.gaussian_kernel, self.gaussian_kernel), 0,
+                                   dst=self._work_buffer('blurred', gray.shape))
         
         return blurred
     
-    def _apply_roi_mask(self, processed: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+    def _scale_crop(self, crop: np.ndarray) -> np.ndarray:
         """
-        Apply region of interest mask to focus on road area.
+        Downscale an ROI crop (gray or BGR) to processing resolution.
+        
+        Args:
+            crop: Image cropped at cached_roi_rect
+            
+        Returns:
+            The crop at processing resolution (the input itself at scale 1.0)
+        """
+        if self.cached_scale == 1.0 or crop.shape[:2] != self.cached_crop_shape:
+            return crop
+        sx0, sy0, sx1, sy1 = self.cached_scaled_rect
+        shape = (sy1 - sy0, sx1 - sx0) + crop.shape[2:]
+        return cv2.resize(crop, (sx1 - sx0, sy1 - sy0),
+                          dst=self._work_buffer('scaled' if crop.ndim == 2 else 'scaled_bgr', shape),
+                          interpolation=cv2.INTER_AREA)
+    
+    def _work_buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Get a persistent work buffer, reallocating only when its shape changes
+        (new frame size, ROI edit or processing scale).
+        
+        Args:
+            name: Pipeline stage owning the buffer
+            shape: Required (height, width) or (height, width, channels)
+            
+        Returns:
+            uint8 buffer; its contents are overwritten by the next frame
+        """
+        buffer = self.work_buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self.work_buffers[name] = buffer
+            self.frame_allocations += 1
+            self.total_allocations += 1
+        return buffer
+    
+    def _get_roi_rect(self, frame_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        """
+        Get the processing rectangle, rebuilding the cached rectangle and mask
+        when the ROI was edited or the frame shape changed.
+        
+        The rectangle is the whole frame, or with roi_crop the padded ROI
+        bounding rectangle.
         
         Args:
-            processed: Preprocessed frame
             frame_shape: Shape of original frame
             
         Returns:
-            Masked frame
+            Processing rectangle as (x0, y0, x1, y1) in frame coordinates
         """
-        # Create and cache the mask if not already cached, or if frame shape changed
         if self.cached_roi_mask is None or self.cached_frame_shape != frame_shape[:2]:
+            height, width = frame_shape[:2]
             if self.roi_vertices is None:
                 self.roi_vertices = get_default_roi_vertices(frame_shape[:2])
 
             # extract the actual 2D array if we are dealing with the nested array format
             vertices_to_use = self.roi_vertices[0] if len(self.roi_vertices.shape) == 3 and self.roi_vertices.shape[0] == 1 else self.roi_vertices
 
-            # Create a blank mask matching the shape of the processed frame (e.g. grayscale/edges)
-            # which is just 2D, rather than the 3D frame shape.
-            mask_shape = processed.shape[:2]
-            mask = np.zeros(mask_shape, dtype=np.uint8)
-            cv2.fillPoly(mask, [vertices_to_use], 255)
+            if self.roi_crop:
+                # Pad by the blur radius plus the Canny Sobel/non-max-suppression
+                # neighbourhood so pixels inside the ROI see the same gradients as
+                # on the full frame. Hysteresis chains that leave the crop are still
+                # cut at its border, so edges near it can differ (see roi_crop).
+                pad = self.gaussian_kernel // 2 + 8
+                x, y, w, h = cv2.boundingRect(vertices_to_use.astype(np.int32))
+                x0 = min(max(0, x - pad), width)
+                y0 = min(max(0, y - pad), height)
+                x1 = max(min(width, x + w + pad), x0)
+                y1 = max(min(height, y + h + pad), y0)
+            else:
+                # Canny needs the whole frame for results identical to masking afterwards
+                x0, y0, x1, y1 = 0, 0, width, height
+
+            # Processing-resolution geometry (identical to the crop at scale 1.0)
+            scale = self._resolve_scale(width)
+            canvas_w = int(np.ceil(width * scale))
+            canvas_h = int(np.ceil(height * scale))
+            sx0 = min(int(round(x0 * scale)), canvas_w)
+            sy0 = min(int(round(y0 * scale)), canvas_h)
+            sx1 = min(sx0 + int(round((x1 - x0) * scale)), canvas_w)
+            sy1 = min(sy0 + int(round((y1 - y0) * scale)), canvas_h)
+
+            # Mask is built at processing size, with the polygon shifted into crop coordinates
+            mask = np.zeros((sy1 - sy0, sx1 - sx0), dtype=np.uint8)
+            crop_vertices = (vertices_to_use - np.array([x0, y0])) * scale
+            cv2.fillPoly(mask, [np.round(crop_vertices).astype(np.int32)], 255)
 
             self.cached_roi_mask = mask
+            self.cached_roi_rect = (x0, y0, x1, y1)
+            self.cached_scaled_rect = (sx0, sy0, sx1, sy1)
+            self.cached_crop_shape = (y1 - y0, x1 - x0)
+            self.cached_scale = scale
+            self.cached_edge_canvas = np.zeros((canvas_h, canvas_w), dtype=np.uint8)
             self.cached_frame_shape = frame_shape[:2]
+            # Tracked lane models and warp tables belong to the old ROI
+            self.lane_models = {'left': None, 'right': None}
+            self.backend.reset()
+            self.frame_allocations += 2
+            self.total_allocations += 2
 
-        masked = cv2.bitwise_and(processed, self.cached_roi_mask)
+        return self.cached_roi_rect
+    
+    def _apply_roi_mask(self, processed: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Apply region of interest mask to focus on road area.
+        
+        Args:
+            processed: Edge map of the ROI crop
+            frame_shape: Shape of original frame
+            
+        Returns:
+            Masked crop
+        """
+        self._get_roi_rect(frame_shape)
+        masked = cv2.bitwise_and(processed, self.cached_roi_mask,
+                                 dst=self._work_buffer('masked', processed.shape[:2]))
         
         return masked
     
@@ -178,26 +610,29 @@ class LaneDetector:
         Returns:
             Edge map
         """
-        edges = cv2.Canny(masked, self.canny_low, self.canny_high)
+        edges = cv2.Canny(masked, self.canny_low, self.canny_high,
+                          edges=self._work_buffer('edges', masked.shape[:2]))
         return edges
     
-    def _detect_lines(self, edges: np.ndarray) -> Optional[np.ndarray]:
+    def _detect_lines(self, edges: np.ndarray, scale: float = 1.0) -> Optional[np.ndarray]:
         """
         Detect lines using Hough line transform.
         
         Args:
             edges: Edge map from Canny detection
+            scale: Resolution of the edge map relative to the full frame
             
         Returns:
-            Array of detected line segments
+            Array of detected line segments (in edge map coordinates)
         """
+        # Vote counts and segment lengths shrink with the image
         lines = cv2.HoughLinesP(
             edges,
             rho=1,
             theta=np.pi/180,
-            threshold=self.hough_threshold,
-            minLineLength=self.min_line_length,
-            maxLineGap=self.max_line_gap
+            threshold=max(1, int(round(self.hough_threshold * scale))),
+            minLineLength=self.min_line_length * scale,
+            maxLineGap=self.max_line_gap * scale
         )
         
         return lines
@@ -217,7 +652,9 @@ class LaneDetector:
         image_center = width / 2
         
         # Calculate lane center from detected lines
-        lane_center, left_intercept, right_intercept = calculate_lane_center(lines, width, height) if lines is not None else (None, None, None)
+        lane_center, left_intercept, right_intercept = calculate_lane_center(
+            lines, width, height, weight_by_length=self.weight_by_length
+        )
         
         # Update dynamic lane width tracking
         if left_intercept is not None and right_intercept is not None:
@@ -258,6 +695,7 @@ class LaneDetector:
             'image_center': image_center,
             'offset': offset,
             'off_lane': off_lane,
+            'departure_threshold': self.departure_threshold,
             'left_intercept': left_intercept,
             'right_intercept': right_intercept
         }
@@ -276,36 +714,9 @@ class LaneDetector:
         Returns:
             Frame with visual overlays
         """
-        # Draw detected lane lines
-        if lines is not None:
-            frame = draw_lane_lines(frame, lines)
-        
-        # Draw drift indicators
-        height, width = frame.shape[:2]
-        image_center = width / 2
-        frame = draw_drift_indicator(frame, offset, self.departure_threshold, image_center)
-        
-        # Add text information
-        info_text = f"Offset: {offset:.1f}px | Threshold: {self.departure_threshold}px"
-        cv2.putText(frame, info_text, (10, height - 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        
-        # Add lane departure warning
-        if abs(offset) > self.departure_threshold:
-            warning_text = "LANE DEPARTURE WARNING!"
-            cv2.putText(frame, warning_text, (width // 2 - 150, 50), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
-
-        # Visualize ROI
-        if self.roi_vertices is not None:
-            pts = self.roi_vertices.reshape((-1, 1, 2))
-            cv2.polylines(frame, [pts], isClosed=True, color=(255, 0, 255), thickness=2)
-            cv2.putText(frame, "ROI Focus Area", (int(pts[0][0][0]), int(pts[0][0][1]) - 10), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 1)
-        
-        return frame
+        return draw_lane_overlays(frame, lines, offset, self.departure_threshold, self.roi_vertices)
     
-    def _empty_result(self) -> Dict:
+    def _empty_result(self, timestamp: Optional[float] = None) -> Dict:
         """Return empty result structure."""
         return {
             'lines': None,
@@ -313,7 +724,8 @@ class LaneDetector:
             'image_center': None,
             'offset': 0.0,
             'off_lane': False,
-            'processed_frame': None
+            'processed_frame': None,
+            'timestamp': timestamp
         }
         
     def _normalize_vertices(self):
@@ -321,6 +733,17 @@ class LaneDetector:
         if self.roi_vertices is not None and len(self.roi_vertices.shape) == 3 and self.roi_vertices.shape[0] == 1:
             self.roi_vertices = self.roi_vertices[0].copy()
 
+    def set_roi_vertices(self, vertices: np.ndarray):
+        """
+        Replace the region of interest, e.g. with a calibrated trapezoid.
+        
+        Args:
+            vertices: ROI polygon, shape (N, 2) or (1, N, 2)
+        """
+        self.roi_vertices = np.asarray(vertices, dtype=np.int32).reshape(-1, 2).copy()
+        self.cached_roi_mask = None
+        logger.info(f"ROI set to {self.roi_vertices.tolist()}")
+    
     def offset_roi(self, dx: int, dy: int):
         """
         Shift the region of interest by dx and dy pixels.
@@ -385,33 +808,6 @@ class LaneDetector:
             self.cached_roi_mask = None
             logger.info(f"Scaled ROI by W:{width_factor} H:{height_factor}")
 
-    def auto_calibrate_roi(self, frame: np.ndarray):
-        """
-        Perform a full open-scan to auto-calibrate the lane and frame the horizon.
-        """
-        h, w = frame.shape[:2]
-        temp_vertices = np.array([[[w*0.05, h], [w*0.2, h*0.4], [w*0.8, h*0.4], [w*0.95, h]]], dtype=np.int32)
-        
-        processed = self._preprocess_frame(frame)
-        edges = self._detect_edges(processed)
-        
-        mask = np.zeros(edges.shape, dtype=np.uint8)
-        cv2.fillPoly(mask, [temp_vertices[0]], 255)
-        masked_edges = cv2.bitwise_and(edges, mask)
-        
-        lines = self._detect_lines(masked_edges)
-        if lines is not None:
-            # We detected a horizon, auto generate bounds avoiding dash
-            self.roi_vertices = np.array([[
-                [w * 0.1, h * 0.85],
-                [w * 0.4, h * 0.6],
-                [w * 0.6, h * 0.6],
-                [w * 0.9, h * 0.85]
-            ]], dtype=np.int32)[0]
-            self.cached_roi_mask = None
-            logger.info("Auto calibrated ROI based on lane perspective.")
-
-    
     def update_threshold(self, new_threshold: float):
         """
         Update the lane departure threshold.
@@ -438,6 +834,15 @@ class LaneDetector:
             'max_line_gap': self.max_line_gap,
             'departure_threshold': self.departure_threshold,
             'smoothing_factor': self.smoothing_factor,
+            'processing_scale': self.cached_scale,
+            'roi_crop': self.roi_crop,
+            'backend': self.backend.name,
+            'color_fusion': self.color_fusion,
+            'tracking': self.tracking,
+            'tracked_frames': self.tracked_frames,
+            'full_searches': self.full_searches,
+            'frame_allocations': self.frame_allocations,
+            'total_allocations': self.total_allocations,
             'last_lane_center': self.last_lane_center
         }
 
@@ -448,7 +853,15 @@ def create_lane_detector(departure_threshold: float = 50.0,
                         hough_threshold: int = 50,
                         car_width: float = 70.0,
                         lane_width: float = 144.0,
-                        camera_offset: float = 0.0) -> LaneDetector:
+                        camera_offset: float = 0.0,
+                        processing_scale: float = 1.0,
+                        processing_width: Optional[int] = None,
+                        roi_crop: bool = False,
+                        tracking: bool = False,
+                        full_search_interval: int = 10,
+                        backend: str = 'hough',
+                        backend_options: Optional[Dict] = None,
+                        color_fusion: Optional[str] = None) -> LaneDetector:
     """
     Factory function to create lane detector with common configurations.
     
@@ -460,6 +873,14 @@ def create_lane_detector(departure_threshold: float = 50.0,
         car_width: Physical width in inches
         lane_width: Physical width in inches
         camera_offset: Camera center offset
+        processing_scale: Downscale factor for edge and line detection
+        processing_width: Target processing width (overrides processing_scale)
+        roi_crop: Process only the padded ROI rectangle (faster, approximate)
+        tracking: Track lanes between full Hough searches
+        full_search_interval: Frames between full searches when tracking
+        backend: Registered lane backend name
+        backend_options: Keyword arguments for the backend constructor
+        color_fusion: Paint mask fusion with edges, 'and', 'or' or None
         
     Returns:
         Configured LaneDetector instance
@@ -471,5 +892,13 @@ def create_lane_detector(departure_threshold: float = 50.0,
         hough_threshold=hough_threshold,
         car_width=car_width,
         lane_width=lane_width,
-        camera_offset=camera_offset
+        camera_offset=camera_offset,
+        processing_scale=processing_scale,
+        processing_width=processing_width,
+        roi_crop=roi_crop,
+        tracking=tracking,
+        full_search_interval=full_search_interval,
+        backend=backend,
+        backend_options=backend_options,
+        color_fusion=color_fusion
     ) 
\ No newline at end of file
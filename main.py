@@ -10,13 +10,21 @@ import time
 import signal
 import sys
 import logging
-from typing import Optional
+from typing import Optional, Dict
 
 # Import our modules
 from camera_module import create_camera_module, get_available_demo_videos
 from lane_detector import create_lane_detector
+from lane_backends import get_available_lane_backends, lane_backend_options
 from audio_alert import create_audio_alert, LaneDepartureAlert, CollisionAlert
 from collision_detector import create_collision_detector
+from core_budget import (CoreBudget, fill_worker_cores, parse_core_list, pin_current_thread,
+                         set_opencv_threads)
+from model_specs import DEFAULT_MODEL, get_available_models
+from offline_processor import OfflineProcessor
+from overlay_renderer import OverlayRenderer
+from roi_calibration import (VanishingPointCalibrator, save_calibration, load_calibration,
+                             DEFAULT_CALIBRATION_PATH)
 from utils import resize_image, draw_detection_boxes, draw_collision_warning
 
 # Configure logging
@@ -26,6 +34,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds between per-stage latency logs when a core budget is set
+STAGE_LOG_INTERVAL = 10.0
+
 
 class OpenLCWS:
     """
@@ -36,7 +47,17 @@ class OpenLCWS:
                  threshold: float = 50.0, show_display: bool = True,
                  resolution: tuple = (1280, 720), fps: int = 30,
                  car_width: float = 70.0, lane_width: float = 144.0, camera_offset: float = 0.0,
-                 enable_fcw: bool = False, fcw_confidence: float = 0.5):
+                 enable_fcw: bool = False, fcw_confidence: float = 0.5,
+                 threaded_capture: bool = False, lane_scale: float = 1.0,
+                 lane_tracking: bool = False, lane_roi_crop: bool = False,
+                 lane_backend: str = 'hough',
+                 lane_model: Optional[str] = None, lane_color: Optional[str] = None,
+                 calibration_path: str = DEFAULT_CALIBRATION_PATH,
+                 fcw_propagate: bool = False, fcw_corridor: bool = False,
+                 fcw_horizon_tile: bool = False, fcw_backend: str = 'thread',
+                 fcw_adaptive: bool = False, fcw_min_rate: float = 2.0,
+                 fcw_max_rate: float = 10.0, fcw_model: str = DEFAULT_MODEL,
+                 core_budget: Optional[CoreBudget] = None):
         """
         Initialize OpenLCWS system.
         
@@ -52,6 +73,23 @@ class OpenLCWS:
             camera_offset: Offset of camera from true center of car (inches)
             enable_fcw: Enable Forward Collision Warning
             fcw_confidence: Minimum confidence for FCW detections
+            threaded_capture: Grab webcam frames on a background thread (live mode)
+            lane_scale: Processing scale for lane detection (1.0 = full resolution)
+            lane_tracking: Track lanes between periodic full Hough searches
+            lane_roi_crop: Run lane blur and Canny on the ROI rectangle only (approximate)
+            lane_backend: Registered lane detection backend
+            lane_model: Model file for the segmentation lane backend
+            lane_color: Fuse a white/yellow paint mask with lane edges ('and'/'or')
+            calibration_path: File the ROI calibration is loaded from and saved to
+            fcw_propagate: Update FCW boxes and TTC every frame with optical flow
+            fcw_corridor: Run FCW inference on the ego-lane corridor instead of the whole frame
+            fcw_horizon_tile: Alternate FCW inferences with a full-resolution horizon tile
+            fcw_backend: Run FCW on a worker 'thread' or in a worker 'process'
+            fcw_adaptive: Pace FCW inferences by threat level instead of back-to-back
+            fcw_min_rate: FCW inferences per second with an empty corridor
+            fcw_max_rate: FCW inferences per second with an imminent or closing vehicle
+            fcw_model: Registered FCW model name or path to a JSON model spec
+            core_budget: OpenCV threads and cores per stage (None = OpenCV defaults)
         """
         self.mode = mode
         self.video_path = video_path
@@ -65,6 +103,23 @@ class OpenLCWS:
         self.enable_fcw = enable_fcw
         self.fcw_confidence = fcw_confidence
         self.fcw_active = enable_fcw  # Runtime toggle state
+        self.threaded_capture = threaded_capture
+        self.lane_scale = lane_scale
+        self.lane_tracking = lane_tracking
+        self.lane_roi_crop = lane_roi_crop
+        self.lane_backend = lane_backend
+        self.lane_model = lane_model
+        self.lane_color = lane_color
+        self.calibration_path = calibration_path
+        self.fcw_propagate = fcw_propagate
+        self.fcw_corridor = fcw_corridor
+        self.fcw_horizon_tile = fcw_horizon_tile
+        self.fcw_backend = fcw_backend
+        self.fcw_adaptive = fcw_adaptive
+        self.fcw_min_rate = fcw_min_rate
+        self.fcw_max_rate = fcw_max_rate
+        self.fcw_model = fcw_model
+        self.core_budget = core_budget or CoreBudget()
         
         # System components
         self.camera = None
@@ -74,6 +129,13 @@ class OpenLCWS:
         self.collision_detector = None
         self.async_detector = None
         self.collision_alert = None
+        self.renderer = OverlayRenderer()
+        
+        # Vanishing-point ROI calibration ('c' key); a saved calibration is
+        # applied once the first frame's size is known
+        self.calibrator = VanishingPointCalibrator()
+        self.calibration_loaded = False
+        self.horizon_y = None
         
         # Control flags
         self.running = False
@@ -82,6 +144,11 @@ class OpenLCWS:
         
         # Performance tracking
         self.frame_times = []
+        # Per-stage latencies logged every STAGE_LOG_INTERVAL seconds with a core budget
+        self.stage_log_time = None
+        self.stage_latency_total = 0.0
+        self.stage_latency_frames = 0
+        self.stage_fcw_totals = (0, 0.0)  # (frames_processed, inference ms) at the last log
 
         # Initialize system
         self._initialize_system()
@@ -91,13 +158,23 @@ class OpenLCWS:
         try:
             logger.info("Initializing OpenLCWS system...")
             
+            # Apply the lane stage's core budget before any worker threads start,
+            # so OpenCV's pool inherits it. Workers would inherit it too, so
+            # unpinned FCW and capture stages get the cores available before it.
+            if self.core_budget.is_set:
+                self.core_budget = fill_worker_cores(self.core_budget)
+                set_opencv_threads(self.core_budget.lane_threads, 'lane detection')
+                pin_current_thread(self.core_budget.lane_cores, 'main loop')
+            
             # Initialize camera module
             logger.info(f"Initializing camera in {self.mode} mode...")
             self.camera = create_camera_module(
                 source=self.mode,
                 video_path=self.video_path,
                 resolution=self.resolution,
-                fps=self.fps
+                fps=self.fps,
+                threaded=self.threaded_capture,
+                capture_cores=self.core_budget.capture_cores
             )
             
             # Initialize lane detector
@@ -106,7 +183,13 @@ class OpenLCWS:
                 departure_threshold=self.threshold,
                 car_width=self.car_width,
                 lane_width=self.lane_width,
-                camera_offset=self.camera_offset
+                camera_offset=self.camera_offset,
+                processing_scale=self.lane_scale,
+                roi_crop=self.lane_roi_crop,
+                tracking=self.lane_tracking,
+                backend=self.lane_backend,
+                backend_options=lane_backend_options(self.lane_backend, self.lane_model),
+                color_fusion=self.lane_color
             )
             
             # Initialize audio alert system
@@ -126,7 +209,17 @@ class OpenLCWS:
                 logger.info("Initializing Forward Collision Warning...")
                 try:
                     _, self.async_detector = create_collision_detector(
-                        confidence_threshold=self.fcw_confidence
+                        confidence_threshold=self.fcw_confidence,
+                        propagate=self.fcw_propagate,
+                        corridor_crop=self.fcw_corridor,
+                        horizon_tile=self.fcw_horizon_tile,
+                        backend=self.fcw_backend,
+                        adaptive_rate=self.fcw_adaptive,
+                        min_rate=self.fcw_min_rate,
+                        max_rate=self.fcw_max_rate,
+                        model=self.fcw_model,
+                        worker_cores=self.core_budget.fcw_cores,
+                        worker_threads=self.core_budget.fcw_threads
                     )
                     self.collision_alert = CollisionAlert(self.audio_alert)
                     self.async_detector.start()
@@ -143,6 +236,35 @@ class OpenLCWS:
             self.cleanup()
             raise
     
+    def _update_calibration(self, frame, timestamp: float):
+        """
+        Apply the saved ROI calibration on the first frame, and feed frames to a
+        running vanishing-point calibration (one cheap pass per frame).
+        
+        Args:
+            frame: Current BGR frame
+            timestamp: Frame timestamp in seconds
+        """
+        if not self.calibration_loaded:
+            self.calibration_loaded = True
+            calibration = load_calibration(self.calibration_path, frame.shape[:2])
+            if calibration is not None:
+                self._apply_calibration(calibration)
+                logger.info(f"Loaded ROI calibration from {self.calibration_path}")
+        
+        if self.calibrator.active and self.calibrator.add_frame(frame, timestamp):
+            result = self.calibrator.get_result()
+            if result is not None:
+                self._apply_calibration(result)
+                save_calibration(result, self.calibration_path)
+    
+    def _apply_calibration(self, calibration: Dict):
+        """Use a calibration's ROI for lanes and its horizon for FCW input placement."""
+        self.lane_detector.set_roi_vertices(calibration['vertices'])
+        self.horizon_y = calibration['horizon_y']
+        if self.async_detector:
+            self.async_detector.set_horizon(self.horizon_y)
+    
     def run(self):
         """Main system loop."""
         if not self.camera or not self.camera.is_initialized:
@@ -159,18 +281,23 @@ class OpenLCWS:
             while self.running:
                 frame_start_time = time.time()
                 # Capture frame
-                ret, frame = self.camera.get_frame()
-                if not ret:
+                captured = self.camera.read_frame()
+                if captured is None:
                     logger.warning("Failed to capture frame")
                     continue
+                frame = captured.image
                 
-                # Process frame for lane detection
-                detection_result = self.lane_detector.detect_lanes(frame)
+                # Apply the saved ROI calibration, or feed a running calibration
+                self._update_calibration(frame, captured.timestamp)
+                
+                # Process frame for lane detection (numbers only; rendering happens below if needed)
+                detection_result = self.lane_detector.detect(frame, timestamp=captured.timestamp)
                 
                 # Process lane departure alert
                 self.departure_alert.process_departure(
                     detection_result['off_lane'],
-                    detection_result['offset']
+                    detection_result['offset'],
+                    timestamp=captured.timestamp
                 )
                 
                 # Process Forward Collision Warning (async — non-blocking)
@@ -181,12 +308,22 @@ class OpenLCWS:
                     self.async_detector.update_frame(
                         frame,
                         left_intercept=detection_result.get('left_intercept'),
-                        right_intercept=detection_result.get('right_intercept')
+                        right_intercept=detection_result.get('right_intercept'),
+                        timestamp=captured.timestamp,
+                        frame_id=captured.frame_id
                     )
                     fcw_tracked, fcw_threat = self.async_detector.get_latest_results()
                     if self.collision_alert:
                         ttc = fcw_threat.ttc if fcw_threat else None
                         self.collision_alert.process_collision(ttc)
+                elif self.collision_alert:
+                    # FCW off or lost: silence a tier's repeating beep
+                    self.collision_alert.process_collision(None)
+                
+                # Capture-to-decision latency for this frame
+                latency_ms = (time.monotonic() - captured.capture_time) * 1000.0
+                if self.core_budget.is_set:
+                    self._log_stage_latencies(latency_ms)
                 
                 # Track frame time for moving average FPS
                 frame_end_time = time.time()
@@ -203,16 +340,24 @@ class OpenLCWS:
                     current_fps = 0.0
                 
                 # Display results
-                if self.show_display and detection_result['processed_frame'] is not None:
-                    display_frame = detection_result['processed_frame'].copy()
+                if self.show_display:
+                    display_frame = self.renderer.render_lanes(
+                        frame, detection_result,
+                        self.lane_detector.departure_threshold,
+                        self.lane_detector.roi_vertices
+                    )
                     
                     # Add system info overlay
-                    info_text = f"FPS: {current_fps:.1f} | Frame: {self.frame_count}"
+                    info_text = (f"FPS: {current_fps:.1f} | Frame: {self.frame_count} | "
+                                 f"Latency: {latency_ms:.0f}ms")
                     cv2.putText(display_frame, info_text, (10, 30), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
                     
                     # Add mode info
                     mode_text = f"Mode: {self.mode.upper()}"
+                    if self.calibrator.active:
+                        progress = self.calibrator.progress(captured.timestamp)
+                        mode_text += f" | CALIBRATING ROI {progress * 100:.0f}%"
                     cv2.putText(display_frame, mode_text, (10, 60), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
                     
@@ -267,11 +412,13 @@ class OpenLCWS:
                     elif char_key == ord('h'):             # Bottom Width EXPAND
                         self.lane_detector.adjust_bottom_width(10)
                     elif char_key == ord('c'):             # Auto Calibrate
-                        self.lane_detector.auto_calibrate_roi(frame)
+                        self.calibrator.start()
                     elif char_key == ord('n'):             # Toggle FCW
                         if self.enable_fcw:
                             self.fcw_active = not self.fcw_active
                             logger.info(f"FCW toggled: {'ON' if self.fcw_active else 'OFF'}")
+                            if not self.fcw_active and self.collision_alert:
+                                self.collision_alert.process_collision(None)
                         else:
                             logger.info("FCW not available (start with --enable-fcw)")
                     elif char_key == ord('v'):
@@ -295,6 +442,41 @@ class OpenLCWS:
         finally:
             self.cleanup()
     
+    def _log_stage_latencies(self, latency_ms: float):
+        """Accumulate this frame's latency and log per-stage latencies every STAGE_LOG_INTERVAL."""
+        now = time.monotonic()
+        self.stage_latency_total += latency_ms
+        self.stage_latency_frames += 1
+        if self.stage_log_time is None:
+            self.stage_log_time = now
+            return
+        if now - self.stage_log_time < STAGE_LOG_INTERVAL:
+            return
+        
+        # Lane stages since the last log
+        timings = self.lane_detector.get_stage_timings()
+        self.lane_detector.reset_stage_timings()
+        stages = ', '.join(f"{name} {ms:.1f}" for name, ms in timings.items() if name != 'total')
+        mean_latency = self.stage_latency_total / self.stage_latency_frames
+        message = (f"Stage latency (ms): capture-to-decision {mean_latency:.1f} | "
+                   f"lane {timings.get('total', 0.0):.1f} ({stages})")
+        
+        # FCW inferences since the last log
+        if self.async_detector:
+            stats = self.async_detector.get_stats()
+            processed = stats['frames_processed']
+            total_ms = stats['mean_inference_ms'] * processed
+            last_processed, last_total_ms = self.stage_fcw_totals
+            if processed > last_processed:
+                message += (f" | fcw inference {(total_ms - last_total_ms) / (processed - last_processed):.1f} "
+                            f"at {(processed - last_processed) / (now - self.stage_log_time):.1f}/s")
+            self.stage_fcw_totals = (processed, total_ms)
+        logger.info(message)
+        
+        self.stage_log_time = now
+        self.stage_latency_total = 0.0
+        self.stage_latency_frames = 0
+    
     def cleanup(self):
         """Clean up system resources."""
         logger.info("Cleaning up system resources...")
@@ -303,6 +485,8 @@ class OpenLCWS:
         
         # Clean up camera
         if self.camera:
+            if self.camera.threaded:
+                logger.info(f"Capture stats: {self.camera.get_capture_stats()}")
             self.camera.release()
         
         # Clean up collision detector
@@ -339,11 +523,13 @@ Examples:
   python main.py --mode demo --video demo.mp4   # Demo mode with specific video
   python main.py --mode live --threshold 30     # Live mode with custom threshold
   python main.py --mode live --no-display       # Live mode without display
+  python main.py --mode offline --video drive.mp4 --output drive.jsonl  # Batch analysis
         """
     )
     
-    parser.add_argument('--mode', choices=['live', 'demo'], default='live',
-                       help='Operation mode: live (webcam) or demo (video file)')
+    parser.add_argument('--mode', choices=['live', 'demo', 'offline'], default='live',
+                       help='Operation mode: live (webcam), demo (video file) or '
+                            'offline (headless single pass over a video file)')
     parser.add_argument('--video', type=str, default=None,
                        help='Path to demo video file (required for demo mode if no videos in demo_videos/)')
     parser.add_argument('--threshold', type=float, default=50.0,
@@ -364,6 +550,63 @@ Examples:
                        help='Enable Forward Collision Warning system')
     parser.add_argument('--fcw-confidence', type=float, default=0.5,
                        help='FCW detection confidence threshold (default: 0.5)')
+    parser.add_argument('--fcw-model', type=str, default=DEFAULT_MODEL,
+                       help=f"FCW detection model: {', '.join(get_available_models())}, or a JSON model "
+                            f"spec file for a custom Caffe/ONNX network (default: {DEFAULT_MODEL})")
+    parser.add_argument('--fcw-backend', type=str, default='thread', choices=['thread', 'process'],
+                       help="Run FCW inference on a worker thread or in a separate process that receives "
+                            "frames through shared memory, so it runs in parallel with lane detection "
+                            "(default: thread)")
+    parser.add_argument('--fcw-propagate', action='store_true',
+                       help='Track FCW boxes with optical flow between inferences so TTC updates every frame')
+    parser.add_argument('--fcw-corridor', action='store_true',
+                       help='Run FCW inference on the ego-lane corridor below the horizon instead of the whole frame')
+    parser.add_argument('--fcw-horizon-tile', action='store_true',
+                       help='Alternate FCW inferences with a full-resolution tile at the horizon for distant vehicles')
+    parser.add_argument('--fcw-adaptive', action='store_true',
+                       help='Pace FCW inferences by threat level: fast for closing vehicles, slow on an empty road')
+    parser.add_argument('--fcw-min-rate', type=float, default=2.0,
+                       help='Adaptive FCW inferences per second with an empty corridor (default: 2.0)')
+    parser.add_argument('--fcw-max-rate', type=float, default=10.0,
+                       help='Adaptive FCW inferences per second with an imminent or closing vehicle (default: 10.0)')
+    parser.add_argument('--lane-threads', type=int, default=None,
+                       help='OpenCV threads for lane detection (default: OpenCV chooses)')
+    parser.add_argument('--fcw-threads', type=int, default=None,
+                       help='OpenCV threads for FCW inference; separate from --lane-threads with '
+                            '--fcw-backend process (default: OpenCV chooses)')
+    parser.add_argument('--lane-cores', type=str, default=None,
+                       help='Cores for the main loop, e.g. "0,1" (default: any)')
+    parser.add_argument('--fcw-cores', type=str, default=None,
+                       help='Cores for the FCW worker, e.g. "2,3" (default: any)')
+    parser.add_argument('--capture-cores', type=str, default=None,
+                       help='Cores for the --threaded-capture thread, e.g. "0" (default: any)')
+    parser.add_argument('--lane-scale', type=float, default=1.0,
+                       help='Downscale factor for lane edge/line detection, e.g. 0.5 on a Pi (default: 1.0)')
+    parser.add_argument('--lane-backend', type=str, default='hough',
+                       choices=get_available_lane_backends(),
+                       help='Lane detection backend (default: hough)')
+    parser.add_argument('--lane-model', type=str, default=None,
+                       help='Model file for the segmentation lane backend '
+                            '(default: models/lane_segmentation.onnx)')
+    parser.add_argument('--lane-color', type=str, default=None, choices=['and', 'or'],
+                       help="Fuse a white/yellow paint mask with lane edges: 'and' drops "
+                            "edges off paint, 'or' adds faded paint (default: off)")
+    parser.add_argument('--roi-calibration', type=str, default=DEFAULT_CALIBRATION_PATH,
+                       help=f'ROI calibration file, loaded at start and written by the C key '
+                            f'(default: {DEFAULT_CALIBRATION_PATH})')
+    parser.add_argument('--lane-tracking', action='store_true',
+                       help='Track lanes in narrow bands between full searches every 10 frames')
+    parser.add_argument('--lane-roi-crop', action='store_true',
+                       help='Run lane blur and Canny on the ROI rectangle only: faster, but edges '
+                            'near its border can differ from full-frame processing')
+    parser.add_argument('--threaded-capture', action='store_true',
+                       help='Grab webcam frames on a background thread, keeping only the newest (live mode)')
+    parser.add_argument('--output', type=str, default='lcws_results.jsonl',
+                       help='Per-frame results file for offline mode (default: lcws_results.jsonl)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Worker processes for offline mode; the video is split into time ranges (default: 1)')
+    parser.add_argument('--overlap', type=float, default=2.0,
+                       help='Seconds of footage used to warm up each offline range (default: 2.0)')
     parser.add_argument('--list-videos', action='store_true',
                        help='List available demo videos and exit')
     
@@ -388,8 +631,8 @@ Examples:
         logger.error("Invalid resolution format. Use WxH (e.g., 1280x720)")
         return
     
-    # Validate demo mode
-    if args.mode == 'demo' and not args.video:
+    # Validate demo/offline mode
+    if args.mode in ('demo', 'offline') and not args.video:
         demo_videos = get_available_demo_videos()
         if not demo_videos:
             logger.error("No demo videos found. Please provide --video path or add videos to demo_videos/")
@@ -397,6 +640,38 @@ Examples:
         args.video = demo_videos[0]
         logger.info(f"Using demo video: {args.video}")
     
+    # Offline mode runs headless to completion without the live loop
+    if args.mode == 'offline':
+        try:
+            processor = OfflineProcessor(
+                video_path=args.video,
+                output_path=args.output,
+                threshold=args.threshold,
+                car_width=args.car_width,
+                lane_width=args.lane_width,
+                camera_offset=args.camera_offset,
+                enable_fcw=args.enable_fcw,
+                fcw_confidence=args.fcw_confidence,
+                lane_scale=args.lane_scale,
+                lane_tracking=args.lane_tracking,
+                lane_roi_crop=args.lane_roi_crop,
+                lane_backend=args.lane_backend,
+                lane_model=args.lane_model,
+                lane_color=args.lane_color,
+                fcw_corridor=args.fcw_corridor,
+                fcw_horizon_tile=args.fcw_horizon_tile,
+                fcw_model=args.fcw_model,
+                calibration_path=args.roi_calibration
+            )
+            summary = processor.run(workers=args.workers, overlap_seconds=args.overlap)
+            print(f"Processed {summary['frames']} frames in {summary['elapsed_s']:.1f}s "
+                  f"({summary['fps']:.1f} FPS), {summary['departure_frames']} departure frames")
+            print(f"Results written to {summary['output']}")
+        except Exception as e:
+            logger.error(f"Offline processing failed: {e}")
+            sys.exit(1)
+        return
+    
     # Set up signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -414,7 +689,30 @@ Examples:
             lane_width=args.lane_width,
             camera_offset=args.camera_offset,
             enable_fcw=args.enable_fcw,
-            fcw_confidence=args.fcw_confidence
+            fcw_confidence=args.fcw_confidence,
+            threaded_capture=args.threaded_capture,
+            lane_scale=args.lane_scale,
+            lane_tracking=args.lane_tracking,
+            lane_roi_crop=args.lane_roi_crop,
+            lane_backend=args.lane_backend,
+            lane_model=args.lane_model,
+            lane_color=args.lane_color,
+            calibration_path=args.roi_calibration,
+            fcw_propagate=args.fcw_propagate,
+            fcw_corridor=args.fcw_corridor,
+            fcw_horizon_tile=args.fcw_horizon_tile,
+            fcw_backend=args.fcw_backend,
+            fcw_adaptive=args.fcw_adaptive,
+            fcw_min_rate=args.fcw_min_rate,
+            fcw_max_rate=args.fcw_max_rate,
+            fcw_model=args.fcw_model,
+            core_budget=CoreBudget(
+                lane_threads=args.lane_threads,
+                fcw_threads=args.fcw_threads,
+                lane_cores=parse_core_list(args.lane_cores),
+                fcw_cores=parse_core_list(args.fcw_cores),
+                capture_cores=parse_core_list(args.capture_cores)
+            )
         )
         system.run()
     except Exception as e:
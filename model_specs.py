@@ -0,0 +1,242 @@
+"""
+FCW model specifications for OpenLCWS (Open Lane and Collision Warning System)
+Describes each detection network CollisionDetector can run: its files, input
+size, preprocessing, class map and output decoder. Networks are loaded with
+cv2.dnn from a Caffe prototxt/caffemodel pair or a single ONNX file.
+"""
+
+import os
+import json
+import cv2
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# VOC class labels for MobileNet-SSD
+VOC_CLASSES = [
+    "background", "aeroplane", "bicycle", "bird", "boat",
+    "bottle", "bus", "car", "cat", "chair",
+    "cow", "diningtable", "dog", "horse", "motorbike",
+    "person", "pottedplant", "sheep", "sofa", "train",
+    "tvmonitor"
+]
+
+# Vehicle class IDs (VOC indices): car=7, bus=6, motorbike=14
+VEHICLE_CLASS_IDS = {6, 7, 14}
+
+# COCO class labels (YOLO and most ONNX SSD exports)
+COCO_CLASSES = [
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck",
+    "boat", "traffic light", "fire hydrant", "stop sign", "parking meter", "bench",
+    "bird", "cat", "dog", "horse", "sheep", "cow", "elephant", "bear", "zebra",
+    "giraffe", "backpack", "umbrella", "handbag", "tie", "suitcase", "frisbee",
+    "skis", "snowboard", "sports ball", "kite", "baseball bat", "baseball glove",
+    "skateboard", "surfboard", "tennis racket", "bottle", "wine glass", "cup",
+    "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch",
+    "potted plant", "bed", "dining table", "toilet", "tv", "laptop", "mouse",
+    "remote", "keyboard", "cell phone", "microwave", "oven", "toaster", "sink",
+    "refrigerator", "book", "clock", "vase", "scissors", "teddy bear",
+    "hair drier", "toothbrush"
+]
+
+# Vehicle class IDs (COCO indices): car=2, motorcycle=3, bus=5, truck=7
+COCO_VEHICLE_CLASS_IDS = {2, 3, 5, 7}
+
+# Class maps a spec file can name instead of listing labels
+CLASS_MAPS = {
+    'voc': (VOC_CLASSES, VEHICLE_CLASS_IDS),
+    'coco': (COCO_CLASSES, COCO_VEHICLE_CLASS_IDS)
+}
+
+# Output decoders CollisionDetector implements
+DECODERS = ('ssd', 'yolov8')
+
+
+class ModelSpec(NamedTuple):
+    """How to load, feed and decode one detection network."""
+    name: str
+    model: str                      # .caffemodel or .onnx, relative to the model directory
+    config: Optional[str]           # Caffe .prototxt (None for ONNX)
+    input_size: Tuple[int, int]     # (width, height) the network is fed
+    scale: float                    # Pixel scale factor applied after mean subtraction
+    mean: Tuple[float, float, float]
+    swap_rb: bool                   # Feed RGB instead of BGR
+    labels: Tuple[str, ...]         # Label of each class ID
+    vehicle_classes: frozenset      # Class IDs kept as vehicles
+    decoder: str                    # 'ssd' (DetectionOutput rows) or 'yolov8'
+
+
+MOBILENET_SSD = ModelSpec(
+    name='mobilenet-ssd',
+    model='MobileNetSSD_deploy.caffemodel',
+    config='MobileNetSSD_deploy.prototxt',
+    input_size=(300, 300),
+    scale=0.007843,
+    mean=(127.5, 127.5, 127.5),
+    swap_rb=False,
+    labels=tuple(VOC_CLASSES),
+    vehicle_classes=frozenset(VEHICLE_CLASS_IDS),
+    decoder='ssd'
+)
+
+YOLOV8N = ModelSpec(
+    name='yolov8n',
+    model='yolov8n.onnx',
+    config=None,
+    input_size=(640, 640),
+    scale=1.0 / 255.0,
+    mean=(0.0, 0.0, 0.0),
+    swap_rb=True,
+    labels=tuple(COCO_CLASSES),
+    vehicle_classes=frozenset(COCO_VEHICLE_CLASS_IDS),
+    decoder='yolov8'
+)
+
+DEFAULT_MODEL = MOBILENET_SSD.name
+
+# Registry of model name -> spec, extended with register_model_spec()
+MODEL_SPECS: Dict[str, ModelSpec] = {
+    MOBILENET_SSD.name: MOBILENET_SSD,
+    YOLOV8N.name: YOLOV8N
+}
+
+
+def register_model_spec(spec: ModelSpec):
+    """
+    Register a model spec under its name.
+
+    Args:
+        spec: ModelSpec with a unique name
+    """
+    if spec.decoder not in DECODERS:
+        raise ValueError(f"Unknown output decoder: {spec.decoder} (available: {', '.join(DECODERS)})")
+    MODEL_SPECS[spec.name] = spec
+
+
+def get_available_models() -> List[str]:
+    """Get the names of all registered model specs."""
+    return list(MODEL_SPECS)
+
+
+def load_model_spec(path: str) -> ModelSpec:
+    """
+    Read a model spec from a JSON file.
+
+    File paths in the spec are taken relative to the JSON file. Example:
+
+        {"name": "ssdlite-int8", "model": "ssdlite_int8.onnx",
+         "input_size": [320, 320], "scale": 0.007843, "mean": 127.5,
+         "classes": "coco", "decoder": "ssd"}
+
+    "classes" is "voc", "coco", or a list of labels (then "vehicle_classes"
+    lists the class IDs to keep). "config" names a Caffe prototxt.
+
+    Args:
+        path: Path to the JSON file
+
+    Returns:
+        ModelSpec with absolute file paths
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    classes = data.get('classes', 'voc')
+    if isinstance(classes, str):
+        labels, vehicle_classes = CLASS_MAPS[classes]
+    else:
+        labels, vehicle_classes = classes, ()
+    vehicle_classes = data.get('vehicle_classes', vehicle_classes)
+
+    mean = data.get('mean', 0.0)
+    if not isinstance(mean, (list, tuple)):
+        mean = (mean, mean, mean)
+    config = data.get('config')
+
+    spec = ModelSpec(
+        name=data.get('name', os.path.splitext(os.path.basename(path))[0]),
+        model=os.path.join(base_dir, data['model']),
+        config=os.path.join(base_dir, config) if config else None,
+        input_size=tuple(data['input_size']),
+        scale=float(data.get('scale', 1.0)),
+        mean=tuple(float(v) for v in mean),
+        swap_rb=bool(data.get('swap_rb', False)),
+        labels=tuple(labels),
+        vehicle_classes=frozenset(vehicle_classes),
+        decoder=data.get('decoder', 'ssd')
+    )
+    if spec.decoder not in DECODERS:
+        raise ValueError(f"Unknown output decoder: {spec.decoder} (available: {', '.join(DECODERS)})")
+    return spec
+
+
+def resolve_model_spec(model: str) -> ModelSpec:
+    """
+    Look up a registered model name, or read a spec from a .json path.
+
+    Args:
+        model: Registered model name or path to a JSON spec file
+
+    Returns:
+        ModelSpec
+    """
+    if model in MODEL_SPECS:
+        return MODEL_SPECS[model]
+    if model.endswith('.json'):
+        return load_model_spec(model)
+    raise ValueError(f"Unknown FCW model: {model} (available: {', '.join(MODEL_SPECS)}, or a .json spec)")
+
+
+def model_files(spec: ModelSpec, model_dir: str) -> List[str]:
+    """Paths of the files a spec needs (absolute spec paths are kept)."""
+    files = [os.path.join(model_dir, spec.model)]
+    if spec.config:
+        files.insert(0, os.path.join(model_dir, spec.config))
+    return files
+
+
+def select_dnn_target(prefer_fp16: bool = True) -> Tuple[int, str]:
+    """
+    Pick the cv2.dnn CPU target: FP16 where this OpenCV build supports it.
+
+    Returns:
+        (target constant, target name)
+    """
+    fp16 = getattr(cv2.dnn, 'DNN_TARGET_CPU_FP16', None)
+    if prefer_fp16 and fp16 is not None:
+        try:
+            if fp16 in cv2.dnn.getAvailableTargets(cv2.dnn.DNN_BACKEND_OPENCV):
+                return fp16, 'cpu_fp16'
+        except cv2.error:
+            pass
+    return cv2.dnn.DNN_TARGET_CPU, 'cpu'
+
+
+def load_network(spec: ModelSpec, model_dir: str, prefer_fp16: bool = True):
+    """
+    Load a spec's network with cv2.dnn on the CPU backend.
+
+    Args:
+        spec: Model to load
+        model_dir: Directory relative spec paths are resolved against
+        prefer_fp16: Use the FP16 CPU target when available
+
+    Returns:
+        (cv2.dnn network, target name)
+    """
+    files = model_files(spec, model_dir)
+    if spec.config:
+        net = cv2.dnn.readNetFromCaffe(files[0], files[1])
+    else:
+        net = cv2.dnn.readNet(files[0])
+
+    # Use OpenCV's CPU backend — leverages NEON SIMD on ARM (RPi)
+    target, target_name = select_dnn_target(prefer_fp16)
+    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+    net.setPreferableTarget(target)
+    return net, target_name
@@ -0,0 +1,332 @@
+"""
+Offline processing module for OpenLCWS (Open Lane and Collision Warning System)
+Runs lane detection and FCW over a recorded video as fast as possible, without
+display or frame pacing, and writes per-frame results to a JSONL file.
+Long recordings can be split into time ranges processed on a process pool.
+"""
+
+import cv2
+import json
+import math
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple, Iterator
+
+from camera_module import CameraModule, CapturedFrame
+from lane_detector import create_lane_detector
+from lane_backends import lane_backend_options
+from collision_detector import CollisionDetector, TrackedObject
+from model_specs import DEFAULT_MODEL
+from roi_calibration import load_calibration
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _finite_or_none(value: Optional[float]) -> Optional[float]:
+    """Convert numpy scalars to float and map inf/NaN to None (valid JSON)."""
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _track_to_dict(obj: TrackedObject) -> Dict:
+    """Serialize a tracked object for the results file."""
+    return {
+        'track_id': obj.track_id,
+        'label': obj.label,
+        'confidence': round(float(obj.confidence), 4),
+        'bbox': [int(v) for v in obj.bbox],
+        'ttc': _finite_or_none(obj.ttc)
+    }
+
+
+def build_frame_record(captured: CapturedFrame, lane_result: Dict,
+                       tracked: List[TrackedObject],
+                       closest: Optional[TrackedObject]) -> Dict:
+    """
+    Build the per-frame output record.
+
+    Args:
+        captured: Frame that was processed
+        lane_result: Result dict from the lane detector
+        tracked: FCW tracked objects for this frame
+        closest: Most imminent FCW threat, if any
+
+    Returns:
+        JSON-serializable dictionary
+    """
+    return {
+        'frame_id': captured.frame_id,
+        'pos_msec': _finite_or_none(captured.pos_msec),
+        'offset': _finite_or_none(lane_result['offset']),
+        'lane_center': _finite_or_none(lane_result['lane_center']),
+        'left_intercept': _finite_or_none(lane_result.get('left_intercept')),
+        'right_intercept': _finite_or_none(lane_result.get('right_intercept')),
+        'departure_threshold': _finite_or_none(lane_result.get('departure_threshold')),
+        'off_lane': bool(lane_result['off_lane']),
+        'fcw_tracks': [_track_to_dict(obj) for obj in tracked],
+        'closest_ttc': _finite_or_none(closest.ttc) if closest else None
+    }
+
+
+class OfflineProcessor:
+    """
+    Headless single-pass processor for recorded drives.
+    """
+
+    def __init__(self, video_path: str, output_path: str,
+                 threshold: float = 50.0,
+                 car_width: float = 70.0, lane_width: float = 144.0,
+                 camera_offset: float = 0.0,
+                 enable_fcw: bool = False, fcw_confidence: float = 0.5,
+                 lane_scale: float = 1.0, lane_tracking: bool = False,
+                 lane_roi_crop: bool = False,
+                 lane_backend: str = 'hough',
+                 lane_model: Optional[str] = None, lane_color: Optional[str] = None,
+                 fcw_corridor: bool = False, fcw_horizon_tile: bool = False,
+                 fcw_model: str = DEFAULT_MODEL,
+                 calibration_path: Optional[str] = None):
+        """
+        Initialize offline processor.
+
+        Args:
+            video_path: Path to the recorded video
+            output_path: Path of the JSONL results file to write
+            threshold: Lane departure threshold in pixels (fallback)
+            car_width: Real-world width of car (inches)
+            lane_width: Real-world lane width (inches)
+            camera_offset: Offset of camera from true center of car (inches)
+            enable_fcw: Run Forward Collision Warning on every frame
+            fcw_confidence: Minimum confidence for FCW detections
+            lane_scale: Processing scale for lane detection
+            lane_tracking: Track lanes between periodic full Hough searches
+            lane_roi_crop: Run lane blur and Canny on the ROI rectangle only (approximate)
+            lane_backend: Registered lane detection backend
+            lane_model: Model file for the segmentation lane backend
+            lane_color: Fuse a white/yellow paint mask with lane edges ('and'/'or')
+            fcw_corridor: Run FCW inference on the ego-lane corridor
+            fcw_horizon_tile: Alternate FCW inferences with a horizon tile
+            fcw_model: Registered FCW model name or path to a JSON model spec
+            calibration_path: Saved ROI calibration to apply (None = default ROI)
+        """
+        self.video_path = video_path
+        self.output_path = output_path
+        self.threshold = threshold
+        self.car_width = car_width
+        self.lane_width = lane_width
+        self.camera_offset = camera_offset
+        self.enable_fcw = enable_fcw
+        self.fcw_confidence = fcw_confidence
+        self.lane_scale = lane_scale
+        self.lane_tracking = lane_tracking
+        self.lane_roi_crop = lane_roi_crop
+        self.lane_backend = lane_backend
+        self.lane_model = lane_model
+        self.lane_color = lane_color
+        self.fcw_corridor = fcw_corridor
+        self.fcw_horizon_tile = fcw_horizon_tile
+        self.fcw_model = fcw_model
+        self.calibration_path = calibration_path
+
+    def _create_detectors(self):
+        """Create fresh lane and collision detectors."""
+        lane_detector = create_lane_detector(
+            departure_threshold=self.threshold,
+            car_width=self.car_width,
+            lane_width=self.lane_width,
+            camera_offset=self.camera_offset,
+            processing_scale=self.lane_scale,
+            roi_crop=self.lane_roi_crop,
+            tracking=self.lane_tracking,
+            backend=self.lane_backend,
+            backend_options=lane_backend_options(self.lane_backend, self.lane_model),
+            color_fusion=self.lane_color
+        )
+
+        collision_detector = None
+        if self.enable_fcw:
+            collision_detector = CollisionDetector(confidence_threshold=self.fcw_confidence,
+                                                   corridor_crop=self.fcw_corridor,
+                                                   horizon_tile=self.fcw_horizon_tile,
+                                                   model=self.fcw_model)
+            if not collision_detector.is_initialized:
+                logger.warning("FCW model unavailable — writing lane results only")
+                collision_detector = None
+
+        return lane_detector, collision_detector
+
+    def _apply_calibration(self, frame_shape: Tuple[int, int], lane_detector,
+                           collision_detector: Optional[CollisionDetector]):
+        """Use the saved calibration's ROI for lanes and its horizon for FCW input placement."""
+        if not self.calibration_path:
+            return
+        calibration = load_calibration(self.calibration_path, frame_shape)
+        if calibration is None:
+            return
+        lane_detector.set_roi_vertices(calibration['vertices'])
+        if collision_detector is not None:
+            collision_detector.set_horizon(calibration['horizon_y'])
+
+    def process_range(self, start_frame: int = 0, end_frame: Optional[int] = None,
+                      warmup_frames: int = 0) -> Iterator[Dict]:
+        """
+        Process a range of frames with fresh detectors, yielding records as they are made.
+
+        The detectors first run over up to warmup_frames frames before start_frame
+        so temporal state (lane center/width smoothing, FCW tracks) is settled
+        when the first reported frame arrives. Warm-up frames are not reported.
+
+        Args:
+            start_frame: Zero-based index of the first frame to report
+            end_frame: Index one past the last frame to report (None = end of video)
+            warmup_frames: Number of frames to run before start_frame
+
+        Yields:
+            Per-frame records in frame order
+        """
+        camera = CameraModule(source='demo', video_path=self.video_path, loop=False)
+        if not camera.is_initialized:
+            raise RuntimeError(f"Failed to open video: {self.video_path}")
+
+        lane_detector, collision_detector = self._create_detectors()
+
+        try:
+            first_frame = max(0, start_frame - warmup_frames)
+            if first_frame > 0:
+                camera.seek(first_frame)
+            calibrated = False
+
+            while True:
+                captured = camera.read_frame()
+                if captured is None:
+                    break
+
+                # frame_id is 1-based, so the zero-based index is frame_id - 1
+                frame_index = captured.frame_id - 1
+                if end_frame is not None and frame_index >= end_frame:
+                    break
+
+                if not calibrated:
+                    # The calibration is rescaled to the video's frame size
+                    self._apply_calibration(captured.image.shape[:2], lane_detector,
+                                            collision_detector)
+                    calibrated = True
+
+                lane_result = lane_detector.detect(captured.image,
+                                                   timestamp=captured.timestamp)
+
+                tracked, closest = [], None
+                if collision_detector is not None:
+                    tracked, closest = collision_detector.process_frame(
+                        captured.image,
+                        lane_result.get('left_intercept'),
+                        lane_result.get('right_intercept'),
+                        captured.timestamp
+                    )
+
+                if frame_index >= start_frame:
+                    yield build_frame_record(captured, lane_result, tracked, closest)
+        finally:
+            camera.release()
+
+    def _plan_chunks(self, workers: int, chunk_seconds: float) -> List[Tuple[int, Optional[int]]]:
+        """Split the video into (start_frame, end_frame) ranges."""
+        cap = cv2.VideoCapture(self.video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+
+        if total_frames <= 0:
+            # Unknown length (some containers) — fall back to a single range
+            return [(0, None)]
+
+        chunk_frames = max(1, int(chunk_seconds * fps))
+        num_chunks = max(workers, math.ceil(total_frames / chunk_frames))
+        chunk_frames = math.ceil(total_frames / num_chunks)
+
+        chunks = []
+        for start in range(0, total_frames, chunk_frames):
+            chunks.append((start, start + chunk_frames))
+        # Let the last range run to the real end in case FRAME_COUNT is approximate
+        chunks[-1] = (chunks[-1][0], None)
+        return chunks
+
+    def run(self, workers: int = 1, overlap_seconds: float = 2.0,
+            chunk_seconds: float = 60.0) -> Dict:
+        """
+        Process the whole video once and write results.
+
+        With workers > 1 the video is split into time ranges that are processed
+        in separate processes, each with its own detectors warmed up on
+        overlap_seconds of preceding footage, and the records are merged in order.
+
+        Args:
+            workers: Number of worker processes (1 = single stream in this process)
+            overlap_seconds: Warm-up footage decoded before each range
+            chunk_seconds: Target length of each range
+
+        Returns:
+            Summary dictionary with frame count, elapsed time and throughput
+        """
+        start_time = time.perf_counter()
+
+        frames = 0
+        departures = 0
+        with open(self.output_path, 'w') as out:
+            for record in self._iter_records(workers, overlap_seconds, chunk_seconds):
+                out.write(json.dumps(record) + '\n')
+                departures += record['off_lane']
+                frames += 1
+
+        elapsed = time.perf_counter() - start_time
+        summary = {
+            'frames': frames,
+            'elapsed_s': elapsed,
+            'fps': frames / elapsed if elapsed > 0 else 0.0,
+            'departure_frames': departures,
+            'workers': workers,
+            'output': self.output_path
+        }
+        logger.info(f"Processed {frames} frames in {elapsed:.1f}s "
+                    f"({summary['fps']:.1f} FPS, {workers} worker(s)) -> {self.output_path}")
+        return summary
+
+    def _iter_records(self, workers: int, overlap_seconds: float,
+                      chunk_seconds: float) -> Iterator[Dict]:
+        """Yield per-frame records in frame order."""
+        if workers <= 1:
+            # Single stream: each record is written as soon as its frame is done
+            yield from self.process_range()
+            return
+
+        cap = cv2.VideoCapture(self.video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        warmup_frames = int(overlap_seconds * fps)
+
+        chunks = self._plan_chunks(workers, chunk_seconds)
+        logger.info(f"Processing {len(chunks)} ranges on {workers} worker processes")
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(_process_chunk, self, start, end, warmup_frames)
+                for start, end in chunks
+            ]
+            # Collect in submission order so the output stays in frame order
+            for future in futures:
+                yield from future.result()
+
+
+def _init_worker():
+    """Keep each worker process to one OpenCV thread so processes don't oversubscribe cores."""
+    cv2.setNumThreads(1)
+
+
+def _process_chunk(processor: OfflineProcessor, start_frame: int,
+                   end_frame: Optional[int], warmup_frames: int) -> List[Dict]:
+    """Process-pool entry point for one range."""
+    return list(processor.process_range(start_frame, end_frame, warmup_frames))
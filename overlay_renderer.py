@@ -0,0 +1,56 @@
+"""
+Overlay rendering module for OpenLCWS (Open Lane and Collision Warning System)
+Draws lane detection overlays onto a single reused frame buffer, so headless
+runs never allocate display images and display runs copy each frame only once.
+"""
+
+import numpy as np
+from typing import Dict, Optional
+
+from utils import draw_lane_overlays
+
+
+class OverlayRenderer:
+    """
+    Renders detection results onto a persistent frame-sized buffer.
+    """
+
+    def __init__(self):
+        """Initialize renderer; the buffer is allocated on first use."""
+        self.buffer: Optional[np.ndarray] = None
+        self.allocations = 0  # Buffer (re)allocations, for diagnostics
+
+    def begin(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Copy a frame into the reusable buffer.
+
+        Args:
+            frame: Source BGR frame (left untouched)
+
+        Returns:
+            The buffer holding a copy of the frame, ready to draw on
+        """
+        if self.buffer is None or self.buffer.shape != frame.shape or self.buffer.dtype != frame.dtype:
+            self.buffer = np.empty_like(frame)
+            self.allocations += 1
+        np.copyto(self.buffer, frame)
+        return self.buffer
+
+    def render_lanes(self, frame: np.ndarray, lane_result: Dict,
+                     departure_threshold: float,
+                     roi_vertices: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Draw lane overlays for a detection result.
+
+        Args:
+            frame: Frame the result was computed from
+            lane_result: Result dict from LaneDetector.detect()
+            departure_threshold: Current departure threshold in pixels
+            roi_vertices: ROI polygon to outline
+
+        Returns:
+            The reused buffer with overlays drawn
+        """
+        buffer = self.begin(frame)
+        return draw_lane_overlays(buffer, lane_result['lines'], lane_result['offset'],
+                                  departure_threshold, roi_vertices)
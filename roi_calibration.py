@@ -0,0 +1,338 @@
+"""
+ROI calibration module for OpenLCWS (Open Lane and Collision Warning System)
+Accumulates left/right lane line intersections over a few seconds of driving
+into a vanishing-point histogram, derives the horizon and the tightest ROI
+trapezoid from it, and persists the result between runs.
+"""
+
+import os
+import cv2
+import json
+import time
+import numpy as np
+from typing import Optional, Dict, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALIBRATION_PATH = "roi_calibration.json"
+
+
+class VanishingPointCalibrator:
+    """
+    Incremental vanishing-point ROI calibration.
+
+    Call start(), then add_frame() once per loop iteration; each call costs one
+    downscaled Canny + Hough pass, so calibration never stalls the live loop.
+    After duration seconds the result is available from get_result().
+    """
+
+    def __init__(self,
+                 duration: float = 3.0,
+                 min_frames: int = 30,
+                 min_intersections: int = 50,
+                 work_width: int = 640,
+                 cell_size: int = 8,
+                 top_margin: float = 0.15,
+                 side_margin: float = 0.05,
+                 vp_tolerance: float = 0.02):
+        """
+        Initialize calibrator.
+
+        Args:
+            duration: Seconds of footage to accumulate
+            min_frames: Minimum frames to accumulate, even if duration elapsed
+            min_intersections: Line pairs needed for a trustworthy vanishing point
+            work_width: Width frames are downscaled to for line detection
+            cell_size: Vanishing-point histogram cell size (full-frame pixels)
+            top_margin: Fraction of the horizon-to-bottom distance kept clear
+                        below the horizon (lanes merge there)
+            side_margin: Extra width added outside the outermost lanes, as a
+                         fraction of the frame width
+            vp_tolerance: Distance from the vanishing point, as a fraction of
+                          the frame width, within which a line counts as a lane
+        """
+        self.duration = duration
+        self.min_frames = min_frames
+        self.min_intersections = min_intersections
+        self.work_width = work_width
+        self.cell_size = cell_size
+        self.top_margin = top_margin
+        self.side_margin = side_margin
+        self.vp_tolerance = vp_tolerance
+
+        self.active = False
+        self.result: Optional[Dict] = None
+        self._reset_accumulators(None)
+
+    def _reset_accumulators(self, frame_shape: Optional[Tuple[int, int]]):
+        """Clear accumulated evidence for a new run."""
+        self.frame_shape = frame_shape
+        self.start_time: Optional[float] = None
+        self.frames = 0
+        self.intersections = 0
+        self.histogram: Optional[np.ndarray] = None
+        if frame_shape is not None:
+            height, width = frame_shape
+            self.histogram = np.zeros(((height + self.cell_size - 1) // self.cell_size,
+                                       (width + self.cell_size - 1) // self.cell_size),
+                                      dtype=np.float64)
+        # Lane-like segments seen so far as (slope, intercept, lower end x, lower end y) rows
+        self.segments = []
+
+    def start(self):
+        """Begin a new calibration run."""
+        self.active = True
+        self.result = None
+        self._reset_accumulators(None)
+        logger.info(f"ROI calibration started — drive in lane for {self.duration:.0f}s")
+
+    def add_frame(self, frame: np.ndarray, timestamp: Optional[float] = None) -> bool:
+        """
+        Accumulate one frame.
+
+        Args:
+            frame: BGR frame
+            timestamp: Frame time in seconds (monotonic fallback)
+
+        Returns:
+            True when this frame completed the calibration run
+        """
+        if not self.active or frame is None:
+            return False
+
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        if self.frame_shape != frame.shape[:2]:
+            self._reset_accumulators(frame.shape[:2])
+        if self.start_time is None:
+            self.start_time = timestamp
+
+        lines = self._detect_segments(frame)
+        if lines is not None:
+            self._accumulate(lines)
+        self.frames += 1
+
+        if timestamp - self.start_time >= self.duration and self.frames >= self.min_frames:
+            self.active = False
+            self.result = self._solve()
+            return True
+        return False
+
+    def progress(self, timestamp: Optional[float] = None) -> float:
+        """Fraction of the calibration duration elapsed (0-1)."""
+        if not self.active or self.start_time is None:
+            return 0.0 if self.active else 1.0
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        return min(1.0, (timestamp - self.start_time) / self.duration)
+
+    def get_result(self) -> Optional[Dict]:
+        """Calibration result of the last completed run, or None if it failed."""
+        return self.result
+
+    def _detect_segments(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Find line segments in the lower part of a downscaled frame, in full-frame pixels."""
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.work_width / float(width))
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+
+        # The road is below the horizon; the sky and the top of the frame add only clutter
+        edges[:int(edges.shape[0] * 0.35)] = 0
+
+        lines = cv2.HoughLinesP(edges, rho=1, theta=np.pi / 180,
+                                threshold=max(1, int(round(40 * scale))),
+                                minLineLength=60 * scale, maxLineGap=30 * scale)
+        if lines is None:
+            return None
+        return lines.reshape(-1, 4).astype(np.float64) / scale
+
+    def _accumulate(self, segments: np.ndarray):
+        """Vote left/right segment pair intersections into the histogram."""
+        height, width = self.frame_shape
+        x1, y1, x2, y2 = segments.T
+        dx = x2 - x1
+        dy = y2 - y1
+        slope = dy / np.where(dx == 0, 1e-6, dx)
+        length = np.hypot(dx, dy)
+
+        # Lane-like slopes only; left lanes rise to the right in image terms
+        lane_like = (np.abs(slope) >= 0.3) & (np.abs(slope) <= 3.0)
+        left = lane_like & (slope < 0)
+        right = lane_like & (slope > 0)
+        if not left.any() or not right.any():
+            return
+
+        # Lines as y = m*x + c
+        c = y1 - slope * x1
+        lane = left | right
+        lower_first = y1 >= y2
+        low_x = np.where(lower_first, x1, x2)
+        low_y = np.where(lower_first, y1, y2)
+        self.segments.append(np.stack([slope[lane], c[lane], low_x[lane], low_y[lane]], axis=1))
+
+        # All left x right intersections at once
+        ml, cl, wl = slope[left][:, None], c[left][:, None], length[left][:, None]
+        mr, cr, wr = slope[right][None, :], c[right][None, :], length[right][None, :]
+        ix = (cr - cl) / (ml - mr)
+        iy = ml * ix + cl
+        weights = (wl * wr).ravel()
+        ix = ix.ravel()
+        iy = iy.ravel()
+
+        inside = (ix >= 0) & (ix < width) & (iy >= 0) & (iy < height)
+        if not inside.any():
+            return
+        cells_x = (ix[inside] // self.cell_size).astype(np.int64)
+        cells_y = (iy[inside] // self.cell_size).astype(np.int64)
+        index = cells_y * self.histogram.shape[1] + cells_x
+        self.histogram += np.bincount(index, weights=weights[inside],
+                                      minlength=self.histogram.size).reshape(self.histogram.shape)
+        self.intersections += int(inside.sum())
+
+    def _solve(self) -> Optional[Dict]:
+        """Derive vanishing point, horizon and ROI trapezoid from the evidence."""
+        if self.histogram is None or self.intersections < self.min_intersections:
+            logger.warning(f"ROI calibration failed: only {self.intersections} lane intersections "
+                           f"in {self.frames} frames")
+            return None
+
+        height, width = self.frame_shape
+
+        # Step 1: Vanishing point = peak of the smoothed histogram, refined
+        # to the weighted centroid of the 3x3 cells around it
+        smoothed = cv2.GaussianBlur(self.histogram.astype(np.float32), (5, 5), 0)
+        peak_y, peak_x = np.unravel_index(int(np.argmax(smoothed)), smoothed.shape)
+        y_lo, y_hi = max(0, peak_y - 1), min(smoothed.shape[0], peak_y + 2)
+        x_lo, x_hi = max(0, peak_x - 1), min(smoothed.shape[1], peak_x + 2)
+        window = self.histogram[y_lo:y_hi, x_lo:x_hi]
+        cy, cx = np.mgrid[y_lo:y_hi, x_lo:x_hi]
+        total = window.sum()
+        if total > 0:
+            vp_x = float(((cx + 0.5) * window).sum() / total * self.cell_size)
+            vp_y = float(((cy + 0.5) * window).sum() / total * self.cell_size)
+        else:
+            vp_x = (peak_x + 0.5) * self.cell_size
+            vp_y = (peak_y + 0.5) * self.cell_size
+
+        # Step 2: Keep the segments whose lines pass near the vanishing point;
+        # the rest is texture, cracks and other vehicles
+        slope, c, low_x, low_y = np.concatenate(self.segments).T
+        vp_distance = np.abs(slope * vp_x + c - vp_y) / np.sqrt(slope ** 2 + 1)
+        lane = vp_distance <= self.vp_tolerance * width
+        left = lane & (slope < 0)
+        right = lane & (slope > 0)
+        if not left.any() or not right.any():
+            logger.warning("ROI calibration failed: no lanes on both sides converge on the vanishing point")
+            return None
+        
+        # Bottom edge at the lowest lane evidence (above the hood)
+        bottom_y = float(min(height, np.percentile(low_y[lane], 95)))
+        top_y = vp_y + self.top_margin * (bottom_y - vp_y)
+        if bottom_y - top_y < 20:
+            logger.warning("ROI calibration failed: vanishing point too close to the lane bottom")
+            return None
+
+        # Step 3: Bottom corners just outside the outermost near-field lane
+        # evidence (lower half between horizon and bottom, where curves have
+        # not bent the lanes away yet). Each segment's lower end is projected
+        # to bottom_y along the ray from the vanishing point.
+        below = low_y > (vp_y + bottom_y) / 2.0
+        reach = (bottom_y - vp_y) / np.where(below, low_y - vp_y, 1.0)
+        bottom_x = vp_x + (low_x - vp_x) * reach
+        left &= below
+        right &= below
+        if not left.any() or not right.any():
+            logger.warning("ROI calibration failed: no near-field lane evidence on both sides")
+            return None
+        margin = self.side_margin * width
+        left_bottom_x = float(np.percentile(bottom_x[left], 10)) - margin
+        right_bottom_x = float(np.percentile(bottom_x[right], 90)) + margin
+
+        s = (top_y - vp_y) / (bottom_y - vp_y)
+        vertices = np.array([
+            [left_bottom_x, bottom_y],
+            [vp_x + (left_bottom_x - vp_x) * s, top_y],
+            [vp_x + (right_bottom_x - vp_x) * s, top_y],
+            [right_bottom_x, bottom_y]
+        ])
+        vertices[:, 0] = np.clip(vertices[:, 0], 0, width - 1)
+        vertices[:, 1] = np.clip(vertices[:, 1], 0, height - 1)
+
+        result = {
+            'vertices': np.round(vertices).astype(np.int32),
+            'vanishing_point': (vp_x, vp_y),
+            'horizon_y': vp_y,
+            'frame_shape': (height, width),
+            'frames': self.frames,
+            'intersections': self.intersections
+        }
+        logger.info(f"ROI calibrated from {self.frames} frames: vanishing point "
+                    f"({vp_x:.0f}, {vp_y:.0f}), ROI {result['vertices'].tolist()}")
+        return result
+
+
+def save_calibration(result: Dict, path: str = DEFAULT_CALIBRATION_PATH):
+    """
+    Persist a calibration result as JSON.
+
+    Args:
+        result: Result from VanishingPointCalibrator.get_result()
+        path: Output file path
+    """
+    data = {
+        'vertices': result['vertices'].tolist(),
+        'vanishing_point': list(result['vanishing_point']),
+        'horizon_y': result['horizon_y'],
+        'frame_shape': list(result['frame_shape']),
+        'frames': result['frames'],
+        'intersections': result['intersections'],
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    logger.info(f"Saved ROI calibration to {path}")
+
+
+def load_calibration(path: str = DEFAULT_CALIBRATION_PATH,
+                     frame_shape: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
+    """
+    Load a saved calibration, rescaled to frame_shape if it differs.
+
+    Args:
+        path: Calibration file path
+        frame_shape: (height, width) of the frames it will be used on
+
+    Returns:
+        Calibration dictionary (vertices as an int32 (4, 2) array), or None
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        vertices = np.array(data['vertices'], dtype=np.float64)
+        vanishing_point = np.array(data['vanishing_point'], dtype=np.float64)
+        saved_shape = tuple(data['frame_shape'])
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Failed to load ROI calibration from {path}: {e}")
+        return None
+
+    if frame_shape is not None and tuple(frame_shape) != saved_shape:
+        factors = np.array([frame_shape[1] / saved_shape[1], frame_shape[0] / saved_shape[0]])
+        vertices *= factors
+        vanishing_point *= factors
+        saved_shape = tuple(frame_shape)
+
+    return {
+        'vertices': np.round(vertices).astype(np.int32),
+        'vanishing_point': tuple(vanishing_point),
+        'horizon_y': float(vanishing_point[1]),
+        'frame_shape': saved_shape,
+        'frames': data.get('frames', 0),
+        'intersections': data.get('intersections', 0)
+    }
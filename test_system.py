@@ -103,6 +103,46 @@ def test_utils_functions():
         return False
 
 
+def test_lane_center():
+    """Test lane center estimation from fixed line segments."""
+    logger.info("Testing lane center calculation...")
+    
+    try:
+        import numpy as np
+        from utils import calculate_lane_center
+        
+        def segments(*rows):
+            return np.array(rows, dtype=np.int32).reshape(-1, 1, 4)
+        
+        left = (100, 700, 300, 500)        # slope -1, meets y=720 at x=80
+        right = (1000, 500, 1200, 700)     # slope +1, meets y=720 at x=1220
+        vertical = (640, 400, 640, 700)
+        horizontal = (0, 600, 1280, 600)
+        
+        assert calculate_lane_center(None, 1280) == (None, None, None), "None input not handled"
+        assert calculate_lane_center(segments(vertical, horizontal), 1280) == (None, None, None), \
+            "Vertical or horizontal segment taken as a lane"
+        
+        center, left_x, right_x = calculate_lane_center(segments(left, vertical, right, horizontal), 1280)
+        assert (center, left_x, right_x) == (650.0, 80.0, 1220.0), f"Wrong lanes: {center}, {left_x}, {right_x}"
+        assert calculate_lane_center(segments(left), 1280) == (280.0, 80.0, None), "Left-only estimate wrong"
+        assert calculate_lane_center(segments(right), 1280) == (1020.0, None, 1220.0), "Right-only estimate wrong"
+        logger.info("✓ Intercepts and center from fixed segments")
+        
+        # A short stray segment (intercept 200) pulls the plain median, not the weighted one
+        stray = (400, 520, 420, 500)
+        _, plain, _ = calculate_lane_center(segments(left, stray), 1280)
+        _, weighted, _ = calculate_lane_center(segments(left, stray), 1280, weight_by_length=True)
+        assert plain == 140.0 and weighted == 80.0, f"Length weighting wrong: {plain}, {weighted}"
+        logger.info("✓ Length weighting favours the long segment")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Lane center test failed: {e}")
+        return False
+
+
 def test_camera_module():
     """Test camera module creation (without actual camera)."""
     logger.info("Testing camera module...")
@@ -121,6 +161,127 @@ def test_camera_module():
         return False
 
 
+def test_captured_frame():
+    """Test frame IDs and the media/capture clocks behind CapturedFrame.timestamp."""
+    logger.info("Testing captured frame timing...")
+    
+    try:
+        import os
+        import tempfile
+        import time
+        import numpy as np
+        from camera_module import CameraModule, CapturedFrame
+        from collision_detector import CollisionDetector, Detection
+        
+        video_path = os.path.join(tempfile.mkdtemp(), 'drive.avi')
+        write_synthetic_drive(video_path, frames=5, fps=10.0)
+        
+        # Demo mode: media time, continuous when the clip loops back to the start
+        camera = CameraModule(source='demo', video_path=video_path, loop=True)
+        before = time.monotonic()
+        frames = [camera.read_frame() for _ in range(8)]
+        camera.release()
+        assert [f.frame_id for f in frames] == list(range(1, 9)), "frame_id not incrementing"
+        assert all(f.timestamp == f.media_time for f in frames), "Demo timestamp not media time"
+        stamps = [f.timestamp for f in frames]
+        assert all(abs(b - a - 0.1) < 0.01 for a, b in zip(stamps, stamps[1:])), \
+            f"Media time jumps across the loop: {stamps}"
+        assert frames[5].pos_msec < frames[4].pos_msec, "Clip did not loop"
+        assert all(before <= f.capture_time <= time.monotonic() for f in frames), "capture_time not monotonic"
+        logger.info("✓ frame_id increments, media time continuous across a loop")
+        
+        # Live mode: no media clock, so the monotonic capture time is used
+        live = CapturedFrame(np.zeros((2, 2, 3), dtype=np.uint8), 1, 123.5, None, None)
+        assert live.timestamp == 123.5, "Live timestamp not capture time"
+        logger.info("✓ Live frames use the capture time")
+        
+        # TTC follows the timestamps passed in, not the wall clock
+        ttcs = []
+        for dt in (0.1, 0.2):
+            detector = CollisionDetector(model_dir="missing_models")
+            detector.calculate_ttc([Detection(7, 'car', 0.9, (500, 400, 600, 500))], 10.0)
+            tracked = detector.calculate_ttc([Detection(7, 'car', 0.9, (495, 395, 605, 505))], 10.0 + dt)
+            assert tracked[0].timestamp == 10.0 + dt, "Track not stamped with the frame time"
+            ttcs.append(tracked[0].ttc)
+        assert abs(ttcs[1] / ttcs[0] - 2.0) < 1e-6, f"TTC not scaled by frame time: {ttcs}"
+        logger.info("✓ TTC uses the frame timestamps")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Captured frame test failed: {e}")
+        return False
+
+
+def test_threaded_capture():
+    """Test threaded capture: blocking reads and dropped/duplicate counters."""
+    logger.info("Testing threaded capture...")
+    
+    try:
+        import threading
+        import time
+        import numpy as np
+        from camera_module import CameraModule
+        
+        class StubCapture:
+            """Stands in for cv2.VideoCapture; each read waits for a release."""
+            def __init__(self):
+                self.ready = threading.Semaphore(0)
+                self.image = np.zeros((4, 4, 3), dtype=np.uint8)
+            
+            def read(self):
+                self.ready.acquire()
+                return True, self.image
+            
+            def get(self, prop):
+                return 0.0
+            
+            def release(self):
+                pass
+        
+        # No live camera here, so init fails and the stub is swapped in
+        camera = CameraModule(source='live', threaded=True)
+        stub = StubCapture()
+        camera.cap, camera.is_initialized = stub, True
+        camera.start_capture_thread()
+        try:
+            # Blocks until the first frame arrives
+            stub.ready.release()
+            captured = camera.read_frame(timeout=1.0)
+            assert captured is not None and captured.frame_id == 1, "First frame not delivered"
+            
+            # Re-reading the latest frame counts as a duplicate
+            latest = camera.get_latest_captured_frame()
+            assert latest.frame_id == 1 and camera.frames_duplicated == 1, "Duplicate not counted"
+            
+            # Frames overwritten before being read count as dropped
+            for _ in range(3):
+                stub.ready.release()
+            deadline = time.monotonic() + 1.0
+            while camera.frames_captured < 4 and time.monotonic() < deadline:
+                time.sleep(0.005)
+            captured = camera.read_frame(timeout=1.0)
+            assert captured.frame_id == 4 and camera.frames_dropped == 2, \
+                f"Dropped frames wrong: {camera.frames_dropped}"
+            
+            # No new frame: read_frame times out instead of returning frame 4 again
+            start = time.monotonic()
+            assert camera.read_frame(timeout=0.05) is None, "Stale frame returned"
+            assert time.monotonic() - start >= 0.04, "read_frame did not wait"
+            assert camera.frames_duplicated == 1, "Blocking read counted a duplicate"
+            logger.info("✓ Blocking reads, dropped and duplicate counters correct")
+        finally:
+            camera._capture_running = False
+            stub.ready.release()
+            camera.stop_capture_thread()
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Threaded capture test failed: {e}")
+        return False
+
+
 def test_lane_detector():
     """Test lane detector creation."""
     logger.info("Testing lane detector...")
@@ -145,6 +306,1012 @@ def test_lane_detector():
         return False
 
 
+def test_lane_roi_crop():
+    """Test the default pipeline against full-frame processing, and the opt-in ROI crop."""
+    logger.info("Testing ROI-cropped lane pipeline...")
+    
+    try:
+        import glob
+        import os
+        import cv2
+        import numpy as np
+        from lane_detector import create_lane_detector
+        
+        def full_frame_lines(frame, detector):
+            """The uncropped pipeline: blur and Canny on the whole frame, then mask and Hough."""
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            blurred = cv2.GaussianBlur(gray, (detector.gaussian_kernel, detector.gaussian_kernel), 0)
+            edges = cv2.Canny(blurred, detector.canny_low, detector.canny_high)
+            mask = np.zeros(edges.shape, dtype=np.uint8)
+            cv2.fillPoly(mask, [detector.roi_vertices.reshape(-1, 2).astype(np.int32)], 255)
+            return cv2.HoughLinesP(cv2.bitwise_and(edges, mask), rho=1, theta=np.pi/180,
+                                   threshold=detector.hough_threshold,
+                                   minLineLength=detector.min_line_length,
+                                   maxLineGap=detector.max_line_gap)
+        
+        # Real road photos: segments and offset identical to the uncropped pipeline
+        photos = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                               'demo_photos', '*.png')))
+        assert photos, "No demo photos found"
+        for path in photos:
+            frame = cv2.resize(cv2.imread(path), (1280, 720))
+            detector = create_lane_detector()
+            result = detector.detect(frame)
+            expected = full_frame_lines(frame, detector)
+            name = os.path.basename(path)
+            assert result['lines'] is not None and expected is not None, f"No segments on {name}"
+            assert np.array_equal(result['lines'], expected), \
+                f"{name}: {len(result['lines'])} segments, full frame gives {len(expected)}"
+            reference = create_lane_detector()._calculate_drift(frame, expected)
+            assert result['offset'] == reference['offset'], f"{name}: offset differs from full frame"
+        logger.info(f"✓ Segments and offset match full-frame processing on {len(photos)} demo photos")
+        
+        # Opt-in crop: on a clean frame the cropped edges land on the full-frame ones
+        rng = np.random.default_rng(0)
+        frame = cv2.resize(rng.integers(0, 255, (90, 160, 3), dtype=np.uint8), (1280, 720))
+        frame = cv2.GaussianBlur(frame, (0, 0), 3)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (0, 220, 255), 8)
+        
+        detector = create_lane_detector(roi_crop=True)
+        x0, y0, x1, y1 = detector._get_roi_rect(frame.shape)
+        assert (x1 - x0) * (y1 - y0) < frame.shape[0] * frame.shape[1] / 2, "ROI crop not applied"
+        cropped = detector._apply_roi_mask(
+            detector._detect_edges(detector._preprocess_frame(frame[y0:y1, x0:x1])), frame.shape
+        )
+        
+        full = detector._detect_edges(detector._preprocess_frame(frame))
+        mask = np.zeros(full.shape, dtype=np.uint8)
+        cv2.fillPoly(mask, [detector.roi_vertices.reshape(-1, 2)], 255)
+        full = cv2.bitwise_and(full, mask)
+        
+        assert np.array_equal(full[y0:y1, x0:x1], cropped), "Cropped edges differ from full frame"
+        assert not full[:y0].any() and not full[y1:].any(), "Edges found outside ROI crop"
+        
+        result = detector.detect_lanes(frame)
+        assert result['left_intercept'] is not None, "Left lane not detected"
+        assert result['right_intercept'] is not None, "Right lane not detected"
+        logger.info("✓ Opt-in ROI crop detects lanes on a clean frame")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ ROI crop test failed: {e}")
+        return False
+
+
+def test_lane_work_buffers():
+    """Test that lane work buffers are reused until the ROI or frame size changes."""
+    logger.info("Testing lane work buffers...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from lane_detector import create_lane_detector
+        
+        frame = np.full((720, 1280, 3), 60, dtype=np.uint8)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (255, 255, 255), 8)
+        
+        detector = create_lane_detector(roi_crop=True)
+        detector.detect(frame)
+        assert detector.frame_allocations > 0, "First frame allocated no buffers"
+        detector.detect(frame.copy())
+        assert detector.frame_allocations == 0, \
+            f"Same-shape frame allocated {detector.frame_allocations} buffers"
+        logger.info("✓ Same-shape frames reuse every buffer")
+        
+        # A narrower ROI changes the crop, so the crop-sized buffers are rebuilt
+        detector.set_roi_vertices([[300, 650], [560, 450], [720, 450], [980, 650]])
+        detector.detect(frame)
+        assert detector.frame_allocations > 0, "ROI edit did not reallocate"
+        detector.detect(frame)
+        assert detector.frame_allocations == 0, "Buffers not reused after ROI edit"
+        logger.info("✓ Buffers reallocated after an ROI edit")
+        
+        # Same ROI on a smaller frame: the ROI mask and edge canvas are rebuilt
+        small = cv2.resize(frame, (960, 540))
+        detector.detect(small)
+        assert detector.frame_allocations > 0, "Frame size change did not reallocate"
+        detector.detect(small)
+        assert detector.frame_allocations == 0, "Buffers not reused after size change"
+        logger.info("✓ Buffers reallocated after a frame size change")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Lane work buffer test failed: {e}")
+        return False
+
+
+def test_lane_processing_scale():
+    """Test that downscaled lane processing agrees with full resolution."""
+    logger.info("Testing lane processing scale...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from lane_detector import create_lane_detector
+        
+        frame = np.full((720, 1280, 3), 60, dtype=np.uint8)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (255, 255, 255), 8)
+        
+        full = create_lane_detector(processing_scale=1.0).detect(frame)
+        half = create_lane_detector(processing_scale=0.5).detect(frame)
+        for side in ('left_intercept', 'right_intercept'):
+            assert full[side] is not None and half[side] is not None, f"{side} not detected"
+            # Extrapolated to the bottom row, so half-resolution rounding grows to a few pixels
+            assert abs(full[side] - half[side]) < 15, \
+                f"{side} at scale 0.5 off by {abs(full[side] - half[side]):.1f}px"
+        logger.info("✓ Scale 0.5 intercepts match full resolution")
+        
+        detector = create_lane_detector(processing_scale=1.0, processing_width=640)
+        assert detector._resolve_scale(1280) == 0.5, "processing_width not resolved to a scale"
+        assert detector._resolve_scale(320) == 1.0, "processing_width upscaled a small frame"
+        detector.detect(frame)
+        assert detector.get_detection_stats()['processing_scale'] == 0.5, "Resolved scale not used"
+        logger.info("✓ processing_width resolves the scale per frame width")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Lane processing scale test failed: {e}")
+        return False
+
+
+def test_overlay_renderer():
+    """Test that detect() skips overlays and the renderer reuses its buffer."""
+    logger.info("Testing overlay renderer...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from lane_detector import create_lane_detector
+        from overlay_renderer import OverlayRenderer
+        
+        frame = np.full((720, 1280, 3), 60, dtype=np.uint8)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (255, 255, 255), 8)
+        
+        detector = create_lane_detector()
+        result = detector.detect(frame)
+        assert result['processed_frame'] is None, "detect() drew overlays"
+        assert result['lines'] is not None, "No lines to render"
+        
+        renderer = OverlayRenderer()
+        original = frame.copy()
+        first = renderer.render_lanes(frame, result, detector.departure_threshold, detector.roi_vertices)
+        assert np.array_equal(frame, original), "Renderer drew on the input frame"
+        assert not np.array_equal(first, frame), "No overlays drawn"
+        second = renderer.render_lanes(frame.copy(), detector.detect(frame),
+                                       detector.departure_threshold, detector.roi_vertices)
+        assert second is first, "Buffer not reused for a same-size frame"
+        small = renderer.begin(cv2.resize(frame, (640, 360)))
+        assert small.shape == (360, 640, 3) and small is not first, "Buffer not resized"
+        logger.info("✓ Overlays drawn into one reused buffer, input untouched")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Overlay renderer test failed: {e}")
+        return False
+
+
+def test_lane_tracking():
+    """Test that tracked frames follow the lanes found by the full search."""
+    logger.info("Testing lane tracking...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from lane_detector import create_lane_detector
+        
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (0, 220, 255), 8)
+        
+        reference = create_lane_detector().detect(frame)
+        detector = create_lane_detector(tracking=True, full_search_interval=5)
+        for _ in range(3):
+            result = detector.detect(frame)
+        
+        assert detector.full_searches == 1, f"Expected 1 full search, got {detector.full_searches}"
+        assert detector.tracked_frames == 2, f"Expected 2 tracked frames, got {detector.tracked_frames}"
+        for side in ('left_intercept', 'right_intercept'):
+            assert abs(result[side] - reference[side]) < 10, f"Tracked {side} drifted"
+        logger.info("✓ Tracked lanes match full search")
+        
+        # Editing the ROI drops the tracked models and forces a full search
+        detector.offset_roi(0, 0)
+        detector.detect(frame)
+        assert detector.full_searches == 2, "ROI change did not trigger a full search"
+        logger.info("✓ ROI change resets tracking")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Lane tracking test failed: {e}")
+        return False
+
+
+def test_birdseye_engine():
+    """Test the bird's-eye lane engine against the Hough engine on straight lanes."""
+    logger.info("Testing bird's-eye lane engine...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from lane_detector import create_lane_detector
+        
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (0, 220, 255), 8)
+        
+        reference = create_lane_detector().detect(frame)
+        detector = create_lane_detector(backend='birdseye')
+        result = detector.detect(frame)
+        detector.detect(frame)
+        
+        assert set(reference) == set(result), "Result keys differ from the Hough engine"
+        for side in ('left_intercept', 'right_intercept'):
+            assert result[side] is not None, f"{side} not detected"
+            assert abs(result[side] - reference[side]) < 15, f"{side} disagrees with Hough"
+        logger.info("✓ Bird's-eye lanes match Hough on straight lanes")
+        
+        engine = detector.backend.engine
+        assert engine.map_builds == 1, "Remap tables rebuilt without an ROI change"
+        detector.offset_roi(0, 5)
+        detector.detect(frame)
+        assert engine.map_builds == 2, "ROI edit did not rebuild remap tables"
+        logger.info("✓ Remap tables cached until the ROI changes")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Bird's-eye engine test failed: {e}")
+        return False
+
+
+def test_lane_backends():
+    """Test the lane backend registry and backend fallback."""
+    logger.info("Testing lane backends...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from lane_detector import create_lane_detector
+        from lane_backends import get_available_lane_backends, create_lane_backend
+        
+        backends = get_available_lane_backends()
+        for name in ('hough', 'birdseye', 'color', 'ransac', 'segmentation'):
+            assert name in backends, f"Backend {name} not registered"
+        try:
+            create_lane_backend('missing')
+            assert False, "Unknown backend accepted"
+        except ValueError:
+            pass
+        logger.info("✓ Backend registry works")
+        
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (0, 220, 255), 8)
+        
+        result = create_lane_detector(backend='color').detect(frame)
+        assert result['left_intercept'] is not None, "Color backend missed the white lane"
+        assert result['right_intercept'] is not None, "Color backend missed the yellow lane"
+        logger.info("✓ Color backend detects lanes")
+        
+        reference = create_lane_detector().detect(frame)
+        detector = create_lane_detector(backend='ransac')
+        for _ in range(2):
+            result = detector.detect(frame)
+        for side in ('left_intercept', 'right_intercept'):
+            assert result[side] is not None, f"RANSAC backend missed {side}"
+            assert abs(result[side] - reference[side]) < 10, f"RANSAC {side} disagrees with Hough"
+        assert detector.backend.previous['left'] is not None, "RANSAC did not keep its seed lines"
+        logger.info("✓ RANSAC backend matches Hough")
+        
+        detector = create_lane_detector(backend='segmentation',
+                                        backend_options={'model_path': 'missing.onnx'})
+        assert detector.backend.name == 'hough', "Missing model did not fall back to hough"
+        logger.info("✓ Unavailable backend falls back to hough")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Lane backend test failed: {e}")
+        return False
+
+
+def test_lane_color_mask():
+    """Test the paint color lookup table and its fusion with edges."""
+    logger.info("Testing lane color mask...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from color_mask import LaneColorMask
+        from lane_detector import create_lane_detector
+        
+        mask = LaneColorMask()
+        swatches = np.array([[[255, 255, 255], [0, 220, 255], [90, 90, 90], [200, 60, 30]]], dtype=np.uint8)
+        assert list(mask.apply(swatches)[0]) == [255, 255, 0, 0], "Paint classification wrong"
+        logger.info("✓ White and yellow paint classified")
+        
+        # Gray texture floods low-threshold Canny; only the painted lines are colored
+        rng = np.random.default_rng(0)
+        texture = cv2.resize(rng.integers(40, 110, (90, 160), dtype=np.uint8), (1280, 720))
+        frame = cv2.cvtColor(cv2.GaussianBlur(texture, (0, 0), 3), cv2.COLOR_GRAY2BGR)
+        cv2.line(frame, (200, 720), (560, 430), (255, 255, 255), 8)
+        cv2.line(frame, (1100, 720), (720, 430), (0, 220, 255), 8)
+        
+        plain = create_lane_detector(canny_low=5, canny_high=15).detect(frame)
+        detector = create_lane_detector(canny_low=5, canny_high=15, color_fusion='and')
+        fused = detector.detect(frame)
+        assert len(fused['lines']) < len(plain['lines']), "Color fusion did not remove segments"
+        assert fused['left_intercept'] is not None and fused['right_intercept'] is not None, \
+            "Color fusion lost a lane"
+        logger.info("✓ Color fusion removes texture segments")
+        
+        timings = detector.get_stage_timings()
+        for stage in ('preprocess', 'edges', 'color_mask', 'color_fuse', 'hough', 'total'):
+            assert stage in timings, f"Stage timing missing: {stage}"
+        logger.info("✓ Stage timings recorded")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Lane color mask test failed: {e}")
+        return False
+
+
+def test_roi_calibration():
+    """Test vanishing-point ROI calibration over a frame sequence."""
+    logger.info("Testing ROI calibration...")
+    
+    try:
+        import os
+        import tempfile
+        import cv2
+        import numpy as np
+        from roi_calibration import VanishingPointCalibrator, save_calibration, load_calibration
+        
+        # Straight lanes converging on (640, 330), with center dashes moving down
+        vp = np.array([640.0, 330.0])
+        calibrator = VanishingPointCalibrator(duration=1.0)
+        calibrator.start()
+        done = False
+        for i in range(40):
+            frame = np.full((720, 1280, 3), 60, dtype=np.uint8)
+            for bottom_x in (200, 1080):
+                top = vp + (np.array([bottom_x, 720.0]) - vp) * 0.2
+                cv2.line(frame, (bottom_x, 720), (int(top[0]), int(top[1])), (255, 255, 255), 6)
+            for y in range(400 + (i * 8) % 60, 720, 60):
+                cv2.line(frame, (640, y), (640, min(719, y + 25)), (255, 255, 255), 4)
+            if calibrator.add_frame(frame, timestamp=i / 30.0):
+                done = True
+                break
+        
+        result = calibrator.get_result()
+        assert done and result is not None, "Calibration did not complete"
+        assert np.hypot(*(np.array(result['vanishing_point']) - vp)) < 10, \
+            f"Vanishing point off: {result['vanishing_point']}"
+        vertices = result['vertices']
+        assert vertices[:, 0].min() < 200 and vertices[:, 0].max() > 1080, "ROI misses a lane"
+        assert vertices[:, 1].min() > vp[1], "ROI reaches above the horizon"
+        logger.info("✓ Vanishing point found")
+        
+        path = os.path.join(tempfile.mkdtemp(), 'roi_calibration.json')
+        save_calibration(result, path)
+        loaded = load_calibration(path, (360, 640))
+        assert np.abs(loaded['vertices'] - vertices / 2).max() <= 1, "Calibration not rescaled"
+        logger.info("✓ Calibration saved and rescaled on load")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ ROI calibration test failed: {e}")
+        return False
+
+
+def write_synthetic_drive(path, frames=30, fps=10.0, size=(640, 480)):
+    """Write a short clip of a straight two-lane road (MJPG .avi)."""
+    import cv2
+    import numpy as np
+    
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(frames):
+        frame = np.full((height, width, 3), 60, dtype=np.uint8)
+        cv2.line(frame, (int(width * 0.15), height - 1), (int(width * 0.43), int(height * 0.55)),
+                 (255, 255, 255), 6)
+        cv2.line(frame, (int(width * 0.85), height - 1), (int(width * 0.57), int(height * 0.55)),
+                 (255, 255, 255), 6)
+        writer.write(frame)
+    writer.release()
+
+
+def test_offline_processor():
+    """Test a single-stream offline run over a synthetic clip."""
+    logger.info("Testing offline processor...")
+    
+    try:
+        import os
+        import json
+        import tempfile
+        from camera_module import CameraModule
+        from offline_processor import OfflineProcessor
+        
+        work_dir = tempfile.mkdtemp()
+        video_path = os.path.join(work_dir, 'drive.avi')
+        write_synthetic_drive(video_path, frames=12, fps=10.0)
+        output_path = os.path.join(work_dir, 'results.jsonl')
+        
+        # The run stops at the end of the clip (the camera is opened with loop=False)
+        summary = OfflineProcessor(video_path, output_path).run()
+        with open(output_path) as f:
+            records = [json.loads(line) for line in f]
+        assert summary['frames'] == len(records) == 12, f"Wrote {len(records)} of 12 frames"
+        
+        camera = CameraModule(source='demo', video_path=video_path, loop=False)
+        frames = 0
+        while camera.read_frame() is not None:
+            frames += 1
+        assert frames == 12 and camera.end_of_stream, "Camera did not stop at end of stream"
+        camera.release()
+        logger.info("✓ Every frame written once, run ends at end of stream")
+        
+        assert [r['frame_id'] for r in records] == list(range(1, 13)), "frame_id out of order"
+        times = [r['pos_msec'] for r in records]
+        assert times[0] == 0.0 and all(b > a for a, b in zip(times, times[1:])), "pos_msec not increasing"
+        assert abs(times[-1] - 1100.0) < 1.0, f"pos_msec wrong: {times[-1]}"
+        logger.info("✓ frame_id and pos_msec in order")
+        
+        expected_keys = {'frame_id', 'pos_msec', 'offset', 'lane_center', 'left_intercept',
+                         'right_intercept', 'departure_threshold', 'off_lane', 'fcw_tracks',
+                         'closest_ttc'}
+        assert all(set(r) == expected_keys for r in records), "Record keys changed"
+        assert all(r['fcw_tracks'] == [] and r['closest_ttc'] is None for r in records), \
+            "FCW fields set with FCW disabled"
+        logger.info("✓ Records have the expected keys")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Offline processor test failed: {e}")
+        return False
+
+
+def test_offline_workers():
+    """Test that parallel offline processing matches the single stream."""
+    logger.info("Testing offline processing workers...")
+    
+    try:
+        import os
+        import json
+        import tempfile
+        import numpy as np
+        from offline_processor import OfflineProcessor
+        from roi_calibration import save_calibration
+        
+        work_dir = tempfile.mkdtemp()
+        video_path = os.path.join(work_dir, 'drive.avi')
+        write_synthetic_drive(video_path, frames=30, fps=10.0)
+        
+        # Warm-up covering the whole clip gives every range the single stream's
+        # detector state, so the merged output must match it exactly
+        outputs = {}
+        for workers in (1, 3):
+            output_path = os.path.join(work_dir, f'results_{workers}.jsonl')
+            processor = OfflineProcessor(video_path, output_path)
+            summary = processor.run(workers=workers, overlap_seconds=3.0, chunk_seconds=1.0)
+            assert summary['frames'] == 30, f"{workers} worker(s) wrote {summary['frames']} frames"
+            with open(output_path) as f:
+                outputs[workers] = f.read()
+        assert '"left_intercept": null' not in outputs[1], "Synthetic lanes not detected"
+        assert outputs[1] == outputs[3], "Parallel results differ from the single stream"
+        logger.info("✓ 3 workers write the same JSONL as 1 worker")
+        
+        # Lane options reach the detectors each range creates
+        processor = OfflineProcessor(video_path, os.path.join(work_dir, 'tracked.jsonl'),
+                                     lane_tracking=True)
+        lane_detector, _ = processor._create_detectors()
+        assert lane_detector.tracking, "Lane tracking not passed to the detector"
+        logger.info("✓ Lane tracking passed to offline detectors")
+        
+        # A saved calibration (made at half size) is rescaled and limits the ROI
+        # to the left lane
+        calibration_path = os.path.join(work_dir, 'roi_calibration.json')
+        save_calibration({
+            'vertices': np.array([[0, 210], [130, 135], [160, 135], [160, 210]]),
+            'vanishing_point': [160.0, 120.0], 'horizon_y': 120.0, 'frame_shape': [240, 320],
+            'frames': 1, 'intersections': 1
+        }, calibration_path)
+        output_path = os.path.join(work_dir, 'calibrated.jsonl')
+        OfflineProcessor(video_path, output_path, calibration_path=calibration_path).run()
+        with open(output_path) as f:
+            records = [json.loads(line) for line in f]
+        assert all(r['left_intercept'] is not None for r in records), "Left lane lost"
+        assert all(r['right_intercept'] is None for r in records), "Calibrated ROI not applied"
+        logger.info("✓ Saved ROI calibration applied offline")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Offline workers test failed: {e}")
+        return False
+
+
+def test_ssd_decoding():
+    """Test vectorized SSD output decoding and cross-class NMS."""
+    logger.info("Testing SSD output decoding...")
+    
+    try:
+        import numpy as np
+        from collision_detector import decode_ssd_detections
+        from model_specs import VEHICLE_CLASS_IDS
+        
+        raw = np.zeros((1, 1, 100, 7), dtype=np.float32)
+        raw[0, 0, 0] = [0, 7, 0.90, 0.40, 0.50, 0.60, 0.80]    # car
+        raw[0, 0, 1] = [0, 6, 0.70, 0.41, 0.50, 0.61, 0.81]    # same vehicle as bus
+        raw[0, 0, 2] = [0, 15, 0.95, 0.10, 0.10, 0.20, 0.50]   # person
+        raw[0, 0, 3] = [0, 7, 0.30, 0.70, 0.50, 0.80, 0.60]    # low confidence
+        raw[0, 0, 4] = [0, 14, 0.80, 0.90, 0.60, 1.10, 0.90]   # motorbike past the edge
+        
+        plain = decode_ssd_detections(raw, (720, 1280), 0.5, VEHICLE_CLASS_IDS, nms_threshold=None)
+        assert [d.label for d in plain] == ['car', 'bus', 'motorbike'], "Filtering wrong"
+        assert plain[0].bbox == (512, 360, 768, 576), f"Scaling wrong: {plain[0].bbox}"
+        assert plain[2].bbox[2] == 1280, "Box not clamped"
+        logger.info("✓ Confidence and class filtering work")
+        
+        merged = decode_ssd_detections(raw, (720, 1280), 0.5, VEHICLE_CLASS_IDS)
+        assert [d.label for d in merged] == ['car', 'motorbike'], "NMS did not merge car/bus"
+        logger.info("✓ NMS merges overlapping vehicle classes")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ SSD decoding test failed: {e}")
+        return False
+
+
+def test_fcw_tracking():
+    """Test one-to-one detection-to-track assignment and TTC."""
+    logger.info("Testing FCW tracking...")
+    
+    try:
+        from collision_detector import CollisionDetector, Detection
+        
+        detector = CollisionDetector(model_dir="missing_models")
+        car = Detection(7, 'car', 0.9, (500, 400, 600, 500))
+        detector.calculate_ttc([car], 0.0)
+        
+        # Two detections overlap the one previous track; only the better one continues it
+        grown = Detection(7, 'car', 0.9, (495, 395, 605, 505))
+        shifted = Detection(7, 'car', 0.8, (530, 400, 630, 500))
+        tracked = detector.calculate_ttc([shifted, grown], 0.1)
+        assert tracked[1].track_id == 1 and tracked[1].age == 2, "Best match did not continue track"
+        assert tracked[0].track_id == 2 and tracked[0].age == 1, "Duplicate match on one track"
+        assert tracked[0].h_dot_smoothed == 0.0, "Unmatched detection inherited a derivative"
+        logger.info("✓ Detections assigned one-to-one")
+        
+        bigger = Detection(7, 'car', 0.9, (490, 390, 610, 510))
+        tracked = detector.calculate_ttc([bigger], 0.2)
+        assert tracked[0].track_id == 1 and tracked[0].age == 3, "Track ID not persistent"
+        assert 0 < tracked[0].ttc < float('inf'), "No TTC for an approaching vehicle"
+        logger.info("✓ Track IDs persist and TTC is estimated")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ FCW tracking test failed: {e}")
+        return False
+
+
+def test_box_propagation():
+    """Test optical-flow box propagation between inferences."""
+    logger.info("Testing box propagation...")
+    
+    try:
+        import cv2
+        import numpy as np
+        from box_propagation import BoxPropagator
+        from collision_detector import Detection, TrackedObject
+        
+        # Textured "vehicle" growing 2% per frame on a textured road
+        rng = np.random.default_rng(1)
+        background = cv2.resize(rng.integers(0, 255, (90, 160), dtype=np.uint8), (1280, 720),
+                                interpolation=cv2.INTER_NEAREST)
+        texture = cv2.resize(rng.integers(0, 255, (24, 24), dtype=np.uint8), (240, 240),
+                             interpolation=cv2.INTER_NEAREST)
+        
+        def render(size, cx):
+            frame = background.copy()
+            x, y = int(cx - size / 2), int(420 - size / 2)
+            frame[y:y + size, x:x + size] = cv2.resize(texture, (size, size))
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR), (x, y, x + size, y + size)
+        
+        propagator = BoxPropagator()
+        frames, boxes = [], []
+        for i in range(31):
+            frame, box = render(int(round(80 * 1.02 ** i)), 640 + 2 * i)
+            frames.append(frame)
+            boxes.append(box)
+        
+        propagator.step(frames[0], 0.0)
+        propagator.reconcile([TrackedObject(Detection(7, 'car', 0.9, boxes[0]), 0.0, track_id=1)], 0.0)
+        for i in range(1, 21):
+            propagator.step(frames[i], i / 30.0)
+        track = propagator.get_tracks()[0]
+        assert np.abs(np.array(track.bbox) - boxes[20]).max() <= 6, f"Box drifted: {track.bbox}"
+        assert 1.2 < track.ttc < 2.5, f"TTC off (expected ~1.7s): {track.ttc}"
+        logger.info("✓ Box and TTC follow the vehicle between inferences")
+        
+        # A result computed on frame 20 lands at frame 30 and is carried forward
+        for i in range(21, 31):
+            propagator.step(frames[i], i / 30.0)
+        stale = TrackedObject(Detection(7, 'car', 0.9, boxes[20]), 20 / 30.0, track_id=1)
+        propagator.reconcile([stale], 20 / 30.0)
+        track = propagator.get_tracks()[0]
+        assert np.abs(np.array(track.bbox) - boxes[30]).max() <= 6, f"Stale box not carried: {track.bbox}"
+        logger.info("✓ Late inference results reconciled to the current frame")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Box propagation test failed: {e}")
+        return False
+
+
+def test_fcw_input_regions():
+    """Test ego-corridor crop and horizon tile inference regions."""
+    logger.info("Testing FCW input regions...")
+    
+    try:
+        import numpy as np
+        from collision_detector import CollisionDetector, Detection
+        
+        class FixedOutputNet:
+            """Stands in for the SSD: one car in the middle of whatever it is given."""
+            def setInput(self, blob):
+                pass
+            
+            def forward(self):
+                raw = np.zeros((1, 1, 100, 7), dtype=np.float32)
+                raw[0, 0, 0] = [0, 7, 0.9, 0.4, 0.4, 0.6, 0.6]
+                return raw
+        
+        detector = CollisionDetector(model_dir="missing_models", corridor_crop=True,
+                                     horizon_tile=True, horizon_y=330)
+        detector.net = FixedOutputNet()
+        detector.is_initialized = True
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        
+        corridor, is_tile = detector.plan_input_region(frame.shape, 300, 980)
+        assert not is_tile and corridor == (130, 232, 1150, 720), f"Corridor wrong: {corridor}"
+        tile, is_tile = detector.plan_input_region(frame.shape, 300, 980)
+        assert is_tile and tile == (490, 210, 790, 510), f"Horizon tile wrong: {tile}"
+        logger.info("✓ Corridor and horizon tile alternate")
+        
+        detections = detector.detect_objects(frame, tile)
+        assert detections[0].bbox == (610, 330, 670, 390), f"Box not mapped back: {detections[0].bbox}"
+        logger.info("✓ Boxes mapped back to frame coordinates")
+        
+        # A nearby car outside the tile keeps its track through a tile inference
+        near = Detection(7, 'car', 0.9, (500, 450, 800, 700))
+        far = Detection(7, 'car', 0.9, (610, 330, 670, 390))
+        detector.calculate_ttc([near, far], 0.0)
+        tracked = detector.calculate_ttc([far], 0.2, observed_region=tile)
+        assert {obj.track_id for obj in tracked} == {1, 2}, "Unobserved track dropped"
+        tracked = detector.calculate_ttc([far], 0.4, observed_region=corridor)
+        assert {obj.track_id for obj in tracked} == {2}, "Observed missing track kept"
+        logger.info("✓ Tracks outside the tile are kept")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ FCW input regions test failed: {e}")
+        return False
+
+
+def write_constant_ssd_model(model_dir, row):
+    """
+    Write a weightless MobileNetSSD_deploy.prototxt/.caffemodel pair whose output
+    is always the single detection row given, so the FCW path can run without
+    the real model.
+    """
+    import os
+    
+    layers = [
+        'name: "ConstantSSD"',
+        'input: "data"',
+        'input_shape { dim: 1 dim: 3 dim: 300 dim: 300 }',
+        'layer { name: "pool" type: "Pooling" bottom: "data" top: "pool" '
+        'pooling_param { pool: MAX global_pooling: true } }',
+        'layer { name: "slice" type: "Slice" bottom: "pool" top: "c0" top: "c1" top: "c2" '
+        'slice_param { axis: 1 slice_point: 1 slice_point: 2 } }'
+    ]
+    for i, value in enumerate(row):
+        layers.append(f'layer {{ name: "v{i}" type: "Power" bottom: "c0" top: "v{i}" '
+                      f'power_param {{ power: 1 scale: 0 shift: {value} }} }}')
+    bottoms = ' '.join(f'bottom: "v{i}"' for i in range(len(row)))
+    layers.append(f'layer {{ name: "cat" type: "Concat" {bottoms} top: "cat" concat_param {{ axis: 1 }} }}')
+    layers.append('layer { name: "out" type: "Reshape" bottom: "cat" top: "detection_out" '
+                  f'reshape_param {{ shape {{ dim: 1 dim: 1 dim: 1 dim: {len(row)} }} }} }}')
+    
+    with open(os.path.join(model_dir, "MobileNetSSD_deploy.prototxt"), 'w') as f:
+        f.write('\n'.join(layers) + '\n')
+    open(os.path.join(model_dir, "MobileNetSSD_deploy.caffemodel"), 'wb').close()
+
+
+def test_fcw_process_backend():
+    """Test the multi-process FCW backend end to end."""
+    logger.info("Testing FCW process backend...")
+    
+    try:
+        import tempfile
+        import time
+        import numpy as np
+        from collision_detector import create_collision_detector
+        
+        model_dir = tempfile.mkdtemp()
+        write_constant_ssd_model(model_dir, [0, 7, 0.9, 0.4, 0.4, 0.6, 0.6])
+        _, process_detector = create_collision_detector(model_dir=model_dir, backend='process')
+        process_detector.start()
+        assert process_detector.is_initialized, "Worker process failed to load the model"
+        
+        try:
+            for size, expected in (((720, 1280), (512, 288, 768, 432)), ((360, 640), (256, 144, 384, 216))):
+                frame = np.zeros(size + (3,), dtype=np.uint8)
+                deadline = time.monotonic() + 10.0
+                tracked = []
+                while time.monotonic() < deadline:
+                    process_detector.update_frame(frame, None, None)
+                    tracked, _ = process_detector.get_latest_results()
+                    if tracked and tracked[0].bbox == expected:
+                        break
+                    time.sleep(0.01)
+                assert tracked and tracked[0].bbox == expected, f"No result for {size} frames"
+            logger.info("✓ Frames handed over through shared memory, results returned")
+        finally:
+            stopping = time.monotonic()
+            process_detector.stop()
+        # The worker exits on its own rather than being terminated after the join timeout
+        assert time.monotonic() - stopping < 1.5, "Idle worker missed the stop wakeup"
+        
+        # A model the worker can't set up fails start() without waiting out the timeout
+        _, broken = create_collision_detector(model_dir=model_dir, backend='process',
+                                              model='no-such-model')
+        started = time.monotonic()
+        broken.start()
+        assert not broken.is_initialized, "Broken worker reported ready"
+        assert time.monotonic() - started < 10.0, "start() waited for the full timeout"
+        logger.info("✓ Worker setup failure reported at once")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ FCW process backend test failed: {e}")
+        return False
+
+
+def test_async_detector_handoff():
+    """Test the event-driven FCW handoff, snapshots and statistics."""
+    logger.info("Testing async detector handoff...")
+    
+    try:
+        import tempfile
+        import time
+        import numpy as np
+        from collision_detector import create_collision_detector
+        
+        model_dir = tempfile.mkdtemp()
+        write_constant_ssd_model(model_dir, [0, 7, 0.9, 0.4, 0.4, 0.6, 0.6])
+        _, async_detector = create_collision_detector(model_dir=model_dir)
+        async_detector.start()
+        
+        try:
+            frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+            async_detector.update_frame(frame, None, None, timestamp=5.0, frame_id=42)
+            deadline = time.monotonic() + 5.0
+            while async_detector.get_snapshot().frame_id != 42 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            snapshot = async_detector.get_snapshot()
+            assert snapshot.frame_id == 42 and snapshot.timestamp == 5.0, "Snapshot not tagged"
+            assert snapshot.tracked[0].bbox == (512, 288, 768, 432), "Wrong result"
+            tracked, _ = async_detector.get_latest_results()
+            assert tracked is snapshot.tracked, "Results copied"
+            logger.info("✓ Worker woken by update_frame, snapshot tagged with its frame")
+            
+            # Frames posted faster than inference are overwritten and counted
+            for i in range(50):
+                async_detector.update_frame(frame, None, None, frame_id=100 + i)
+            stats = async_detector.get_stats()
+            assert stats['frames_posted'] == 51, "Posted frames not counted"
+            assert stats['frames_processed'] + stats['frames_skipped'] <= 51, "Counters inconsistent"
+            assert stats['mean_inference_ms'] > 0 and stats['result_age_ms'] is not None, "Latency missing"
+            logger.info("✓ Skipped frames, latency and result age reported")
+        finally:
+            async_detector.stop()
+        assert not async_detector._thread.is_alive(), "Worker did not stop"
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Async detector handoff test failed: {e}")
+        return False
+
+
+def test_inference_scheduler():
+    """Test the risk-adaptive FCW inference rate."""
+    logger.info("Testing inference scheduler...")
+    
+    try:
+        from collision_detector import InferenceScheduler, TrackedObject, Detection
+        
+        scheduler = InferenceScheduler(min_rate=2.0, max_rate=10.0, fast_ttc=3.0,
+                                       closing_ttc=8.0, empty_hold=3.0)
+        vehicle = TrackedObject(Detection(7, "car", 0.9, (500, 300, 700, 450)), 0.0)
+        
+        # Imminent, closing and steady vehicles
+        vehicle.ttc = 2.0
+        assert scheduler.target_rate([vehicle], vehicle, 0.0) == 10.0, "Imminent threat not at max rate"
+        vehicle.ttc = 5.5
+        assert abs(scheduler.target_rate([vehicle], vehicle, 0.1) - 8.0) < 1e-9, "Closing rate not interpolated"
+        assert scheduler.target_rate([vehicle], None, 0.2) == 6.0, "Tracked vehicle not at cruise rate"
+        logger.info("✓ Rate rises with threat level")
+        
+        # Empty corridor drops to the minimum rate only after the hold time
+        assert scheduler.target_rate([], None, 2.0) == 6.0, "Dropped to min rate too early"
+        assert scheduler.target_rate([], None, 3.5) == 2.0, "Empty corridor not at min rate"
+        logger.info("✓ Empty corridor slows down after the hold time")
+        
+        # Pacing and CPU saved
+        scheduler.record_inference(10.0, 0.1, [], None)
+        assert abs(scheduler.time_until_next(10.1) - 0.4) < 1e-9, "Next inference not paced"
+        scheduler.record_hold(0.4)
+        stats = scheduler.get_stats()
+        assert stats['rate_hz'] == 2.0, "Rate not reported"
+        assert abs(stats['cpu_saved_pct'] - 80.0) < 1e-6, "CPU saved not reported"
+        logger.info("✓ Inferences paced, rate and CPU saved reported")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Inference scheduler test failed: {e}")
+        return False
+
+
+def test_model_specs():
+    """Test FCW model specs, spec files and the YOLOv8 decoder."""
+    logger.info("Testing model specs...")
+    
+    try:
+        import json
+        import os
+        import tempfile
+        import numpy as np
+        from collision_detector import CollisionDetector, decode_yolov8_detections
+        from model_specs import (resolve_model_spec, select_dnn_target, COCO_CLASSES,
+                                 COCO_VEHICLE_CLASS_IDS)
+        
+        assert resolve_model_spec('mobilenet-ssd').config is not None, "Caffe spec missing prototxt"
+        assert resolve_model_spec('yolov8n').decoder == 'yolov8', "YOLOv8 spec wrong decoder"
+        try:
+            resolve_model_spec('no-such-model')
+            assert False, "Unknown model accepted"
+        except ValueError:
+            pass
+        assert select_dnn_target()[1] in ('cpu', 'cpu_fp16'), "Unexpected DNN target"
+        logger.info("✓ Built-in specs resolved, DNN target selected")
+        
+        # A JSON spec with its own input size, loaded relative to the spec file
+        model_dir = tempfile.mkdtemp()
+        write_constant_ssd_model(model_dir, [0, 7, 0.9, 0.4, 0.4, 0.6, 0.6])
+        spec_path = os.path.join(model_dir, "small_ssd.json")
+        with open(spec_path, 'w') as f:
+            json.dump({"name": "small-ssd", "model": "MobileNetSSD_deploy.caffemodel",
+                       "config": "MobileNetSSD_deploy.prototxt", "input_size": [200, 200],
+                       "scale": 0.007843, "mean": 127.5, "classes": "voc"}, f)
+        detector = CollisionDetector(model_dir="missing_models", model=spec_path)
+        assert detector.is_initialized and detector.input_size == (200, 200), "JSON spec not loaded"
+        detections = detector.detect_objects(np.zeros((720, 1280, 3), dtype=np.uint8))
+        assert detections[0].bbox == (512, 288, 768, 432), f"Wrong box: {detections[0].bbox}"
+        logger.info("✓ JSON model spec loaded and run")
+        
+        # YOLOv8 head: a car, a person (not a vehicle) and a duplicate truck box
+        raw = np.zeros((1, 4 + len(COCO_CLASSES), 3), dtype=np.float32)
+        raw[0, :4, 0], raw[0, 4 + 2, 0] = [320, 320, 128, 64], 0.9
+        raw[0, :4, 1], raw[0, 4 + 0, 1] = [100, 100, 50, 100], 0.95
+        raw[0, :4, 2], raw[0, 4 + 7, 2] = [322, 320, 128, 64], 0.6
+        detections = decode_yolov8_detections(raw, (720, 1280), (640, 640), 0.5,
+                                              COCO_VEHICLE_CLASS_IDS, labels=COCO_CLASSES)
+        assert len(detections) == 1, f"Expected 1 vehicle, got {len(detections)}"
+        assert detections[0].label == "car" and detections[0].bbox == (512, 324, 768, 396), \
+            f"Wrong YOLOv8 detection: {detections[0]}"
+        logger.info("✓ YOLOv8 output decoded with NMS across vehicle classes")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Model specs test failed: {e}")
+        return False
+
+
+def test_core_budget():
+    """Test core list parsing, OpenCV thread counts and thread pinning."""
+    logger.info("Testing core budget...")
+    
+    try:
+        import os
+        import threading
+        import cv2
+        from core_budget import (CoreBudget, fill_worker_cores, parse_core_list, pin_current_thread,
+                                 set_opencv_threads)
+        
+        assert parse_core_list("0-1,3") == {0, 1, 3}, "Core list not parsed"
+        assert parse_core_list(None) is None and parse_core_list("") is None, "Empty core list not None"
+        assert not CoreBudget().is_set and CoreBudget(fcw_cores={2}).is_set, "Budget is_set wrong"
+        logger.info("✓ Core lists and budget parsed")
+        
+        previous = cv2.getNumThreads()
+        try:
+            assert set_opencv_threads(1, 'test') == 1, "OpenCV thread count not applied"
+        finally:
+            cv2.setNumThreads(previous)
+        logger.info("✓ OpenCV thread count applied")
+        
+        if hasattr(os, 'sched_setaffinity'):
+            # Pin a separate thread so the test process keeps all its cores
+            allowed = os.sched_getaffinity(0)
+            results = {}
+            
+            def pin():
+                results['pinned'] = pin_current_thread({min(allowed)}, 'test thread')
+                results['cores'] = os.sched_getaffinity(0)
+                results['invalid'] = pin_current_thread({max(allowed) + 4096}, 'test thread')
+            
+            thread = threading.Thread(target=pin)
+            thread.start()
+            thread.join()
+            assert results['pinned'] and results['cores'] == {min(allowed)}, "Thread not pinned"
+            assert not results['invalid'], "Unavailable core accepted"
+            assert os.sched_getaffinity(0) == allowed, "Pinning leaked to the calling thread"
+            logger.info("✓ Thread pinned without affecting other threads")
+            
+            # Unpinned workers get all cores rather than inheriting the main loop's
+            budget = fill_worker_cores(CoreBudget(lane_cores={min(allowed)}, fcw_cores={max(allowed)}))
+            assert budget.fcw_cores == {max(allowed)}, "Configured FCW cores replaced"
+            assert budget.capture_cores == allowed, "Unpinned capture stage left inheriting lane cores"
+            assert fill_worker_cores(CoreBudget(fcw_threads=1)).capture_cores is None, \
+                "Workers pinned without lane cores"
+            
+            def worker():
+                pin_current_thread(budget.capture_cores, 'test worker')
+                results['worker'] = os.sched_getaffinity(0)
+            
+            def main_loop():
+                # Pinned first, then starts a worker that inherits its mask
+                pin_current_thread(budget.lane_cores, 'test main loop')
+                thread = threading.Thread(target=worker)
+                thread.start()
+                thread.join()
+            
+            
+            thread = threading.Thread(target=main_loop)
+            thread.start()
+            thread.join()
+            assert results['worker'] == allowed, "Worker kept the main loop's core mask"
+            logger.info("✓ Unpinned workers reset to all cores")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Core budget test failed: {e}")
+        return False
+
+
 def test_audio_alert():
     """Test audio alert creation."""
     logger.info("Testing audio alert...")
@@ -169,6 +1336,110 @@ def test_audio_alert():
         return False
 
 
+def test_audio_worker():
+    """Test the shared audio worker and the alerts that drive it."""
+    logger.info("Testing audio worker...")
+    
+    try:
+        import os
+        import threading
+        import time
+        from audio_alert import AudioWorker, AudioAlert, LaneDepartureAlert, CollisionAlert
+        
+        class RecordingSound:
+            """Stands in for a pygame Sound; records when it is played."""
+            def __init__(self):
+                self.plays = []
+                self.volume = None
+            
+            def play(self):
+                self.plays.append(time.monotonic())
+            
+            def set_volume(self, volume):
+                self.volume = volume
+        
+        threads_before = threading.active_count()
+        worker = AudioWorker()
+        worker.start()
+        try:
+            lane, collision = RecordingSound(), RecordingSound()
+            worker.register_sound('lane', lane)
+            worker.register_sound('collision', collision)
+            
+            # Commands return at once; beeps play on the worker
+            start = time.monotonic()
+            worker.beep('lane')
+            worker.start_repeat('collision', 0.05)
+            assert time.monotonic() - start < 0.01, "Commands blocked the caller"
+            time.sleep(0.22)
+            worker.stop('collision')
+            time.sleep(0.05)
+            count = len(collision.plays)
+            time.sleep(0.1)
+            assert len(lane.plays) == 1, "Beep not played once"
+            assert 4 <= count <= 6 and len(collision.plays) == count, f"Repeat wrong: {count} beeps"
+            worker.set_volume(0.25)
+            time.sleep(0.02)
+            assert lane.volume == 0.25 and collision.volume == 0.25, "Volume not applied"
+            logger.info("✓ Beep, repeat, stop and volume handled on one worker")
+            
+            # A real AudioAlert on SDL's silent driver, playing through this worker
+            driver = os.environ.get('SDL_AUDIODRIVER')
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+            try:
+                audio = AudioAlert(duration=0.01, alert_cooldown=0.04)
+            finally:
+                if driver is None:
+                    del os.environ['SDL_AUDIODRIVER']
+                else:
+                    os.environ['SDL_AUDIODRIVER'] = driver
+            assert audio.is_initialized, "Audio system not initialized on the dummy driver"
+            audio.worker.shutdown()
+            audio.worker = worker
+            
+            # Alerts drive the shared worker without starting threads
+            departure = LaneDepartureAlert(audio)
+            plays = len(lane.plays)
+            departure.process_departure(True, timestamp=0.0)
+            departure.process_departure(True, timestamp=2.5)
+            time.sleep(0.15)
+            assert departure.continuous_active and len(lane.plays) >= plays + 3, "Continuous alert not repeating"
+            departure.process_departure(False, timestamp=3.0)
+            assert not departure.continuous_active, "Continuous alert not stopped"
+            
+            fcw = CollisionAlert(audio)
+            worker.register_sound('collision', collision)  # Record in place of the generated tone
+            plays = len(collision.plays)
+            fcw.process_collision(0.8)
+            time.sleep(0.25)
+            fcw.process_collision(None)
+            assert fcw.current_tier is None and len(collision.plays) >= plays + 2, "Danger tier not beeping"
+            time.sleep(0.02)
+            plays = len(collision.plays)
+            time.sleep(0.25)
+            assert len(collision.plays) == plays, "Collision repeat kept beeping after the tier reset"
+            
+            # FCW switched off mid-tier: processing None stops the repeat
+            fcw.process_collision(2.5)
+            time.sleep(0.02)
+            assert fcw.current_tier == 'CAUTION' and 'collision' in worker._repeats, "Caution repeat not started"
+            fcw.process_collision(None)
+            time.sleep(0.05)
+            assert 'collision' not in worker._repeats, "Collision repeat not stopped"
+            assert threading.active_count() == threads_before + 1, "Alerts started extra threads"
+            logger.info("✓ Lane and collision alerts share the worker")
+            audio.cleanup()
+        finally:
+            worker.shutdown()
+        assert threading.active_count() == threads_before, "Worker thread not stopped"
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"✗ Audio worker test failed: {e}")
+        return False
+
+
 def main():
     """Run all tests."""
     logger.info("Starting OpenLCWS system tests...")
@@ -176,9 +1447,33 @@ def main():
     tests = [
         ("Module Imports", test_imports),
         ("Utility Functions", test_utils_functions),
+        ("Lane Center", test_lane_center),
         ("Camera Module", test_camera_module),
+        ("Captured Frame", test_captured_frame),
+        ("Threaded Capture", test_threaded_capture),
         ("Lane Detector", test_lane_detector),
-        ("Audio Alert", test_audio_alert)
+        ("Lane ROI Crop", test_lane_roi_crop),
+        ("Lane Work Buffers", test_lane_work_buffers),
+        ("Lane Processing Scale", test_lane_processing_scale),
+        ("Overlay Renderer", test_overlay_renderer),
+        ("Lane Tracking", test_lane_tracking),
+        ("Bird's-Eye Engine", test_birdseye_engine),
+        ("Lane Backends", test_lane_backends),
+        ("Lane Color Mask", test_lane_color_mask),
+        ("ROI Calibration", test_roi_calibration),
+        ("Offline Processor", test_offline_processor),
+        ("Offline Workers", test_offline_workers),
+        ("SSD Decoding", test_ssd_decoding),
+        ("FCW Tracking", test_fcw_tracking),
+        ("Box Propagation", test_box_propagation),
+        ("FCW Input Regions", test_fcw_input_regions),
+        ("FCW Process Backend", test_fcw_process_backend),
+        ("Async Detector Handoff", test_async_detector_handoff),
+        ("Inference Scheduler", test_inference_scheduler),
+        ("Model Specs", test_model_specs),
+        ("Core Budget", test_core_budget),
+        ("Audio Alert", test_audio_alert),
+        ("Audio Worker", test_audio_worker)
     ]
     
     passed = 0
@@ -192,7 +1487,7 @@ def main():
         else:
             logger.error(f"✗ {test_name} FAILED")
     
-    logger.info(f"\n--- Test Results ---")
+    logger.info("\n--- Test Results ---")
     logger.info(f"Passed: {passed}/{total}")
     
     if passed == total:
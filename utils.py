@@ -144,6 +144,51 @@ def draw_drift_indicator(image: np.ndarray, offset: float,
     return image
 
 
+def draw_lane_overlays(image: np.ndarray, lines: Optional[np.ndarray], offset: float,
+                       threshold: float, roi_vertices: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Draw lane lines, drift indicators, departure warning and ROI outline in place.
+    
+    Args:
+        image: Image to draw on
+        lines: Detected line segments
+        offset: Center offset in pixels
+        threshold: Departure threshold in pixels
+        roi_vertices: ROI polygon vertices (None to skip the outline)
+        
+    Returns:
+        Image with lane overlays drawn
+    """
+    # Draw detected lane lines
+    if lines is not None:
+        image = draw_lane_lines(image, lines)
+    
+    # Draw drift indicators
+    height, width = image.shape[:2]
+    image_center = width / 2
+    image = draw_drift_indicator(image, offset, threshold, image_center)
+    
+    # Add text information
+    info_text = f"Offset: {offset:.1f}px | Threshold: {threshold}px"
+    cv2.putText(image, info_text, (10, height - 20), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    
+    # Add lane departure warning
+    if abs(offset) > threshold:
+        warning_text = "LANE DEPARTURE WARNING!"
+        cv2.putText(image, warning_text, (width // 2 - 150, 50), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
+
+    # Visualize ROI
+    if roi_vertices is not None:
+        pts = roi_vertices.reshape((-1, 1, 2))
+        cv2.polylines(image, [pts], isClosed=True, color=(255, 0, 255), thickness=2)
+        cv2.putText(image, "ROI Focus Area", (int(pts[0][0][0]), int(pts[0][0][1]) - 10), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 1)
+    
+    return image
+
+
 def add_text_overlay(image: np.ndarray, text: str, 
                     position: Tuple[int, int] = (10, 60),
                     color: Tuple[int, int, int] = (255, 255, 255),
@@ -189,63 +234,86 @@ def resize_image(image: np.ndarray, width: int = None, height: int = None) -> np
         aspect_ratio = h / w
         height = int(width * aspect_ratio)
     
+    if (width, height) == (w, h):
+        return image
+    
     return cv2.resize(image, (width, height))
 
 
-def calculate_lane_center(lines: List[np.ndarray], image_width: int, image_height: int = 720) -> Optional[float]:
+def _weighted_median(values: np.ndarray, weights: np.ndarray) -> float:
+    """
+    Weighted median of values (the plain median when all weights are equal).
+    
+    Args:
+        values: 1D array of values
+        weights: 1D array of non-negative weights
+        
+    Returns:
+        Weighted median
+    """
+    order = np.argsort(values)
+    values = values[order]
+    cumulative = np.cumsum(weights[order])
+    half = cumulative[-1] / 2.0
+    idx = int(np.searchsorted(cumulative, half))
+    # Average the two middle values when the halfway point falls exactly between them
+    if idx + 1 < len(values) and np.isclose(cumulative[idx], half):
+        return float((values[idx] + values[idx + 1]) / 2.0)
+    return float(values[idx])
+
+
+def calculate_lane_center(lines: np.ndarray, image_width: int, image_height: int = 720,
+                          weight_by_length: bool = False) -> Tuple[Optional[float], Optional[float], Optional[float]]:
     """
     Calculate the center of the detected lane from line segments.
     
+    Slopes, the left/right split and bottom intercepts are computed in one
+    vectorized pass over the (N, 1, 4) HoughLinesP array.
+    
     Args:
-        lines: List of detected line segments
+        lines: Detected line segments, shape (N, 1, 4)
         image_width: Width of the image
         image_height: Height of the image to find bottom intercept
+        weight_by_length: Weight each segment's intercept by its length
         
     Returns:
-        X-coordinate of lane center, or None if no lines detected
+        Tuple of (lane_center, left_intercept, right_intercept); entries are
+        None when the corresponding lane was not detected
     """
     if lines is None or len(lines) == 0:
-        return None
+        return None, None, None
     
-    # Separate left and right lines
-    left_lines = []
-    right_lines = []
+    segments = np.asarray(lines).reshape(-1, 4)
+    x1, y1, x2, y2 = segments.T.astype(np.float64)
+    dx = x2 - x1
+    dy = y2 - y1
     
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        slope = (y2 - y1) / (x2 - x1) if x2 != x1 else float('inf')
-        
-        # Filter out horizontal lines and very steep lines
-        if abs(slope) < 0.5 or abs(slope) > 2.0:
-            continue
-            
-        if slope < 0:  # Left lane (negative slope)
-            left_lines.append(line)
-        else:  # Right lane (positive slope)
-            right_lines.append(line)
-    
-    # Calculate x intercepts at the bottom of the image for the left and right lanes
-    left_x_intercepts = []
-    right_x_intercepts = []
+    # Vertical segments have infinite slope and are filtered out with the steep ones
+    vertical = dx == 0
+    slope = dy / np.where(vertical, 1.0, dx)
+    abs_slope = np.abs(slope)
+    
+    # Filter out horizontal lines and very steep lines
+    keep = ~vertical & (abs_slope >= 0.5) & (abs_slope <= 2.0)
     
+    # x intercepts at the bottom of the image
     bottom_y = image_height
+    b = y1 - slope * x1
+    x_intercepts = (bottom_y - b) / np.where(keep, slope, 1.0)
     
-    for line in left_lines:
-        x1, y1, x2, y2 = line[0]
-        slope = (y2 - y1) / (x2 - x1) if x2 != x1 else float('inf')
-        b = y1 - slope * x1
-        x_intercept = (bottom_y - b) / slope if slope != 0 and slope != float('inf') else x1
-        left_x_intercepts.append(x_intercept)
-
-    for line in right_lines:
-        x1, y1, x2, y2 = line[0]
-        slope = (y2 - y1) / (x2 - x1) if x2 != x1 else float('inf')
-        b = y1 - slope * x1
-        x_intercept = (bottom_y - b) / slope if slope != 0 and slope != float('inf') else x1
-        right_x_intercepts.append(x_intercept)
-
-    left_intercept = np.median(left_x_intercepts) if left_x_intercepts else None
-    right_intercept = np.median(right_x_intercepts) if right_x_intercepts else None
+    if weight_by_length:
+        weights = np.hypot(dx, dy)
+    
+    # Left lane has negative slope, right lane positive
+    intercepts = []
+    for side in (keep & (slope < 0), keep & (slope > 0)):
+        if not side.any():
+            intercepts.append(None)
+        elif weight_by_length:
+            intercepts.append(_weighted_median(x_intercepts[side], weights[side]))
+        else:
+            intercepts.append(float(np.median(x_intercepts[side])))
+    left_intercept, right_intercept = intercepts
     
     # Calculate lane center at bottom of image
     if left_intercept is not None and right_intercept is not None:
@@ -255,7 +323,7 @@ def calculate_lane_center(lines: List[np.ndarray], image_width: int, image_heigh
     elif right_intercept is not None:
         return right_intercept - 200, None, right_intercept  # Estimate lane center from right lane
 
-    return None, None, None 
+    return None, None, None
 
 
 def draw_detection_boxes(image: np.ndarray, tracked_objects, 